@@ -0,0 +1,173 @@
+"""
+도서 벡터 저장소용 IVF(Inverted File) 근사 최근접 이웃 인덱스
+
+k-means로 학습한 중심점(centroid)으로 도서 벡터를 nlist개의 리스트로 나누고,
+검색 시에는 쿼리와 가까운 nprobe개의 리스트만 정확히 비교합니다.
+nprobe를 키우면 재현율(recall)이 올라가고 검색 시간이 늘어납니다.
+
+인덱스는 저장소(book_store.py) 옆에 books_ivf.npz로 저장되며,
+인덱스 생성 이후 저장소에 추가된 도서는 검색 시 항상 정확히 비교합니다.
+
+사용법 (저장소를 갱신한 뒤 오프라인으로 다시 생성):
+    python book_ivf.py [nlist]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+BOOK_CHUNK_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_IVF_FILE = "books_ivf.npz"
+
+# 검색 시 기본으로 탐색할 리스트 수
+DEFAULT_NPROBE = 8
+
+
+def default_nlist(count):
+    return max(1, int(np.sqrt(count)))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def assign_lists(vectors, centroids, block_size=65536):
+    """각 벡터를 가장 가까운(코사인 유사도가 가장 큰) 중심점에 배정합니다."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start : start + block_size], dtype=np.float32)
+        assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, nlist, n_iter=20, max_train_size=None, seed=0):
+    """정규화된 벡터로 구면(spherical) k-means 중심점을 학습합니다."""
+    rng = np.random.default_rng(seed)
+    max_train_size = max_train_size or 256 * nlist
+    if len(vectors) > max_train_size:
+        sample_rows = np.sort(rng.choice(len(vectors), max_train_size, replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    else:
+        sample = np.asarray(vectors, dtype=np.float32)
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        # 비어 있는 리스트는 임의의 샘플로 다시 시작
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def build_ivf_index(vectors, nlist=None, n_iter=20, seed=0):
+    """
+    IVF 인덱스를 생성합니다.
+
+    Returns:
+        dict: centroids (nlist, dim), list_offsets (nlist + 1,),
+              list_rows (n,), indexed_count
+    """
+    count = len(vectors)
+    nlist = min(nlist or default_nlist(count), count)
+    centroids = train_centroids(vectors, nlist, n_iter=n_iter, seed=seed)
+    assignments = assign_lists(vectors, centroids)
+    list_rows = np.argsort(assignments, kind="stable")
+    list_offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(assignments, minlength=nlist))]
+    )
+    return {
+        "centroids": centroids.astype(np.float32),
+        "list_offsets": list_offsets.astype(np.int64),
+        "list_rows": list_rows.astype(np.int64),
+        "indexed_count": np.int64(count),
+    }
+
+
+def save_ivf_index(index, store_dir=BOOK_CHUNK_DIR):
+    path = os.path.join(store_dir, STORE_IVF_FILE)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **index)
+    os.replace(tmp_path, path)
+
+
+def load_ivf_index(store_dir=BOOK_CHUNK_DIR, vectors=None):
+    """
+    인덱스를 로드합니다. 파일이 없거나 저장소와 맞지 않으면 None을 반환합니다.
+    (이 경우 호출하는 쪽에서 정확한 선형 검색을 사용합니다)
+    """
+    path = os.path.join(store_dir, STORE_IVF_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        index = {key: data[key] for key in data.files}
+    if vectors is not None and (
+        int(index["indexed_count"]) > len(vectors)
+        or index["centroids"].shape[1] != vectors.shape[1]
+    ):
+        print("경고: IVF 인덱스가 저장소와 맞지 않아 정확한 검색을 사용합니다.")
+        return None
+    return index
+
+
+def search_ivf(
+    index, vectors, queries, top_k, nprobe=DEFAULT_NPROBE, excluded_rows=None
+):
+    """
+    정규화된 쿼리들로 IVF 검색을 수행합니다.
+
+    Returns:
+        list: 쿼리별 (행 번호 배열, 유사도 배열). 후보가 top_k개보다 적은 쿼리는
+              None을 반환하므로 호출하는 쪽에서 정확한 검색으로 대체해야 합니다.
+    """
+    centroids = index["centroids"]
+    list_offsets = index["list_offsets"]
+    list_rows = index["list_rows"]
+    nprobe = min(nprobe, len(centroids))
+    # 인덱스 생성 이후 추가된 도서는 항상 후보에 포함
+    tail_rows = np.arange(int(index["indexed_count"]), len(vectors))
+
+    centroid_sims = queries @ centroids.T
+    probes = np.argpartition(-centroid_sims, nprobe - 1, axis=1)[:, :nprobe]
+
+    results = []
+    for query_idx, query in enumerate(queries):
+        candidates = np.concatenate(
+            [
+                list_rows[list_offsets[c] : list_offsets[c + 1]]
+                for c in probes[query_idx]
+            ]
+            + [tail_rows]
+        )
+        if excluded_rows is not None and len(excluded_rows[query_idx]):
+            candidates = candidates[~np.isin(candidates, excluded_rows[query_idx])]
+        if len(candidates) < top_k:
+            results.append(None)
+            continue
+        # 디스크(memmap) 접근 순서를 위해 행 번호 순으로 정렬
+        candidates.sort()
+        similarities = vectors[candidates] @ query
+        top = np.argpartition(-similarities, top_k - 1)[:top_k]
+        top = top[np.argsort(-similarities[top])]
+        results.append((candidates[top], similarities[top]))
+    return results
+
+
+if __name__ == "__main__":
+    from book_store import open_book_store
+
+    vectors, _, _ = open_book_store()
+    if len(vectors) == 0:
+        print("저장소가 비어 있습니다. 먼저 book_store.py로 변환하세요.")
+        sys.exit(1)
+    nlist = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    index = build_ivf_index(vectors, nlist=nlist)
+    save_ivf_index(index)
+    print(
+        f"IVF 인덱스 생성 완료: 도서 {len(vectors)}권, 리스트 {len(index['centroids'])}개"
+    )
@@ -0,0 +1,206 @@
+"""
+도서 벡터 저장소용 PQ(Product Quantization) 압축 인덱스
+
+임베딩(dim 차원)을 m개의 부분 공간으로 나누고, 부분 공간마다 256개의 코드북을 학습해
+도서 한 권을 m바이트 코드로 저장합니다. (4096차원 float32 16KB -> m=64일 때 64바이트)
+
+검색 시에는 쿼리와 코드북의 내적 테이블을 만들어 코드만으로 유사도를 근사(ADC)하고,
+상위 rerank_k개의 후보만 원본 벡터(memmap)로 정확히 다시 계산합니다.
+따라서 검색에 필요한 메모리는 코드 크기 수준이며, 원본 벡터는 후보 행만 디스크에서 읽습니다.
+
+인덱스는 저장소(book_store.py) 옆에 books_pq.npz로 저장되며,
+인덱스 생성 이후 저장소에 추가된 도서는 검색 시 항상 정확히 비교합니다.
+
+사용법 (저장소를 갱신한 뒤 오프라인으로 다시 생성):
+    python book_pq.py [m]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+BOOK_CHUNK_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PQ_FILE = "books_pq.npz"
+
+# 기본 부분 공간 수 (dim을 나누어 떨어지게 조정됨)
+DEFAULT_M = 64
+# ADC로 고른 후보 중 원본 벡터로 다시 계산할 수
+DEFAULT_RERANK_K = 50
+
+
+def _subspace_count(dim, m):
+    m = min(m, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _kmeans(data, k, n_iter, rng):
+    """유클리드 거리 기준 k-means"""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(n_iter):
+        distances = (
+            -2 * data @ centroids.T + np.sum(centroids**2, axis=1)[np.newaxis, :]
+        )
+        assignments = np.argmin(distances, axis=1)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, np.newaxis]
+        # 비어 있는 코드는 임의의 샘플로 다시 시작
+        centroids[~filled] = data[rng.choice(len(data), int((~filled).sum()))]
+    return centroids
+
+
+def encode(vectors, codebooks, block_size=65536):
+    """벡터들을 (n, m) uint8 코드로 변환합니다."""
+    m, _, dsub = codebooks.shape
+    codes = np.empty((len(vectors), m), dtype=np.uint8)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start : start + block_size], dtype=np.float32)
+        for j in range(m):
+            sub = block[:, j * dsub : (j + 1) * dsub]
+            distances = (
+                -2 * sub @ codebooks[j].T
+                + np.sum(codebooks[j] ** 2, axis=1)[np.newaxis, :]
+            )
+            codes[start : start + len(block), j] = np.argmin(distances, axis=1)
+    return codes
+
+
+def build_pq_index(vectors, m=DEFAULT_M, n_iter=15, max_train_size=20000, seed=0):
+    """
+    PQ 인덱스를 생성합니다.
+
+    Returns:
+        dict: codebooks (m, ksub, dim / m), codes (n, m), indexed_count
+    """
+    rng = np.random.default_rng(seed)
+    count, dim = vectors.shape
+    m = _subspace_count(dim, m)
+    dsub = dim // m
+    ksub = min(256, count)
+
+    if count > max_train_size:
+        sample_rows = np.sort(rng.choice(count, max_train_size, replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    else:
+        sample = np.asarray(vectors, dtype=np.float32)
+
+    codebooks = np.stack(
+        [
+            _kmeans(sample[:, j * dsub : (j + 1) * dsub], ksub, n_iter, rng)
+            for j in range(m)
+        ]
+    ).astype(np.float32)
+    return {
+        "codebooks": codebooks,
+        "codes": encode(vectors, codebooks),
+        "indexed_count": np.int64(count),
+    }
+
+
+def save_pq_index(index, store_dir=BOOK_CHUNK_DIR):
+    path = os.path.join(store_dir, STORE_PQ_FILE)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **index)
+    os.replace(tmp_path, path)
+
+
+def load_pq_index(store_dir=BOOK_CHUNK_DIR, vectors=None):
+    """
+    인덱스를 로드합니다. 파일이 없거나 저장소와 맞지 않으면 None을 반환합니다.
+    (이 경우 호출하는 쪽에서 정확한 선형 검색을 사용합니다)
+    """
+    path = os.path.join(store_dir, STORE_PQ_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        index = {key: data[key] for key in data.files}
+    m, ksub, dsub = index["codebooks"].shape
+    if vectors is not None and (
+        int(index["indexed_count"]) > len(vectors) or m * dsub != vectors.shape[1]
+    ):
+        print("경고: PQ 인덱스가 저장소와 맞지 않아 정확한 검색을 사용합니다.")
+        return None
+    return index
+
+
+def adc_scores(table, codes, block_size=65536):
+    """
+    (m, ksub) 내적 테이블을 코드로 조회해 합산한 근사 유사도 (ADC)
+    테이블을 1차원으로 펼쳐 np.take로 조회하며, 코드 오프셋(codes + j * ksub)은
+    블록마다 계산하므로 (n, m) 크기의 오프셋 배열을 메모리에 두지 않습니다.
+    """
+    m, ksub = table.shape
+    flat = table.ravel()
+    offsets = np.arange(m, dtype=np.int32) * ksub
+    approx = np.empty(len(codes), dtype=table.dtype)
+    for start in range(0, len(codes), block_size):
+        block = codes[start : start + block_size]
+        approx[start : start + len(block)] = np.take(flat, block + offsets).sum(axis=1)
+    return approx
+
+
+def search_pq(
+    index, vectors, queries, top_k, rerank_k=DEFAULT_RERANK_K, excluded_rows=None
+):
+    """
+    정규화된 쿼리들로 PQ 근사 검색(ADC) 후 상위 후보를 원본 벡터로 재정렬합니다.
+
+    Returns:
+        list: 쿼리별 (행 번호 배열, 유사도 배열). 후보가 top_k개보다 적은 쿼리는
+              None을 반환하므로 호출하는 쪽에서 정확한 검색으로 대체해야 합니다.
+    """
+    codebooks = index["codebooks"]
+    codes = index["codes"]
+    m, ksub, dsub = codebooks.shape
+    indexed_count = int(index["indexed_count"])
+    # 인덱스 생성 이후 추가된 도서는 항상 후보에 포함
+    tail_rows = np.arange(indexed_count, len(vectors))
+    rerank_k = max(rerank_k, top_k)
+
+    results = []
+    for query_idx, query in enumerate(queries):
+        # (m, ksub) 내적 테이블: 부분 쿼리와 각 코드북 중심점의 내적
+        table = np.einsum("jd,jkd->jk", query.reshape(m, dsub), codebooks)
+        approx = adc_scores(table, codes)
+        if excluded_rows is not None and len(excluded_rows[query_idx]):
+            excluded = excluded_rows[query_idx]
+            approx[excluded[excluded < indexed_count]] = -np.inf
+        n_candidates = min(rerank_k, indexed_count)
+        candidates = np.empty(0, dtype=np.int64)
+        if n_candidates:
+            candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+            candidates = candidates[np.isfinite(approx[candidates])]
+        candidates = np.concatenate([candidates, tail_rows])
+        if excluded_rows is not None and len(excluded_rows[query_idx]):
+            candidates = candidates[~np.isin(candidates, excluded_rows[query_idx])]
+        if len(candidates) < top_k:
+            results.append(None)
+            continue
+        # 디스크(memmap) 접근 순서를 위해 행 번호 순으로 정렬한 뒤 정확히 재계산
+        candidates.sort()
+        similarities = vectors[candidates] @ query
+        top = np.argpartition(-similarities, top_k - 1)[:top_k]
+        top = top[np.argsort(-similarities[top])]
+        results.append((candidates[top], similarities[top]))
+    return results
+
+
+if __name__ == "__main__":
+    from book_store import open_book_store
+
+    vectors, _, _ = open_book_store()
+    if len(vectors) == 0:
+        print("저장소가 비어 있습니다. 먼저 book_store.py로 변환하세요.")
+        sys.exit(1)
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_M
+    index = build_pq_index(vectors, m=m)
+    save_pq_index(index)
+    print(
+        f"PQ 인덱스 생성 완료: 도서 {len(vectors)}권, "
+        f"코드 {index['codes'].nbytes / 1024 / 1024:.1f}MB"
+    )
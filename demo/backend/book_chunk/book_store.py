@@ -0,0 +1,226 @@
+"""
+도서 벡터 저장소
+
+pickle 청크 대신 아래 4개 파일로 도서 임베딩과 메타데이터를 저장합니다.
+- books_vectors.f32 : L2 정규화된 float32 임베딩 (n_books x dim, 헤더 없는 raw 파일)
+- books_ids.bin     : 고정 길이(S13) ISBN 인덱스, 벡터와 같은 행 순서
+- books_meta.jsonl  : 도서 메타데이터 (한 줄에 한 권, 벡터와 같은 행 순서)
+- books_store.json  : 권 수, 차원, 파일 크기 등을 기록한 manifest
+
+벡터 파일은 numpy.memmap으로 열기 때문에 여러 프로세스가 page cache를 공유하며,
+역직렬화 없이 바로 검색에 사용할 수 있습니다.
+
+처음 append_books로 저장소를 만들 때 기존 pickle 청크를 자동으로 변환합니다.
+변환 전에 저장소가 만들어진 경우에는 아래 명령으로 빠진 도서를 추가할 수 있습니다.
+
+사용법 (기존 pickle 청크를 한 번에 변환):
+    python book_store.py
+"""
+
+import json
+import os
+import pickle
+
+import numpy as np
+
+BOOK_CHUNK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STORE_VECTORS_FILE = "books_vectors.f32"
+STORE_IDS_FILE = "books_ids.bin"
+STORE_META_FILE = "books_meta.jsonl"
+STORE_MANIFEST_FILE = "books_store.json"
+
+VECTOR_DTYPE = np.dtype(np.float32)
+ISBN_DTYPE = np.dtype("S13")
+
+
+def _path(store_dir, filename):
+    return os.path.join(store_dir, filename)
+
+
+def store_exists(store_dir=BOOK_CHUNK_DIR):
+    return os.path.exists(_path(store_dir, STORE_MANIFEST_FILE))
+
+
+def read_manifest(store_dir=BOOK_CHUNK_DIR):
+    """manifest를 읽습니다. 저장소가 없으면 빈 manifest를 반환합니다."""
+    try:
+        with open(_path(store_dir, STORE_MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"count": 0, "dim": 0, "meta_bytes": 0}
+
+
+def _write_manifest(manifest, store_dir):
+    """manifest를 임시 파일에 쓴 뒤 교체하여 원자적으로 저장합니다."""
+    manifest_path = _path(store_dir, STORE_MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+
+
+def _open_truncated(path, size):
+    """
+    파일을 manifest에 기록된 크기로 자른 뒤 append 모드로 엽니다.
+    (이전 쓰기가 중간에 끊겨 남은 꼬리 데이터를 제거)
+    """
+    with open(path, "ab") as f:
+        f.truncate(size)
+    return open(path, "ab")
+
+
+def book_metadata(book):
+    """임베딩을 제외한 도서 메타데이터"""
+    return {key: value for key, value in book.items() if key != "embedding"}
+
+
+def append_books(books, store_dir=BOOK_CHUNK_DIR):
+    """
+    도서 리스트(각 항목에 isbn, embedding 포함)를 저장소 끝에 추가합니다.
+    이미 저장된 ISBN과 임베딩이 없는 도서는 건너뜁니다.
+    저장소를 처음 만들 때는 같은 디렉토리의 pickle 청크를 먼저 변환합니다.
+    (저장소가 생기면 검색은 저장소만 읽으므로, 변환하지 않으면 기존 도서가 검색에서 빠짐)
+
+    Returns:
+        int: 새로 추가된 도서 수
+    """
+    if not store_exists(store_dir):
+        convert_pickle_chunks(store_dir)
+    return _append_books(books, store_dir)
+
+
+def _append_books(books, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    existing_isbns = set(read_store_ids(store_dir).tolist())
+
+    vectors, ids, meta_lines = [], [], []
+    dim = manifest["dim"]
+    for book in books:
+        isbn = (book.get("isbn") or "").split(" ")[0]
+        embedding = book.get("embedding")
+        if not isbn or not embedding:
+            continue
+        key = isbn.encode("ascii")
+        if key in existing_isbns:
+            continue
+        if dim and len(embedding) != dim:
+            print(f"경고: 임베딩 차원 불일치로 건너뜀 (ISBN {isbn})")
+            continue
+        dim = len(embedding)
+        existing_isbns.add(key)
+        vectors.append(embedding)
+        ids.append(key)
+        meta_lines.append(
+            json.dumps(book_metadata(book), ensure_ascii=False).encode("utf-8") + b"\n"
+        )
+
+    if not vectors:
+        return 0
+
+    vectors = np.asarray(vectors, dtype=VECTOR_DTYPE)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    meta_bytes = b"".join(meta_lines)
+
+    count = manifest["count"]
+    with _open_truncated(
+        _path(store_dir, STORE_VECTORS_FILE), count * dim * VECTOR_DTYPE.itemsize
+    ) as f:
+        f.write(vectors.tobytes())
+    with _open_truncated(
+        _path(store_dir, STORE_IDS_FILE), count * ISBN_DTYPE.itemsize
+    ) as f:
+        f.write(np.asarray(ids, dtype=ISBN_DTYPE).tobytes())
+    with _open_truncated(
+        _path(store_dir, STORE_META_FILE), manifest["meta_bytes"]
+    ) as f:
+        f.write(meta_bytes)
+
+    _write_manifest(
+        {
+            "count": count + len(ids),
+            "dim": dim,
+            "meta_bytes": manifest["meta_bytes"] + len(meta_bytes),
+            "dtype": VECTOR_DTYPE.str,
+            "isbn_dtype": ISBN_DTYPE.str,
+        },
+        store_dir,
+    )
+    return len(ids)
+
+
+def read_store_ids(store_dir=BOOK_CHUNK_DIR):
+    """저장된 ISBN 인덱스를 memmap으로 엽니다. (bytes 배열)"""
+    count = read_manifest(store_dir)["count"]
+    if count == 0:
+        return np.empty(0, dtype=ISBN_DTYPE)
+    return np.memmap(
+        _path(store_dir, STORE_IDS_FILE), dtype=ISBN_DTYPE, mode="r", shape=(count,)
+    )
+
+
+def open_book_store(store_dir=BOOK_CHUNK_DIR):
+    """
+    저장소를 엽니다.
+
+    Returns:
+        tuple: (임베딩 memmap (n, dim), ISBN memmap (n,), 메타데이터 리스트)
+    """
+    manifest = read_manifest(store_dir)
+    count, dim = manifest["count"], manifest["dim"]
+    if count == 0:
+        return np.empty((0, 0), dtype=VECTOR_DTYPE), read_store_ids(store_dir), []
+
+    vectors = np.memmap(
+        _path(store_dir, STORE_VECTORS_FILE),
+        dtype=VECTOR_DTYPE,
+        mode="r",
+        shape=(count, dim),
+    )
+    metadata = []
+    with open(_path(store_dir, STORE_META_FILE), "rb") as f:
+        for line in f.read(manifest["meta_bytes"]).splitlines():
+            metadata.append(json.loads(line))
+    return vectors, read_store_ids(store_dir), metadata
+
+
+def convert_pickle_chunks(chunk_dir=BOOK_CHUNK_DIR, store_dir=None):
+    """
+    기존 books_chunk_*.pkl 파일들을 벡터 저장소 형식으로 변환합니다.
+    이미 저장소에 있는 ISBN은 건너뛰므로 여러 번 실행해도 안전합니다.
+    """
+    store_dir = store_dir or chunk_dir
+    if not os.path.isdir(chunk_dir):
+        return 0
+    chunk_files = sorted(
+        (
+            f
+            for f in os.listdir(chunk_dir)
+            if f.startswith("books_chunk_") and f.endswith(".pkl")
+        ),
+        key=lambda f: int(f[len("books_chunk_") : -len(".pkl")]),
+    )
+    total_added = 0
+    for chunk_file in chunk_files:
+        try:
+            with open(os.path.join(chunk_dir, chunk_file), "rb") as f:
+                chunk_data = pickle.load(f)
+        except Exception as e:
+            print(f"경고: 청크 파일 '{chunk_file}' 로드 중 오류 발생: {str(e)}")
+            continue
+        added = _append_books(
+            [dict(book, isbn=isbn) for isbn, book in chunk_data.items()], store_dir
+        )
+        total_added += added
+        print(f"{chunk_file}: {added}권 변환")
+    return total_added
+
+
+if __name__ == "__main__":
+    added = convert_pickle_chunks()
+    print(f"변환 완료: {added}권 (전체 {read_manifest()['count']}권)")
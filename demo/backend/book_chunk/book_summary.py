@@ -0,0 +1,100 @@
+"""
+도서 내용 요약
+
+도서 수집(save_book_info.py) 시 ISBN별로 한 번 요약을 만들어 메타데이터의 summary 필드에 저장하고,
+보고서 생성(book_recommendation.py)에서는 저장된 요약을 그대로 사용합니다.
+요약이 없는 기존 도서는 처음 추천될 때 요약하며, 결과는 LLM 응답 캐시에 저장되어 재사용됩니다.
+
+사용법 (저장소의 요약 없는 도서를 미리 요약해 응답 캐시에 저장):
+    python book_summary.py
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from llm_service.llm_client import UPSTAGE_BASE_URL, estimate_tokens, get_llm_client
+from llm_service.response_cache import get_response_cache
+from openai import OpenAI
+
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
+solar_client = OpenAI(api_key=UPSTAGE_API_KEY, base_url=UPSTAGE_BASE_URL)
+
+SUMMARY_MODEL = "solar-pro"
+SUMMARIZE_BOOK_PROMPT = """
+아래의 책의 내용을 읽고 핵심 내용을 요약해주세요
+
+{content}
+
+요약할 때 다음 사항을 지켜주세요:
+1. 책의 핵심 주제나 메시지를 포함할 것
+2. 간결하고 명확하게 작성할 것
+3. 공백 포함 최대 300자 내로 요약할 것
+"""
+
+
+def request_book_summary(content):
+    """
+    책 내용 요약을 요청하는 함수 (같은 내용은 LLM 응답 캐시에서 재사용)
+    재시도 후에도 실패하면 예외를 그대로 발생시킵니다.
+    """
+
+    def create_summary():
+        prompt = SUMMARIZE_BOOK_PROMPT.format(content=content)
+        response = get_llm_client().call(
+            solar_client.chat.completions.create,
+            model=SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            stream=False,
+            timeout=10,
+            name="summarize_book",
+            tokens=estimate_tokens(prompt) + 300,
+        )
+        return response.choices[0].message.content.strip()
+
+    return get_response_cache().get_or_create(
+        SUMMARY_MODEL, SUMMARIZE_BOOK_PROMPT, {"content": content}, create_summary
+    )
+
+
+def summarize_book_content(content):
+    """책 내용을 요약하는 함수. 실패하면 내용 앞부분(300자)을 대신 반환합니다."""
+    try:
+        return request_book_summary(content)
+    except Exception as e:
+        print(f"책 내용 요약 중 오류 발생: {str(e)}")
+        return content[:300] + "..."
+
+
+def summarize_books(contents, max_workers=4):
+    """
+    여러 책의 내용을 동시에 요약하는 함수
+    Returns:
+        list: 입력 순서대로의 요약 리스트 (실패한 항목은 None, 다음에 다시 요약)
+    """
+
+    def summarize(content):
+        try:
+            return request_book_summary(content)
+        except Exception as e:
+            print(f"\n책 내용 요약 중 오류 발생: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(summarize, contents))
+
+
+if __name__ == "__main__":
+    from book_store import open_book_store
+
+    _, _, metadata = open_book_store()
+    contents = [
+        book["contents"]
+        for book in metadata
+        if not book.get("summary") and book.get("contents")
+    ]
+    summaries = summarize_books(contents)
+    done = sum(summary is not None for summary in summaries)
+    print(f"요약 완료: {done}권 (실패 {len(contents) - done}권)")
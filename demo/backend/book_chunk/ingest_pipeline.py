@@ -0,0 +1,240 @@
+"""
+asyncio 기반 도서 수집 파이프라인
+
+fetch(키워드별 도서 검색) -> dedupe(ISBN 중복 제거) -> embed(임베딩 생성) -> persist(저장)
+각 단계는 크기가 제한된 큐로 연결되어, 다음 키워드의 검색과 이전 키워드의 임베딩이
+동시에 진행되고 느린 단계가 있으면 앞 단계가 자동으로 대기(backpressure)합니다.
+
+단계별 작업은 일반 함수로 주입받아 스레드에서 실행하므로,
+실제 Kakao/Upstage API 대신 로컬 대체 함수로도 그대로 테스트할 수 있습니다.
+"""
+
+import asyncio
+
+# 큐 종료 표시
+_DONE = object()
+
+
+class _KeywordTracker:
+    """
+    키워드별로 아직 저장되지 않은 ISBN을 추적하여,
+    키워드의 모든 신규 도서가 저장되면 on_keyword_done을 호출합니다.
+    검색에 실패했거나(dedupe 단계로 넘어가지 않음) 임베딩에 실패한 도서가 있는 키워드는
+    완료로 기록하지 않습니다. (다음 실행 때 다시 처리)
+    """
+
+    def __init__(self, stats, on_keyword_done):
+        self.stats = stats
+        self.on_keyword_done = on_keyword_done
+        self.pending = {}
+        self.isbn_keyword = {}
+        self.deduped = set()
+        self.failed = set()
+
+    def add(self, keyword, isbn):
+        self.pending.setdefault(keyword, set()).add(isbn)
+        self.isbn_keyword[isbn] = keyword
+
+    async def keyword_deduped(self, keyword):
+        self.deduped.add(keyword)
+        await self._check(keyword)
+
+    async def resolved(self, isbns, failed=False):
+        keywords = set()
+        for isbn in isbns:
+            keyword = self.isbn_keyword.pop(isbn, None)
+            if keyword is None:
+                continue
+            self.pending[keyword].discard(isbn)
+            if failed:
+                self.failed.add(keyword)
+            keywords.add(keyword)
+        for keyword in keywords:
+            await self._check(keyword)
+
+    async def _check(self, keyword):
+        if (
+            self.on_keyword_done is None
+            or keyword not in self.deduped
+            or self.pending.get(keyword)
+            or keyword in self.failed
+        ):
+            return
+        self.deduped.discard(keyword)
+        keyword_stats = self.stats["keywords"][keyword]
+        await asyncio.to_thread(
+            self.on_keyword_done, keyword, keyword_stats["total"], keyword_stats["new"]
+        )
+
+
+def book_isbn(book):
+    return (book.get("isbn") or "").split(" ")[0]
+
+
+async def _fetch_worker(keyword_queue, fetched_queue, fetch_books, stats):
+    while True:
+        keyword = await keyword_queue.get()
+        if keyword is _DONE:
+            return
+        try:
+            books = await asyncio.to_thread(fetch_books, keyword)
+        except Exception as e:
+            # 일부 결과로 진행하면 키워드가 완료로 기록되므로 이번 실행에서는 건너뜀
+            print(f"\n키워드 '{keyword}' 검색 중 오류 발생: {str(e)}")
+            stats["fetch_failed"].append(keyword)
+            continue
+        stats["keywords"][keyword] = {"total": len(books), "new": 0}
+        await fetched_queue.put((keyword, books))
+
+
+async def _dedupe_stage(
+    fetched_queue, embed_queue, processed_isbns, batch_size, stats, tracker
+):
+    batch = []
+    while True:
+        item = await fetched_queue.get()
+        if item is _DONE:
+            break
+        keyword, books = item
+        for book in books:
+            isbn = book_isbn(book)
+            if not isbn or isbn in processed_isbns or not book.get("contents"):
+                continue
+            processed_isbns.add(isbn)
+            stats["keywords"][keyword]["new"] += 1
+            tracker.add(keyword, isbn)
+            batch.append(book)
+            if len(batch) >= batch_size:
+                await embed_queue.put(batch)
+                batch = []
+        await tracker.keyword_deduped(keyword)
+    if batch:
+        await embed_queue.put(batch)
+
+
+async def _embed_worker(embed_queue, persist_queue, embed_books, stats, tracker):
+    while True:
+        batch = await embed_queue.get()
+        if batch is _DONE:
+            return
+        try:
+            records = await asyncio.to_thread(embed_books, batch)
+        except Exception as e:
+            print(f"\n임베딩 배치 처리 중 오류 발생: {str(e)}")
+            records = {}
+        stats["embedded"] += len(records)
+        stats["failed"] += len(batch) - len(records)
+        await tracker.resolved(
+            [book_isbn(book) for book in batch if book_isbn(book) not in records],
+            failed=True,
+        )
+        await persist_queue.put(records)
+
+
+async def _persist_stage(persist_queue, persist, chunk_size, stats, tracker):
+    chunk = {}
+    while True:
+        records = await persist_queue.get()
+        if records is _DONE:
+            break
+        chunk.update(records)
+        if len(chunk) >= chunk_size:
+            await asyncio.to_thread(persist, chunk)
+            stats["persisted"] += len(chunk)
+            await tracker.resolved(chunk)
+            chunk = {}
+    if chunk:
+        await asyncio.to_thread(persist, chunk)
+        stats["persisted"] += len(chunk)
+        await tracker.resolved(chunk)
+
+
+async def run_ingestion_pipeline(
+    keywords,
+    fetch_books,
+    embed_books,
+    persist,
+    processed_isbns=None,
+    on_keyword_done=None,
+    fetch_concurrency=2,
+    embed_concurrency=4,
+    embed_batch_size=100,
+    chunk_size=1000,
+    queue_size=4,
+):
+    """
+    도서 수집 파이프라인을 실행합니다.
+
+    Args:
+        keywords: 검색할 키워드 리스트
+        fetch_books: keyword -> 도서 리스트 (Kakao 검색, 실패하면 예외를 발생시켜야 함)
+        embed_books: 도서 리스트 -> {isbn: 임베딩이 포함된 도서 정보} (실패한 도서는 제외)
+        persist: {isbn: 도서 정보} 청크를 저장하는 함수
+        processed_isbns: 이미 처리된 ISBN 집합 (새로 처리한 ISBN이 추가됨)
+        on_keyword_done: (keyword, total, new) -> None, 키워드의 신규 도서가 모두 저장되면 호출
+        fetch_concurrency: 동시에 검색할 키워드 수
+        embed_concurrency: 동시에 처리할 임베딩 배치 수
+        embed_batch_size: 임베딩 배치 하나의 도서 수
+        chunk_size: 저장 단위 도서 수
+        queue_size: 단계 사이 큐의 최대 길이 (가득 차면 앞 단계가 대기)
+
+    Returns:
+        dict: 키워드별 검색/신규 도서 수, 검색에 실패한 키워드, 임베딩/저장 결과
+    """
+    processed_isbns = set() if processed_isbns is None else processed_isbns
+    stats = {
+        "keywords": {},
+        "fetch_failed": [],
+        "embedded": 0,
+        "failed": 0,
+        "persisted": 0,
+    }
+    tracker = _KeywordTracker(stats, on_keyword_done)
+
+    keyword_queue = asyncio.Queue()
+    fetched_queue = asyncio.Queue(maxsize=queue_size)
+    embed_queue = asyncio.Queue(maxsize=queue_size)
+    persist_queue = asyncio.Queue(maxsize=queue_size)
+
+    for keyword in keywords:
+        keyword_queue.put_nowait(keyword)
+    for _ in range(fetch_concurrency):
+        keyword_queue.put_nowait(_DONE)
+
+    # 한 단계에서 처리되지 않은 예외가 발생하면 TaskGroup이 나머지 단계를 모두 취소
+    async with asyncio.TaskGroup() as tg:
+        fetchers = [
+            tg.create_task(
+                _fetch_worker(keyword_queue, fetched_queue, fetch_books, stats)
+            )
+            for _ in range(fetch_concurrency)
+        ]
+        deduper = tg.create_task(
+            _dedupe_stage(
+                fetched_queue,
+                embed_queue,
+                processed_isbns,
+                embed_batch_size,
+                stats,
+                tracker,
+            )
+        )
+        embedders = [
+            tg.create_task(
+                _embed_worker(embed_queue, persist_queue, embed_books, stats, tracker)
+            )
+            for _ in range(embed_concurrency)
+        ]
+        tg.create_task(
+            _persist_stage(persist_queue, persist, chunk_size, stats, tracker)
+        )
+
+        # 앞 단계가 끝나면 다음 단계에 종료 표시를 보냄
+        await asyncio.gather(*fetchers)
+        await fetched_queue.put(_DONE)
+        await deduper
+        for _ in range(embed_concurrency):
+            await embed_queue.put(_DONE)
+        await asyncio.gather(*embedders)
+        await persist_queue.put(_DONE)
+    return stats
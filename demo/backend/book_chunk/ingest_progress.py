@@ -0,0 +1,99 @@
+"""
+도서 수집 진행 상황 체크포인트
+
+SQLite 파일 하나(ingest_progress.db)에 아래 정보를 저장합니다.
+- processed_isbns : 저장이 끝난 도서의 ISBN 인덱스
+- keywords        : 모든 도서 저장이 끝난 키워드 (재시작 시 검색을 건너뜀)
+- chunks          : 저장된 청크 번호와 도서 수
+
+청크를 저장할 때마다 ISBN과 청크 번호를 한 트랜잭션으로 기록하므로,
+중단된 수집을 다시 시작할 때 청크 파일을 읽지 않고 바로 이어서 진행할 수 있습니다.
+"""
+
+import os
+import sqlite3
+import threading
+
+BOOK_CHUNK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRESS_DB_PATH = os.path.join(BOOK_CHUNK_DIR, "ingest_progress.db")
+
+
+class IngestProgress:
+    def __init__(self, db_path=PROGRESS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.executescript(
+            """
+        CREATE TABLE IF NOT EXISTS processed_isbns (
+            isbn TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS keywords (
+            keyword TEXT PRIMARY KEY,
+            total INTEGER NOT NULL,
+            new INTEGER NOT NULL,
+            completed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            chunk_number INTEGER PRIMARY KEY,
+            book_count INTEGER NOT NULL,
+            saved_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        )
+        self._conn.commit()
+
+    def is_empty(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM processed_isbns)"
+                " OR EXISTS (SELECT 1 FROM chunks)"
+            ).fetchone()
+        return not row[0]
+
+    def processed_isbns(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT isbn FROM processed_isbns").fetchall()
+        return {row[0] for row in rows}
+
+    def completed_keywords(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT keyword FROM keywords").fetchall()
+        return {row[0] for row in rows}
+
+    def next_chunk_number(self, default=0):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(chunk_number) FROM chunks").fetchone()
+        return default if row[0] is None else max(default, row[0] + 1)
+
+    def add_isbns(self, isbns):
+        """청크와 무관하게 ISBN을 기록합니다. (기존 청크 파일로 인덱스를 처음 만들 때 사용)"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_isbns (isbn) VALUES (?)",
+                ((isbn,) for isbn in isbns),
+            )
+
+    def record_chunk(self, chunk_number, isbns):
+        """저장된 청크의 ISBN과 청크 번호를 한 트랜잭션으로 기록합니다."""
+        isbns = list(isbns)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_isbns (isbn) VALUES (?)",
+                ((isbn,) for isbn in isbns),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (chunk_number, book_count) VALUES (?, ?)",
+                (chunk_number, len(isbns)),
+            )
+
+    def complete_keyword(self, keyword, total, new):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO keywords (keyword, total, new) VALUES (?, ?, ?)",
+                (keyword, total, new),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,26 +1,46 @@
+import asyncio
 import os
 import pickle
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import numpy as np
+# python save_book_info.py로 실행해도 백엔드 패키지(llm_service)를 찾을 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import requests
+from book_store import (
+    BOOK_CHUNK_DIR,
+    append_books,
+    convert_pickle_chunks,
+    read_store_ids,
+)
+from book_summary import summarize_books
 from dotenv import load_dotenv
+from ingest_pipeline import run_ingestion_pipeline
+from ingest_progress import IngestProgress
+from llm_service.embedding_cache import get_embedding_cache
+from llm_service.llm_client import (
+    UPSTAGE_BASE_URL,
+    estimate_tokens,
+    get_llm_client,
+    is_rate_limited,
+)
 from openai import OpenAI
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
 
 # API KEY 및 파일 경로 설정
 KAKAO_API_KEY = os.getenv("KAKAO_API_KEY")
 UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BOOK_CHUNK_DIR = os.path.join(BASE_DIR, "book_chunk")
 
 # Solar Embeddings 설정
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
+solar_client = OpenAI(api_key=UPSTAGE_API_KEY, base_url=UPSTAGE_BASE_URL)
 
 # 검색할 키워드 리스트 정의
 search_keywords = [
@@ -76,115 +96,134 @@ search_keywords = [
 ]
 
 
-def cosine_similarity(vec1, vec2):
-    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
-
-
-def fetch_books_by_keyword(keyword, total_count=300):
-    """키워드로 도서를 검색하는 함수"""
-    url = "https://dapi.kakao.com/v3/search/book"
-    headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
-
-    all_books = []
-    page = 1
-
-    while len(all_books) < total_count:
-        params = {
-            "query": keyword,
-            "size": min(50, total_count - len(all_books)),
-            "page": page,
-            "target": "title",
-        }
-
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            break
-
-        result = response.json()
-        books = result.get("documents", [])
-        if not books:
-            break
-
-        all_books.extend(books)
-        page += 1
-
-    return all_books
-
-
-from functools import lru_cache
-
-
-@lru_cache(maxsize=1000)
-def create_embedding(text, max_retries=3, base_timeout=10):
-    """텍스트의 임베딩을 생성하는 함수 (캐싱 적용, 재시도 메커니즘 포함)"""
-    for attempt in range(max_retries):
-        start_time = time.time()
-        timeout = base_timeout * (attempt + 1)  # 재시도마다 타임아웃 증가
-
-        try:
-            embedding_response = solar_client.embeddings.create(
-                input=text, model="embedding-passage"
+# Kakao 도서 검색 API 설정 (size는 최대 50, page는 최대 50까지 허용)
+KAKAO_BOOK_SEARCH_URL = "https://dapi.kakao.com/v3/search/book"
+KAKAO_PAGE_SIZE = 50
+# 동시에 열어둘 최대 연결 수 (키워드 동시성 x 키워드당 페이지 수 정도)
+KAKAO_POOL_SIZE = 12
+# (연결, 응답) 타임아웃(초)
+KAKAO_TIMEOUT = (3.05, 10)
+
+_kakao_session = None
+_kakao_session_lock = threading.Lock()
+
+
+def get_kakao_session():
+    """
+    Kakao API용 공유 세션을 반환하는 함수 (처음 호출할 때 생성)
+    연결을 재사용(keep-alive)하고, 429/5xx 응답은 Retry-After를 지키며 지수 백오프로 재시도합니다.
+    """
+    global _kakao_session
+    with _kakao_session_lock:
+        if _kakao_session is None:
+            retry = Retry(
+                total=4,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=KAKAO_POOL_SIZE,
+                pool_block=True,
+                max_retries=retry,
             )
+            session = requests.Session()
+            session.headers["Authorization"] = f"KakaoAK {KAKAO_API_KEY}"
+            session.mount("https://", adapter)
+            _kakao_session = session
+        return _kakao_session
+
+
+def fetch_book_page(keyword, page, size):
+    """
+    검색 결과 한 페이지를 가져오는 함수
+    Returns:
+        (도서 리스트, 마지막 페이지 여부). 요청이 실패하면 (None, True)
+    """
+    params = {"query": keyword, "size": size, "page": page, "target": "title"}
+    try:
+        response = get_kakao_session().get(
+            KAKAO_BOOK_SEARCH_URL, params=params, timeout=KAKAO_TIMEOUT
+        )
+    except requests.RequestException as e:
+        print(f"\n키워드 '{keyword}' {page}페이지 요청 실패: {str(e)}")
+        return None, True
+    if response.status_code != 200:
+        print(
+            f"\n키워드 '{keyword}' {page}페이지 요청 실패: HTTP {response.status_code}"
+        )
+        return None, True
 
-            processing_time = time.time() - start_time
-            if processing_time > timeout:
-                print(
-                    f"\n경고: 임베딩 처리 시간 초과 ({processing_time:.2f}초), 재시도 {attempt + 1}/{max_retries}"
-                )
-                continue
+    result = response.json()
+    books = result.get("documents", [])
+    return books, result.get("meta", {}).get("is_end", not books)
 
-            # 캐싱을 위해 tuple로 변환
-            return tuple(embedding_response.data[0].embedding)
 
-        except Exception as e:
-            print(f"\n임베딩 생성 중 오류 발생 ({attempt + 1}/{max_retries}): {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(1)  # 재시도 전 잠시 대기
-                continue
-            return None
+class BookFetchError(Exception):
+    """검색 결과 페이지를 가져오지 못한 경우 (키워드를 완료로 기록하지 않고 다음 실행 때 다시 검색)"""
 
-    return None
 
+def fetch_books_by_keyword(keyword, total_count=300):
+    """
+    키워드로 도서를 검색하는 함수
+    필요한 페이지를 동시에 요청하고, 페이지 순서대로 합칩니다. (마지막 페이지 이후의 결과는 사용하지 않음)
+    마지막 페이지 전에 실패한 페이지가 있으면 일부 결과 대신 BookFetchError를 발생시킵니다.
+    """
+    sizes = [
+        min(KAKAO_PAGE_SIZE, total_count - start)
+        for start in range(0, total_count, KAKAO_PAGE_SIZE)
+    ]
+    if not sizes:
+        return []
 
-def load_existing_books():
-    """청크 파일들로부터 모든 도서 데이터를 로드하는 함수"""
-    all_books = {}
+    with ThreadPoolExecutor(max_workers=len(sizes)) as executor:
+        pages = list(
+            executor.map(
+                lambda args: fetch_book_page(keyword, *args),
+                enumerate(sizes, start=1),
+            )
+        )
 
-    for chunk_file in os.listdir(BOOK_CHUNK_DIR):
-        if chunk_file.startswith("books_chunk_") and chunk_file.endswith(".pkl"):
-            try:
-                with open(os.path.join(BOOK_CHUNK_DIR, chunk_file), "rb") as f:
-                    chunk_data = pickle.load(f)
-                    all_books.update(chunk_data)
-            except Exception as e:
-                print(f"경고: 청크 파일 '{chunk_file}' 로드 중 오류 발생: {str(e)}")
+    all_books = []
+    for page, (books, is_end) in enumerate(pages, start=1):
+        if books is None:
+            raise BookFetchError(f"키워드 '{keyword}' {page}페이지 요청 실패")
+        if not books:
+            break
+        all_books.extend(books)
+        if is_end:
+            break
 
     return all_books
 
 
 def load_progress():
-    """진행 상황을 로드하는 함수"""
-    try:
-        with open("progress.pkl", "rb") as f:
-            return pickle.load(f)
-    except FileNotFoundError:
-        return {
-            "completed_keywords": set(),  # 처리 완료된 키워드 집합
-            "last_processed_chunk": None,  # 마지막으로 처리된 청크 ID
-            "completed_chunks": set(),  # 처리 완료된 청크 집합
-        }
-
-
-def save_progress(progress):
-    """진행 상황을 저장하는 함수"""
-    with open("progress.pkl", "wb") as f:
-        pickle.dump(progress, f)
+    """
+    진행 상황(ingest_progress.db)을 여는 함수
+    처음 실행할 때만 기존 pickle 청크를 벡터 저장소로 변환하고 저장소의 ISBN으로 인덱스를 만들며,
+    이후에는 인덱스만 읽습니다.
+    """
+    progress = IngestProgress(os.path.join(BOOK_CHUNK_DIR, "ingest_progress.db"))
+    if progress.is_empty():
+        convert_pickle_chunks(BOOK_CHUNK_DIR)
+        progress.add_isbns(load_processed_isbns())
+    return progress
+
+
+def load_processed_isbns():
+    """
+    벡터 저장소에 이미 저장된 ISBN 집합을 만드는 함수
+    검색은 저장소만 읽으므로, 저장소에 없는 도서(pickle 청크에만 있는 도서 등)는 처리된 것으로 보지 않습니다.
+    """
+    return {isbn.decode() for isbn in read_store_ids(BOOK_CHUNK_DIR)}
 
 
 def process_and_save_books_in_chunks():
     """청크 단위로 도서 정보를 처리하는 함수"""
     chunk_size = 1000
-    processed_isbns = set()
     total_processed = 0
     keyword_stats = {}
 
@@ -194,17 +233,10 @@ def process_and_save_books_in_chunks():
     print("\n=== 도서 정보 수집 시작 ===")
     print(f"청크 크기: {chunk_size}")
 
-    # 기존 처리된 ISBN 로드 부분 수정
+    # 기존 처리된 ISBN 로드 (체크포인트 인덱스 사용)
     print("\n1. 기존 처리된 도서 정보 로드 중...")
-    for chunk_file in tqdm(os.listdir(BOOK_CHUNK_DIR), desc="청크 파일 검사"):
-        if chunk_file.startswith("books_chunk_") and chunk_file.endswith(".pkl"):
-            try:
-                with open(os.path.join(BOOK_CHUNK_DIR, chunk_file), "rb") as f:
-                    chunk_data = pickle.load(f)
-                    processed_isbns.update(chunk_data.keys())
-            except Exception as e:
-                print(f"경고: 청크 파일 '{chunk_file}' 로드 중 오류 발생: {str(e)}")
-
+    progress = load_progress()
+    processed_isbns = progress.processed_isbns()
     print(f"- 기존 처리된 도서 수: {len(processed_isbns)}개")
 
     # 중복 키워드 제거
@@ -213,8 +245,8 @@ def process_and_save_books_in_chunks():
     print(f"- 키워드 목록: {', '.join(unique_keywords)}")
 
     try:
-        chunk_number = len(
-            [f for f in os.listdir(BOOK_CHUNK_DIR) if f.startswith("books_chunk_")]
+        chunk_number = progress.next_chunk_number(
+            len([f for f in os.listdir(BOOK_CHUNK_DIR) if f.startswith("books_chunk_")])
         )
         print(f"\n3. 청크 처리 시작 (현재 청크 번호: {chunk_number})")
 
@@ -226,7 +258,11 @@ def process_and_save_books_in_chunks():
             keyword_stats[keyword] = {"total": 0, "new": 0, "processed": 0}
 
             # 키워드로 도서 검색
-            books = fetch_books_by_keyword(keyword)
+            try:
+                books = fetch_books_by_keyword(keyword)
+            except BookFetchError as e:
+                print(f"- 검색 실패, 건너뜀: {str(e)}")
+                continue
             keyword_stats[keyword]["total"] = len(books)
             print(f"- 검색된 도서: {len(books)}개")
 
@@ -245,7 +281,7 @@ def process_and_save_books_in_chunks():
                         print("\n- 청크 처리 중...")
                         processed_chunk = process_chunk(list(current_chunk.values()))
                         if processed_chunk:
-                            save_chunk(processed_chunk, chunk_number)
+                            save_chunk(processed_chunk, chunk_number, progress=progress)
                             processed_isbns.update(processed_chunk.keys())
                             processed_in_keyword += len(processed_chunk)
                             new_books += len(processed_chunk)
@@ -258,7 +294,7 @@ def process_and_save_books_in_chunks():
                 print("\n- 남은 도서 처리 중...")
                 processed_chunk = process_chunk(list(current_chunk.values()))
                 if processed_chunk:
-                    save_chunk(processed_chunk, chunk_number)
+                    save_chunk(processed_chunk, chunk_number, progress=progress)
                     processed_isbns.update(processed_chunk.keys())
                     processed_in_keyword += len(processed_chunk)
                     total_processed += len(processed_chunk)
@@ -276,7 +312,7 @@ def process_and_save_books_in_chunks():
             print("- 마지막 청크 저장 중...")
             processed_chunk = process_chunk(list(current_chunk.values()))
             if processed_chunk:
-                save_chunk(processed_chunk, chunk_number)
+                save_chunk(processed_chunk, chunk_number, progress=progress)
                 total_processed += len(processed_chunk)
 
     except Exception as e:
@@ -286,7 +322,7 @@ def process_and_save_books_in_chunks():
             print("- 마지막 청크 저장 중...")
             processed_chunk = process_chunk(list(current_chunk.values()))
             if processed_chunk:
-                save_chunk(processed_chunk, chunk_number)
+                save_chunk(processed_chunk, chunk_number, progress=progress)
                 total_processed += len(processed_chunk)
 
     finally:
@@ -294,69 +330,134 @@ def process_and_save_books_in_chunks():
         print(f"- 총 처리된 새로운 도서: {total_processed}개")
         print(f"- 전체 저장된 도서: {len(processed_isbns)}개")
         print(f"- 생성된 청크 파일 수: {chunk_number}개")
-
-
-def find_similar_books(query_text, top_k=5):
-    """쿼리와 가장 유사한 도서를 찾는 함수"""
-    all_books_data = load_existing_books()
-
-    query_embedding = create_embedding(query_text)
-    if not query_embedding:
-        return []
-
-    similarities = []
-    for isbn, book_data in all_books_data.items():
-        similarity = np.dot(query_embedding, book_data["embedding"]) / (
-            np.linalg.norm(query_embedding) * np.linalg.norm(book_data["embedding"])
+        cache_stats = get_embedding_cache().stats()
+        print(
+            f"- 임베딩 캐시: 적중 {cache_stats['hits']}회, 미스 {cache_stats['misses']}회"
         )
-        similarities.append((similarity, book_data))
-
-    return sorted(similarities, key=lambda x: x[0], reverse=True)[:top_k]
-
-
-from concurrent.futures import ThreadPoolExecutor
 
 
-def process_single_book(book, max_retries=3):
-    """단일 도서 처리 및 임베딩 생성 (재시도 포함)"""
-    process_start_time = time.time()
-
-    isbn = book.get("isbn", "").split(" ")[0]
-    if not isbn:
-        return None, "skip"
-
-    contents = book.get("contents", "")
-    if not contents:
-        return None, "skip"
-
-    for attempt in range(max_retries):
-        # 임베딩 생성 (캐싱 적용)
-        embedding = create_embedding(contents)
-        if embedding:
-            return {
-                "isbn": isbn,
-                "title": book.get("title"),
-                "authors": book.get("authors"),
-                "publisher": book.get("publisher"),
-                "contents": contents,
-                "thumbnail": book.get("thumbnail"),
-                "embedding": list(embedding),  # tuple을 list로 변환
-                "timestamp": datetime.now().isoformat(),
-                "processing_time": time.time() - process_start_time,
-                "attempts": attempt + 1,
-            }, "success"
-
+# 임베딩 API 한 번의 요청에 담을 최대 입력 수와 토큰 수 (Upstage embeddings 제한보다 여유 있게)
+EMBEDDING_BATCH_MAX_ITEMS = 100
+EMBEDDING_BATCH_MAX_TOKENS = 100000
+# 입력 하나의 최대 글자 수 (초과하는 텍스트는 글자 단위로 잘라서 임베딩)
+# 임베딩 입력 제한(4000토큰)에 맞춘 값으로, estimate_tokens와 같이 한 글자를 1토큰 이하로 보고 잡은 상한입니다.
+EMBEDDING_MAX_INPUT_CHARS = 4000
+# 재시도 후에도 요청 한도 초과(429)로 실패한 배치를 다시 요청하는 최대 횟수
+EMBEDDING_RATE_LIMIT_ROUNDS = 3
+
+
+def make_embedding_batches(texts):
+    """텍스트 리스트를 입력 수/토큰 수 제한에 맞는 배치(인덱스 리스트)로 나누는 함수"""
+    batches = []
+    current, current_tokens = [], 0
+    for idx, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= EMBEDDING_BATCH_MAX_ITEMS
+            or current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def request_embeddings_batch(texts):
+    """
+    여러 텍스트를 한 번의 요청으로 임베딩하는 함수
+    요청 한도 초과(429)와 일시적인 오류는 공유 호출기(llm_service.llm_client)가 재시도하고,
+    그 밖의 오류는 배치를 절반으로 나눠 다시 요청하므로 문제가 있는 입력만 실패(None)로 남습니다.
+    재시도 후에도 429이면 오류를 그대로 올려 create_embeddings가 배치를 다시 요청하게 합니다.
+    """
+    try:
+        response = get_llm_client().call(
+            solar_client.embeddings.create,
+            input=texts,
+            model="embedding-passage",
+            name="embedding-passage",
+            tokens=sum(estimate_tokens(text) for text in texts),
+        )
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+    except Exception as e:
+        if is_rate_limited(e):
+            raise
+        error = e
+
+    if len(texts) > 1:
+        mid = len(texts) // 2
+        return request_embeddings_batch(texts[:mid]) + request_embeddings_batch(
+            texts[mid:]
+        )
+    print(f"\n임베딩 생성 중 오류 발생: {str(error)}")
+    return [None]
+
+
+def create_embeddings(texts, max_workers=4):
+    """
+    텍스트 리스트의 임베딩을 생성하는 함수 (입력과 같은 순서, 실패한 항목은 None)
+    캐시에 없는 텍스트만 크기 제한에 맞춘 배치 요청으로 병렬 처리하고,
+    요청 한도 초과로 실패한 배치는 최대 EMBEDDING_RATE_LIMIT_ROUNDS번 다시 요청합니다.
+    """
+    cache = get_embedding_cache()
+    texts = [text[:EMBEDDING_MAX_INPUT_CHARS] for text in texts]
+    embeddings = cache.get_many("embedding-passage", texts)
+
+    # 캐시에 없는 텍스트만 중복 없이 요청
+    missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+    batches = [[missing[i] for i in batch] for batch in make_embedding_batches(missing)]
+    created = {}
+    for attempt in range(EMBEDDING_RATE_LIMIT_ROUNDS + 1):
+        rate_limited = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (batch, executor.submit(request_embeddings_batch, batch))
+                for batch in batches
+            ]
+            for batch, future in futures:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    if not is_rate_limited(e):
+                        raise
+                    rate_limited.append(batch)
+                    continue
+                succeeded = [
+                    (text, embedding)
+                    for text, embedding in zip(batch, results)
+                    if embedding is not None
+                ]
+                # 배치마다 한 번의 트랜잭션으로 캐시에 저장
+                cache.put_many("embedding-passage", succeeded)
+                created.update(succeeded)
+        if not rate_limited:
+            break
+        if attempt == EMBEDDING_RATE_LIMIT_ROUNDS:
+            print(
+                f"\n요청 한도 초과로 배치 {len(rate_limited)}개의 임베딩을 만들지 못했습니다."
+            )
+            break
+        # 공유 호출기가 동시 요청 수를 줄인 상태로 남은 배치만 다시 요청
         print(
-            f"\n임베딩 생성 실패 ({attempt + 1}/{max_retries}){', 재시도 중...' if attempt < max_retries - 1 else ', 최대 시도 횟수 초과'}"
+            f"\n요청 한도 초과로 실패한 배치 {len(rate_limited)}개를 다시 요청합니다."
         )
-        if attempt < max_retries - 1:
-            time.sleep(1)
+        batches = rate_limited
 
-    return None, "timeout"
+    return [
+        embedding if embedding is not None else created.get(text)
+        for text, embedding in zip(texts, embeddings)
+    ]
 
 
-def process_chunk(books):
-    """도서 데이터를 병렬로 처리하고 임베딩을 생성하는 함수"""
+def process_chunk(books, verbose=True, summarize=True):
+    """
+    도서 데이터의 임베딩을 배치 요청으로 생성하는 함수
+    summarize=True면 도서별 내용 요약(book_summary.py)도 만들어 summary 필드에 저장합니다.
+    """
+    process_start_time = time.time()
     chunk_data = {}
     books_list = list(books)  # dict_values를 리스트로 변환
     total_books = len(books_list)
@@ -365,63 +466,146 @@ def process_chunk(books):
     if total_books == 0:
         return chunk_data
 
-    # 시스템 CPU 코어 수에 따라 worker 수 조정
-    max_workers = min(os.cpu_count() or 4, 8)  # 최대 8개
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 배치 크기 조정
-        batch_size = 15
-        for i in range(0, total_books, batch_size):
-            batch = books_list[i : i + batch_size]
-
-            # 배치 단위로 병렬 처리
-            futures = [executor.submit(process_single_book, book) for book in batch]
-
-            # 결과 수집
-            for future in tqdm(
-                futures,
-                desc=f"배치 처리 중 ({i+1}-{min(i+batch_size, total_books)}/{total_books})",
-                unit="권",
-            ):
-                try:
-                    result, status = future.result(timeout=30)  # 타임아웃 설정
-
-                    if status == "success" and result is not None:
-                        chunk_data[result["isbn"]] = result
-                        success_count += 1
-                    elif status == "skip":
-                        skip_count += 1
-                    else:  # timeout
-                        timeout_count += 1
+    targets = []
+    for book in books_list:
+        isbn = book.get("isbn", "").split(" ")[0]
+        contents = book.get("contents", "")
+        if not isbn or not contents:
+            skip_count += 1
+            continue
+        targets.append((isbn, book))
+
+    embeddings = create_embeddings([book["contents"] for _, book in targets])
+    # 임베딩에 성공한 도서만 요약 (실패한 요약은 None으로 두고 보고서 생성 시 다시 요약)
+    summaries = {}
+    if summarize:
+        embedded = [
+            (isbn, book["contents"])
+            for (isbn, book), embedding in zip(targets, embeddings)
+            if embedding is not None
+        ]
+        summaries = {
+            isbn: summary
+            for (isbn, _), summary in zip(
+                embedded, summarize_books([contents for _, contents in embedded])
+            )
+        }
 
-                except Exception as e:
-                    print(f"\n도서 처리 중 오류 발생: {str(e)}")
-                    timeout_count += 1
+    for (isbn, book), embedding in zip(targets, embeddings):
+        if embedding is None:
+            timeout_count += 1
+            continue
+        chunk_data[isbn] = {
+            "isbn": isbn,
+            "title": book.get("title"),
+            "authors": book.get("authors"),
+            "publisher": book.get("publisher"),
+            "contents": book["contents"],
+            "thumbnail": book.get("thumbnail"),
+            "summary": summaries.get(isbn),
+            "embedding": list(embedding),
+            "timestamp": datetime.now().isoformat(),
+            "processing_time": time.time() - process_start_time,
+        }
+        success_count += 1
 
     # 처리 결과 출력
-    print(f"\n청크 처리 결과:")
-    print(f"- 전체 도서: {total_books}권")
-    print(f"- 성공: {success_count}권")
-    print(f"- 건너뛰기: {skip_count}권")
-    print(f"- 시간초과: {timeout_count}권")
+    if verbose:
+        print(f"\n청크 처리 결과:")
+        print(f"- 전체 도서: {total_books}권")
+        print(f"- 성공: {success_count}권")
+        print(f"- 건너뛰기: {skip_count}권")
+        print(f"- 실패: {timeout_count}권")
 
     return chunk_data
 
 
-def save_chunk(books_chunk, chunk_number):
-    """청크 데이터를 파일로 저장하는 함수"""
-    if books_chunk:  # 청크에 데이터가 있는 경우에만 저장
+def save_chunk(books_chunk, chunk_number, fmt="store", progress=None):
+    """
+    청크 데이터를 파일로 저장하는 함수
+    fmt="store": 벡터 저장소(book_store.py)에 추가, fmt="pickle": books_chunk_{n}.pkl로 저장
+    progress가 주어지면 저장이 끝난 뒤 청크의 ISBN을 체크포인트에 기록합니다.
+    """
+    if books_chunk and fmt == "store":
+        added = append_books(books_chunk.values(), BOOK_CHUNK_DIR)
+        print(f"청크 {chunk_number} 저장소에 추가 완료 (도서 {added}개)")
+    elif books_chunk:  # 청크에 데이터가 있는 경우에만 저장
         chunk_filename = os.path.join(BOOK_CHUNK_DIR, f"books_chunk_{chunk_number}.pkl")
         with open(chunk_filename, "wb") as f:
             pickle.dump(books_chunk, f)
         print(f"청크 {chunk_number} 저장 완료 (도서 {len(books_chunk)}개)")
+    if books_chunk and progress is not None:
+        progress.record_chunk(chunk_number, books_chunk.keys())
+
+
+def process_and_save_books_async(
+    fetch_concurrency=2, embed_concurrency=4, chunk_size=1000
+):
+    """
+    asyncio 파이프라인(ingest_pipeline.py)으로 도서 정보를 처리하는 함수
+    키워드 검색, 임베딩 생성, 저장이 단계별로 겹쳐서 진행됩니다.
+    """
+    os.makedirs(BOOK_CHUNK_DIR, exist_ok=True)
+
+    print("\n=== 도서 정보 수집 시작 (파이프라인) ===")
+    print(f"- 검색 동시성: {fetch_concurrency}, 임베딩 동시성: {embed_concurrency}")
+    progress = load_progress()
+    processed_isbns = progress.processed_isbns()
+    print(f"- 기존 처리된 도서 수: {len(processed_isbns)}개")
+
+    # 이전 실행에서 완료된 키워드는 검색하지 않음
+    completed_keywords = progress.completed_keywords()
+    unique_keywords = [
+        keyword
+        for keyword in dict.fromkeys(search_keywords)
+        if keyword not in completed_keywords
+    ]
+    print(
+        f"- 처리할 키워드: {len(unique_keywords)}개 (완료된 키워드 {len(completed_keywords)}개 제외)"
+    )
+    chunk_number = progress.next_chunk_number(
+        len([f for f in os.listdir(BOOK_CHUNK_DIR) if f.startswith("books_chunk_")])
+    )
+
+    def persist(chunk):
+        nonlocal chunk_number
+        save_chunk(chunk, chunk_number, progress=progress)
+        chunk_number += 1
+
+    stats = asyncio.run(
+        run_ingestion_pipeline(
+            unique_keywords,
+            fetch_books=fetch_books_by_keyword,
+            embed_books=lambda books: process_chunk(books, verbose=False),
+            persist=persist,
+            processed_isbns=processed_isbns,
+            on_keyword_done=progress.complete_keyword,
+            fetch_concurrency=fetch_concurrency,
+            embed_concurrency=embed_concurrency,
+            embed_batch_size=EMBEDDING_BATCH_MAX_ITEMS,
+            chunk_size=chunk_size,
+        )
+    )
+
+    print("\n=== 처리 완료 ===")
+    for keyword, keyword_stats in stats["keywords"].items():
+        print(
+            f"- '{keyword}': 검색 {keyword_stats['total']}권, 신규 {keyword_stats['new']}권"
+        )
+    if stats["fetch_failed"]:
+        print(
+            f"- 검색 실패 키워드 (다음 실행 때 다시 검색): {', '.join(stats['fetch_failed'])}"
+        )
+    print(f"- 임베딩 성공: {stats['embedded']}권, 실패: {stats['failed']}권")
+    print(f"- 저장된 도서: {stats['persisted']}권")
+    return stats
 
 
 if __name__ == "__main__":
     start_time = datetime.now()
     print(f"처리 시작 시간: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    process_and_save_books_in_chunks()
+    process_and_save_books_async()
 
     end_time = datetime.now()
     processing_time = end_time - start_time
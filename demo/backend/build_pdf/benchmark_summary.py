@@ -0,0 +1,155 @@
+"""
+객관식 요약 방식 비교 벤치마크
+
+two_step(영어 생성 -> 번역 모델로 번역)과 single(한국어로 한 번에 생성)의
+사용자당 지연 시간, 토큰 수, 호출 수, 숫자 포함(재생성 필요) 비율을 비교합니다.
+
+사용법:
+    # API를 호출해 응답, 지연 시간, 토큰 사용량을 기록 (UPSTAGE_API_KEY 필요)
+    python benchmark_summary.py --record
+
+    # 기록된 결과로 비교표 출력 (API 호출 없음)
+    python benchmark_summary.py
+
+비교표는 실제 API로 기록한 fixtures/summary_recordings.json만 사용합니다.
+fixtures/summary_recordings_stub.json은 대체 서버(llm_service/stub_server.py)로 기록한
+테스트용 데이터로, 기록 형식을 확인하는 데만 쓰며 방식 비교에는 쓰지 않습니다.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+# python benchmark_summary.py로 실행해도 백엔드 패키지(db, llm_service)를 찾을 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feedback_summary import CHAIN_SPECS, MULTIPLE_FORBIDDEN
+from llm_service.llm_client import get_chat_model
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+INPUTS_PATH = os.path.join(FIXTURE_DIR, "summary_inputs.json")
+RECORDINGS_PATH = os.path.join(FIXTURE_DIR, "summary_recordings.json")
+# 대체 서버로 기록한 테스트용 데이터 (응답과 지연 시간이 실제 API와 달라 비교에 사용하지 않음)
+STUB_RECORDINGS_PATH = os.path.join(FIXTURE_DIR, "summary_recordings_stub.json")
+
+# 방식별 호출 순서 (체인 이름), 앞 호출의 응답이 다음 호출의 입력이 됨
+MODE_STEPS = {
+    "two_step": ["multiple", "translation"],
+    "single": ["multiple_ko"],
+}
+
+
+def record_call(chain_name, text):
+    """체인 한 번을 호출하고 응답, 지연 시간, 토큰 사용량을 기록"""
+    prompt, model = CHAIN_SPECS[chain_name]
+    start = time.monotonic()
+    message = (prompt | get_chat_model(model)).invoke({"text": text})
+    latency = time.monotonic() - start
+    usage = message.usage_metadata or {}
+    return {
+        "chain": chain_name,
+        "model": model,
+        "latency": latency,
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "text": message.content,
+    }
+
+
+def record(inputs, modes=MODE_STEPS, repeat=1):
+    """
+    입력마다 각 방식을 실제로 호출해 기록합니다. (캐시와 재생성 없이 한 번씩 호출)
+    Returns:
+        list: [{"mode", "username", "calls": [record_call 결과, ...]}, ...]
+    """
+    recordings = []
+    for _ in range(repeat):
+        for item in inputs:
+            for mode, steps in modes.items():
+                text = item["text"]
+                calls = []
+                for chain_name in steps:
+                    call = record_call(chain_name, text)
+                    calls.append(call)
+                    text = call["text"]
+                recordings.append(
+                    {"mode": mode, "username": item["username"], "calls": calls}
+                )
+    return recordings
+
+
+def percentile(values, q):
+    """values의 q 분위수 (최근접 순위)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize_recordings(recordings):
+    """
+    기록을 방식별로 집계합니다.
+    지연 시간과 토큰은 사용자 한 명의 요약을 만드는 데 든 값(호출 합계) 기준입니다.
+    violation_rate는 최종 응답에 숫자가 포함되어 재생성이 필요했을 비율입니다.
+    """
+    results = {}
+    for mode in dict.fromkeys(rec["mode"] for rec in recordings):
+        runs = [rec for rec in recordings if rec["mode"] == mode]
+        latencies = [sum(call["latency"] for call in rec["calls"]) for rec in runs]
+        tokens = [
+            sum(call["input_tokens"] + call["output_tokens"] for call in rec["calls"])
+            for rec in runs
+        ]
+        violations = sum(
+            bool(MULTIPLE_FORBIDDEN.search(rec["calls"][-1]["text"])) for rec in runs
+        )
+        results[mode] = {
+            "runs": len(runs),
+            "calls_per_summary": statistics.mean(len(rec["calls"]) for rec in runs),
+            "latency_mean": statistics.mean(latencies),
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+            "tokens_mean": statistics.mean(tokens),
+            "violation_rate": violations / len(runs),
+        }
+    return results
+
+
+def print_summary(results):
+    print(
+        f"{'mode':<10} {'runs':>5} {'calls':>6} {'mean(s)':>8} {'p50(s)':>8} "
+        f"{'p95(s)':>8} {'tokens':>8} {'digits':>7}"
+    )
+    for mode, result in results.items():
+        print(
+            f"{mode:<10} {result['runs']:>5} {result['calls_per_summary']:>6.1f} "
+            f"{result['latency_mean']:>8.2f} {result['latency_p50']:>8.2f} "
+            f"{result['latency_p95']:>8.2f} {result['tokens_mean']:>8.0f} "
+            f"{result['violation_rate']:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="객관식 요약 방식 비교")
+    parser.add_argument("--record", action="store_true", help="API를 호출해 새로 기록")
+    parser.add_argument("--repeat", type=int, default=1, help="기록 반복 횟수")
+    args = parser.parse_args()
+
+    if args.record:
+        with open(INPUTS_PATH, encoding="utf-8") as f:
+            inputs = json.load(f)
+        recordings = record(inputs, repeat=args.repeat)
+        with open(RECORDINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump(recordings, f, ensure_ascii=False, indent=2)
+        print(f"기록 저장: {RECORDINGS_PATH} ({len(recordings)}건)")
+    else:
+        if not os.path.exists(RECORDINGS_PATH):
+            raise SystemExit(
+                "기록된 결과가 없습니다. 먼저 --record 옵션으로 기록해주세요."
+            )
+        with open(RECORDINGS_PATH, encoding="utf-8") as f:
+            recordings = json.load(f)
+
+    print_summary(summarize_recordings(recordings))
@@ -1,12 +1,21 @@
 import os
-import pickle
-import sqlite3
-import time
 
 import numpy as np
+from book_chunk.book_ivf import DEFAULT_NPROBE, search_ivf
+from book_chunk.book_pq import DEFAULT_RERANK_K, search_pq
+from book_chunk.book_summary import summarize_book_content
 from db.models.qa import DB_PATH as FEEDBACK_DB_PATH
+from db.models.qa import connect_feedback_db, get_current_cycle_id
 from dotenv import load_dotenv
-from load_book_chunk import BOOK_CHUNK_CACHE
+from llm_service.embedding_cache import get_embedding_cache
+from llm_service.llm_client import UPSTAGE_BASE_URL, estimate_tokens, get_llm_client
+from llm_service.response_cache import get_response_cache
+from load_book_chunk import (
+    get_book_ann_index,
+    get_book_index,
+    get_book_pq_index,
+    normalize_rows,
+)
 from openai import OpenAI
 
 load_dotenv(
@@ -14,40 +23,104 @@ load_dotenv(
 )
 
 UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
+solar_client = OpenAI(api_key=UPSTAGE_API_KEY, base_url=UPSTAGE_BASE_URL)
 
-BOOK_CHUNK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "book_chunk")
 
+def batch_search_books(
+    query_embeddings,
+    top_k=3,
+    exclude_isbns=None,
+    batch_size=256,
+    nprobe=DEFAULT_NPROBE,
+    rerank_k=DEFAULT_RERANK_K,
+):
+    """
+    여러 쿼리 임베딩에 대해 한 번에 도서를 검색합니다.
+    IVF 인덱스가 있으면 nprobe개의 리스트만 비교하는 근사 검색을,
+    IVF 대신 PQ 인덱스가 있으면 압축 코드로 근사한 상위 rerank_k개를 재정렬하는 검색을,
+    둘 다 없거나 꺼져 있으면(None) 한 번의 행렬-행렬 곱으로 정확한 검색을 수행합니다.
 
-def cosine_similarity(vec1, vec2):
-    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+    Args:
+        query_embeddings: 쿼리 임베딩 리스트 (m, dim)
+        top_k: 쿼리별 추천 도서 수
+        exclude_isbns: 쿼리별로 제외할 ISBN 목록의 리스트 (예: 이전 주기에 추천한 도서)
+        batch_size: 정확한 검색에서 한 번에 곱할 쿼리 수 (유사도 행렬 메모리 제한)
+        nprobe: IVF 검색 시 탐색할 리스트 수 (클수록 정확하고 느림)
+        rerank_k: PQ 검색 시 원본 벡터로 다시 계산할 후보 수
 
+    Returns:
+        list: 쿼리별 [(메타데이터, 유사도), ...] 리스트 (유사도 내림차순)
+    """
+    book_embeddings, book_metadata = get_book_index()
+    if len(query_embeddings) == 0:
+        return []
+    if not book_metadata or top_k <= 0:
+        return [[] for _ in query_embeddings]
 
-# --- API 호출 재시도 helper 함수 ---
-def retry_api_call(api_func, *args, max_attempts=3, **kwargs):
-    """API 호출 시 RateLimit (429) 에러에 대해 지수 백오프를 적용하여 재시도"""
-    attempt = 0
-    wait_time = 1
-    last_exception = None
-    while attempt < max_attempts:
-        attempt += 1
-        try:
-            return api_func(*args, **kwargs)
-        except Exception as e:
-            last_exception = e
-            # 메시지나 에러 코드에 '429' 또는 'too_many_requests'가 포함되면 재시도
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-            else:
-                raise
-    raise last_exception
+    queries = normalize_rows(query_embeddings)
+    top_k = min(top_k, len(book_metadata))
 
+    excluded_rows = [np.empty(0, dtype=np.int64) for _ in queries]
+    if exclude_isbns is not None:
+        isbn_rows = {book["isbn"]: row for row, book in enumerate(book_metadata)}
+        excluded_rows = [
+            np.array(
+                [isbn_rows[isbn] for isbn in isbns or () if isbn in isbn_rows],
+                dtype=np.int64,
+            )
+            for isbns in exclude_isbns
+        ]
 
-def analyze_feedback_with_solar(feedback_text):
-    prompt = f"""
+    hits = [None] * len(queries)
+    ann_index = get_book_ann_index() if nprobe else None
+    pq_index = get_book_pq_index() if rerank_k else None
+    if ann_index is not None:
+        hits = search_ivf(
+            ann_index, book_embeddings, queries, top_k, nprobe, excluded_rows
+        )
+    elif pq_index is not None:
+        hits = search_pq(
+            pq_index, book_embeddings, queries, top_k, rerank_k, excluded_rows
+        )
+
+    # 인덱스가 없거나 근사 검색 후보가 부족한 쿼리는 정확한 검색으로 대체
+    exact = [i for i, hit in enumerate(hits) if hit is None]
+    for start in range(0, len(exact), batch_size):
+        block = exact[start : start + batch_size]
+        similarities = queries[block] @ book_embeddings.T
+        for offset, query_idx in enumerate(block):
+            similarities[offset, excluded_rows[query_idx]] = -np.inf
+        top_idx = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        top_sims = np.take_along_axis(similarities, top_idx, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        for offset, query_idx in enumerate(block):
+            hits[query_idx] = (
+                top_idx[offset, order[offset]],
+                top_sims[offset, order[offset]],
+            )
+
+    return [
+        [
+            (book_metadata[i], float(sim))
+            for i, sim in zip(idx_row, sim_row)
+            if np.isfinite(sim)
+        ]
+        for idx_row, sim_row in hits
+    ]
+
+
+def search_books(query_embedding, top_k=3, exclude_isbns=None):
+    """
+    쿼리 임베딩과 코사인 유사도가 가장 높은 도서 top_k개를 (메타데이터, 유사도) 리스트로 반환합니다.
+    """
+    return batch_search_books(
+        [query_embedding],
+        top_k=top_k,
+        exclude_isbns=None if exclude_isbns is None else [exclude_isbns],
+    )[0]
+
+
+ANALYZE_FEEDBACK_PROMPT = """
 다음은 한 직원이 가장 낮은 평가를 받은 항목에 대한 동료들의 피드백입니다:
 {feedback_text}
 
@@ -59,13 +132,28 @@ def analyze_feedback_with_solar(feedback_text):
 - "직장 내에서 시간 관리와 업무 우선순위 설정 능력이 부족한 사람을 위한 책"
 - "직장 내에서 팀원들과 협업하는 능력이 부족한 사람을 위한 책"
 """
-    response = retry_api_call(
-        solar_client.chat.completions.create,
-        model="solar-pro",
-        messages=[{"role": "user", "content": prompt}],
-        stream=False,
+
+
+def analyze_feedback_with_solar(feedback_text):
+    def create_analysis():
+        prompt = ANALYZE_FEEDBACK_PROMPT.format(feedback_text=feedback_text)
+        response = get_llm_client().call(
+            solar_client.chat.completions.create,
+            model="solar-pro",
+            messages=[{"role": "user", "content": prompt}],
+            stream=False,
+            name="analyze_feedback",
+            tokens=estimate_tokens(prompt) * 2,
+        )
+        return response.choices[0].message.content
+
+    # 같은 피드백에 대한 분석은 LLM 응답 캐시에서 재사용
+    return get_response_cache().get_or_create(
+        "solar-pro",
+        ANALYZE_FEEDBACK_PROMPT,
+        {"feedback_text": feedback_text},
+        create_analysis,
     )
-    return response.choices[0].message.content
 
 
 def find_lowest_keyword(scores, team_average):
@@ -87,137 +175,108 @@ def find_lowest_keyword(scores, team_average):
     return selected_keyword
 
 
-def summarize_book_content(content):
-    try:
-        prompt = f"""
-아래의 책의 내용을 읽고 핵심 내용을 요약해주세요
+def build_book_query(username, lowest_keyword):
+    """
+    가장 낮은 키워드에 대한 주관식 피드백을 분석해 검색 쿼리와 쿼리 임베딩을 생성합니다.
 
-{content}
-
-요약할 때 다음 사항을 지켜주세요:
-1. 책의 핵심 주제나 메시지를 포함할 것
-2. 간결하고 명확하게 작성할 것
-3. 공백 포함 최대 300자 내로 요약할 것
-"""
-        response = retry_api_call(
-            solar_client.chat.completions.create,
-            model="solar-pro",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-            timeout=10,
-        )
-        summary = response.choices[0].message.content.strip()
-        return summary
-    except Exception as e:
-        print(f"책 내용 요약 중 오류 발생: {str(e)}")
-        return content[:300] + "..."
-
-
-def get_book_recommendation(username, lowest_keyword):
+    Returns:
+        tuple: (detail_query, query_embedding), 실패 시 None
+    """
+    # 피드백 결과 가져오기 (feedback.db 사용)
+    feedback_conn = connect_feedback_db(FEEDBACK_DB_PATH)
     try:
-        # 피드백 결과 가져오기 (feedback.db 사용)
-        feedback_conn = sqlite3.connect(FEEDBACK_DB_PATH)
         feedback_cur = feedback_conn.cursor()
         feedback_cur.execute(
             """
             SELECT q.question_text, r.answer_content
             FROM feedback_results r
             JOIN feedback_questions q ON r.question_id = q.id
-            WHERE r.to_username = ? 
+            WHERE r.cycle_id = ? AND r.to_username = ? 
             AND q.keyword = ?
             AND r.answer_content NOT IN ('매우우수', '우수', '보통', '미흡', '매우미흡')
             ORDER BY r.created_at
         """,
-            (username, lowest_keyword),
+            (get_current_cycle_id(feedback_conn), username, lowest_keyword),
         )
         feedback_results = feedback_cur.fetchall()
-        if not feedback_results:
-            print(f"[{username}] 주관식 피드백이 없습니다.")
-            return None
-        all_feedback = f"[{lowest_keyword}]\n"
-        for question, answer in feedback_results:
-            all_feedback += f"질문: {question}\n"
-            all_feedback += f"답변: {answer}\n"
-        detail_query = analyze_feedback_with_solar(all_feedback)
-        print(f"[{username}] AI 분석 결과: {detail_query}")
-        print(f"\n[{username}] '{lowest_keyword}' 키워드에 대한 도서 검색 시작...")
-        try:
-            query_embedding_response = retry_api_call(
-                solar_client.embeddings.create,
-                input=detail_query,
-                model="embedding-query",
-                timeout=5,
-            )
-            query_embedding = query_embedding_response.data[0].embedding
-        except Exception as e:
-            print(f"[{username}] 쿼리 임베딩 생성 실패: {str(e)}")
-            return None
+    finally:
+        feedback_conn.close()
+    if not feedback_results:
+        print(f"[{username}] 주관식 피드백이 없습니다.")
+        return None
+    all_feedback = f"[{lowest_keyword}]\n"
+    for question, answer in feedback_results:
+        all_feedback += f"질문: {question}\n"
+        all_feedback += f"답변: {answer}\n"
+    detail_query = analyze_feedback_with_solar(all_feedback)
+    print(f"[{username}] AI 분석 결과: {detail_query}")
 
-        best_books = []
-        similarities = []
-
-        print(f"[{username}] 책 청크 캐시에서 검색 중...")
-        # BOOK_CHUNK_CACHE (load_book_chunk.py에서 미리 로드됨)을 사용하여 디스크 I/O를 줄임
-        for chunk_file, chunk_data in BOOK_CHUNK_CACHE.items():
-            if not isinstance(chunk_data, dict):
-                continue
-            for book_data in chunk_data.values():
-                book_embedding = book_data.get("embedding")
-                if book_embedding:
-                    similarity = cosine_similarity(query_embedding, book_embedding)
-                    if len(best_books) < 3:
-                        best_books.append(book_data)
-                        similarities.append(similarity)
-                        # 정렬: 상위 유사도 순으로 유지
-                        for i in range(len(similarities) - 1):
-                            if similarities[i] < similarities[i + 1]:
-                                similarities[i], similarities[i + 1] = (
-                                    similarities[i + 1],
-                                    similarities[i],
-                                )
-                                best_books[i], best_books[i + 1] = (
-                                    best_books[i + 1],
-                                    best_books[i],
-                                )
-                    elif similarity > similarities[-1]:
-                        best_books[-1] = book_data
-                        similarities[-1] = similarity
-                        for i in range(len(similarities) - 1):
-                            if similarities[i] < similarities[i + 1]:
-                                similarities[i], similarities[i + 1] = (
-                                    similarities[i + 1],
-                                    similarities[i],
-                                )
-                                best_books[i], best_books[i + 1] = (
-                                    best_books[i + 1],
-                                    best_books[i],
-                                )
-
-        if not best_books:
-            print(f"[{username}] 적합한 도서를 찾지 못했습니다.")
-            return None
+    def create_query_embedding():
+        response = get_llm_client().call(
+            solar_client.embeddings.create,
+            input=detail_query,
+            model="embedding-query",
+            timeout=5,
+            name="embedding-query",
+            tokens=estimate_tokens(detail_query),
+        )
+        return response.data[0].embedding
 
-        recommendations = []
-        for i, (book, similarity) in enumerate(zip(best_books, similarities)):
-            print(f"\n[{username}] {i+1}번째 추천 도서:")
-            print(f"제목: {book['title']}")
-            print(f"유사도: {similarity:.4f}")
-            content_summary = summarize_book_content(book["contents"])
-            recommendations.append(
-                {
-                    "title": book["title"],
-                    "authors": (
-                        ", ".join(book["authors"])
-                        if isinstance(book["authors"], list)
-                        else book["authors"]
-                    ),
-                    "contents": content_summary,
-                    "thumbnail": book.get("thumbnail"),
-                    "query": detail_query,
-                }
-            )
-        feedback_conn.close()
-        return recommendations
+    try:
+        # 같은 쿼리는 디스크 캐시(llm_service/embedding_cache.py)에서 재사용
+        query_embedding = get_embedding_cache().get_or_create(
+            "embedding-query", detail_query, create_query_embedding
+        )
+    except Exception as e:
+        print(f"[{username}] 쿼리 임베딩 생성 실패: {str(e)}")
+        return None
+    return detail_query, query_embedding
+
+
+def build_recommendations(username, detail_query, search_results):
+    """검색된 도서들의 요약으로 보고서용 추천 도서 리스트를 만듭니다."""
+    if not search_results:
+        print(f"[{username}] 적합한 도서를 찾지 못했습니다.")
+        return None
+
+    recommendations = []
+    for i, (book, similarity) in enumerate(search_results):
+        print(f"\n[{username}] {i+1}번째 추천 도서:")
+        print(f"제목: {book['title']}")
+        print(f"유사도: {similarity:.4f}")
+        # 수집 시 저장한 요약을 사용하고, 없는 기존 도서만 요약 (응답 캐시로 한 번만 요청)
+        content_summary = book.get("summary") or summarize_book_content(
+            book["contents"]
+        )
+        recommendations.append(
+            {
+                "title": book["title"],
+                "authors": (
+                    ", ".join(book["authors"])
+                    if isinstance(book["authors"], list)
+                    else book["authors"]
+                ),
+                "contents": content_summary,
+                "thumbnail": book.get("thumbnail"),
+                "isbn": book.get("isbn"),
+                "query": detail_query,
+            }
+        )
+    return recommendations
+
+
+def get_book_recommendation(username, lowest_keyword, exclude_isbns=None):
+    try:
+        book_query = build_book_query(username, lowest_keyword)
+        if book_query is None:
+            return None
+        detail_query, query_embedding = book_query
+        print(f"\n[{username}] '{lowest_keyword}' 키워드에 대한 도서 검색 시작...")
+        # 미리 정규화된 임베딩 행렬(load_book_chunk.py)과 한 번의 행렬-벡터 곱으로 검색
+        search_results = search_books(
+            query_embedding, top_k=3, exclude_isbns=exclude_isbns
+        )
+        return build_recommendations(username, detail_query, search_results)
     except Exception as e:
         print(f"[{username}] 도서 추천 중 오류 발생: {str(e)}")
         return None
@@ -1,48 +1,154 @@
+import json
 import os
 import re
-import sqlite3
-import time
+import threading
 
+from db.models.qa import connect_feedback_db, get_current_cycle_id
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_upstage import (ChatUpstage, UpstageDocumentParseLoader,
-                               UpstageEmbeddings)
+from llm_service.llm_client import estimate_tokens, get_chat_model, get_llm_client
+from llm_service.response_cache import get_response_cache
 
+# 형식이 맞지 않는 응답(숫자나 ':' 포함)을 다시 생성하는 최대 횟수
+MAX_VALIDATION_ATTEMPTS = 3
+# 응답에 나오면 안 되는 문자
+MULTIPLE_FORBIDDEN = re.compile(r"\d")
+SUBJECTIVE_FORBIDDEN = re.compile(":")
 
-def summarize_multiple(data_list):
-    """
-    객관식 문항 요약 함수
-    """
-
-    # 리스트를 딕셔너리로 변환
-    data_dict = dict(data_list)
+SUMMARY_MODEL = "solar-mini"
+TRANSLATION_MODEL = "solar-1-mini-translate-enko"
+# 객관식 요약 방식: "two_step"(영어로 생성 후 번역, 2회 호출), "single"(한국어로 바로 생성, 1회 호출)
+MULTIPLE_SUMMARY_MODE = os.getenv("MULTIPLE_SUMMARY_MODE", "two_step")
+# 주관식 요약 방식: "per_question"(문항마다 요청), "batch"(한 사람의 모든 문항을 한 번에 요청)
+SUBJECTIVE_SUMMARY_MODE = os.getenv("SUBJECTIVE_SUMMARY_MODE", "per_question")
 
-    llm = ChatUpstage()
-    enko_translation = ChatUpstage(model="solar-1-mini-translate-enko")
-    prompt_template = PromptTemplate.from_template(
-        """
+MULTIPLE_PROMPT = PromptTemplate.from_template(
+    """
         The numbers below are assessments of someone's competence.
         Write a 3-line description based on the scores below. But please exclude the scores from the description.
         ---
         TEXT: {text}
         """
-    )
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("human", "{text}"),
-        ]
-    )
-    llm_chain = prompt_template | llm | StrOutputParser()
+)
+MULTIPLE_KO_PROMPT = PromptTemplate.from_template(
+    """
+        아래 숫자는 한 사람의 역량 평가 점수입니다.
+        점수를 바탕으로 이 사람을 설명하는 3줄 요약을 한국어로 작성해주세요. 단, 점수와 숫자는 설명에 포함하지 마세요.
+        ---
+        TEXT: {text}
+        """
+)
+SUBJECTIVE_PROMPT = PromptTemplate.from_template(
+    """
+        너는 훌륭한 요약 전문가야.
+        아래는 개인이 받은 능력 평가야. 이 내용을 바탕으로 장점 또는 개선할 점을 포함해 1~2줄 요약해줘.
+        공식문서 말투로 작성해줘. 답변에 ':'을 넣지 마.
+        ---
+        TEXT: {text}
+        """
+)
+SUBJECTIVE_BATCH_PROMPT = PromptTemplate.from_template(
+    """
+        너는 훌륭한 요약 전문가야.
+        아래 JSON 객체는 개인이 받은 능력 평가야. 키는 문항 번호, 값은 그 문항에 대한 답변 목록이야.
+        문항마다 장점 또는 개선할 점을 포함해 1~2줄 요약해줘. 공식문서 말투로 작성하고, 요약에 ':'을 넣지 마.
+        입력과 같은 문항 번호를 키로, 요약 문장을 값으로 하는 JSON 객체 하나만 출력해. (문항 수: {count}개)
+        ---
+        {items}
+        """
+)
+TRANSLATION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("human", "{text}"),
+    ]
+)
+
+# 체인 이름: (프롬프트, 모델)
+CHAIN_SPECS = {
+    "multiple": (MULTIPLE_PROMPT, SUMMARY_MODEL),
+    "multiple_ko": (MULTIPLE_KO_PROMPT, SUMMARY_MODEL),
+    "subjective": (SUBJECTIVE_PROMPT, SUMMARY_MODEL),
+    "subjective_batch": (SUBJECTIVE_BATCH_PROMPT, SUMMARY_MODEL),
+    "translation": (TRANSLATION_PROMPT, TRANSLATION_MODEL),
+}
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def get_chain(name):
+    """요약/번역 체인을 반환하는 함수 (처음 호출할 때 한 번만 생성하여 모든 사용자와 스레드가 공유)"""
+    with _chains_lock:
+        if name not in _chains:
+            prompt, model = CHAIN_SPECS[name]
+            _chains[name] = prompt | get_chat_model(model) | StrOutputParser()
+        return _chains[name]
+
+
+def stream_response(chain, inputs, forbidden=None):
+    """
+    응답을 스트리밍으로 받는 함수
+    forbidden 패턴이 나오면 그 즉시 생성을 중단하고 None을 반환합니다.
+    """
+    chunks = []
+    stream = chain.stream(inputs)
+    try:
+        for chunk in stream:
+            if forbidden is not None and forbidden.search(chunk):
+                return None
+            chunks.append(chunk)
+    finally:
+        stream.close()
+    return "".join(chunks)
+
+
+class InvalidResponseError(ValueError):
+    """MAX_VALIDATION_ATTEMPTS번 모두 형식이 맞지 않는 응답 (response: 마지막 응답)"""
+
+    def __init__(self, response):
+        super().__init__("형식이 맞지 않는 응답")
+        self.response = response
+
+
+def generate_validated(chain, inputs, forbidden, name, tokens):
+    """
+    forbidden 패턴이 없는 응답을 생성하는 함수
+    패턴이 나오는 순간 생성을 중단하고 다시 요청하며(최대 MAX_VALIDATION_ATTEMPTS번),
+    마지막 시도에서는 중단하지 않고 끝까지 받습니다.
+    마지막 응답에도 패턴이 있으면 InvalidResponseError를 발생시키므로 LLM 응답 캐시에 저장되지 않습니다.
+    """
+    client = get_llm_client()
+    for attempt in range(1, MAX_VALIDATION_ATTEMPTS + 1):
+        response = client.call(
+            stream_response,
+            chain,
+            inputs,
+            forbidden if attempt < MAX_VALIDATION_ATTEMPTS else None,
+            name=name,
+            tokens=tokens,
+        )
+        if response is not None:
+            break
+    if forbidden.search(response):
+        raise InvalidResponseError(response)
+    return response
+
+
+def build_scores_text(data_list):
+    """객관식 점수 리스트를 'keyword: 점수' 형식의 프롬프트 입력으로 변환"""
+    # 리스트를 딕셔너리로 변환
+    data_dict = dict(data_list)
 
     # Get connection to feedback.db
-    conn = sqlite3.connect(
+    conn = connect_feedback_db(
         os.path.join(os.path.dirname(os.path.dirname(__file__)), "db/feedback.db")
     )
     cur = conn.cursor()
 
-    # Get keywords from feedback_questions table
+    # Get keywords from feedback_questions table (current review cycle)
     cur.execute(
-        "SELECT keyword, question_text FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+        "SELECT keyword, question_text FROM feedback_questions WHERE cycle_id = ? AND keyword != '' AND question_type = 'single_choice'",
+        (get_current_cycle_id(conn),),
     )
     keyword_pairs = cur.fetchall()
     conn.close()
@@ -54,81 +160,189 @@ def summarize_multiple(data_list):
         if value is not None:
             solar_text_lines.append(f"{keyword}: {value}")
 
-    solar_text = "\n    " + "\n    ".join(solar_text_lines)
+    return "\n    " + "\n    ".join(solar_text_lines)
 
-    # 지수 백오프를 적용하는 while 루프
-    wait_time = 1
-    while True:
-        try:
-            response = llm_chain.invoke({"text": solar_text})
-        except Exception as e:
-            # 에러 메시지에 429 또는 too_many_requests 가 포함되면 백오프 적용
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-                continue
-            else:
-                raise
-        # 응답에 숫자가 포함되지 않으면 성공으로 간주
-        if not re.search(r"\d", response):
-            break
-    # 번역 체인에도 동일하게 적용 (필요 시)
-    wait_time = 1
-    translate_chain = chat_prompt | enko_translation | StrOutputParser()
-    while True:
+
+def summarize_scores(solar_text, mode=None):
+    """
+    점수 텍스트로 한국어 요약을 만드는 함수
+    mode="two_step": 영어 설명을 생성한 뒤 번역 모델로 번역 (2회 호출)
+    mode="single": 한국어 설명을 한 번에 생성 (1회 호출)
+    두 방식 모두 숫자가 없는 응답만 사용합니다.
+    """
+    mode = mode or MULTIPLE_SUMMARY_MODE
+    cache = get_response_cache()
+
+    if mode == "single":
         try:
-            trans_response = translate_chain.invoke({"text": response})
-        except Exception as e:
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-                continue
-            else:
-                raise
-        break
+            return cache.get_or_create(
+                SUMMARY_MODEL,
+                MULTIPLE_KO_PROMPT.template,
+                {"text": solar_text},
+                lambda: generate_validated(
+                    get_chain("multiple_ko"),
+                    {"text": solar_text},
+                    MULTIPLE_FORBIDDEN,
+                    name="summarize_multiple_ko",
+                    tokens=estimate_tokens(MULTIPLE_KO_PROMPT.template, solar_text) * 2,
+                ),
+            )
+        except InvalidResponseError as e:
+            # 검증에 실패한 응답은 캐시하지 않고 이번 보고서에만 사용
+            return e.response
+
+    # 응답에 숫자가 포함되지 않으면 성공으로 간주
+    def create_summary():
+        return generate_validated(
+            get_chain("multiple"),
+            {"text": solar_text},
+            MULTIPLE_FORBIDDEN,
+            name="summarize_multiple",
+            tokens=estimate_tokens(MULTIPLE_PROMPT.template, solar_text) * 2,
+        )
+
+    def create_translation():
+        return get_llm_client().call(
+            get_chain("translation").invoke,
+            {"text": response},
+            name="translate_summary",
+            tokens=estimate_tokens(response) * 2,
+        )
+
+    # 같은 입력의 요약/번역은 LLM 응답 캐시에서 재사용
+    try:
+        response = cache.get_or_create(
+            SUMMARY_MODEL,
+            MULTIPLE_PROMPT.template,
+            {"text": solar_text},
+            create_summary,
+        )
+    except InvalidResponseError as e:
+        # 검증에 실패한 요약과 그 번역은 캐시하지 않고 이번 보고서에만 사용
+        response = e.response
+        return create_translation()
+    return cache.get_or_create(
+        TRANSLATION_MODEL,
+        "{text}",
+        {"text": response},
+        create_translation,
+    )
+
+
+def summarize_multiple(data_list, mode=None):
+    """
+    객관식 문항 요약 함수
+    mode를 지정하지 않으면 MULTIPLE_SUMMARY_MODE 환경 변수 설정을 사용합니다.
+    """
+    return summarize_scores(build_scores_text(data_list), mode=mode)
+
+
+def summarize_subjective_question(idx, answers):
+    """주관식 문항 하나를 요약하는 함수 (같은 입력은 LLM 응답 캐시에서 재사용)"""
+    solar_text = f"characteristic{idx + 1}: {answers}"
+
+    def create_response():
+        return generate_validated(
+            get_chain("subjective"),
+            {"text": solar_text},
+            SUBJECTIVE_FORBIDDEN,
+            name="summarize_subjective",
+            tokens=estimate_tokens(SUBJECTIVE_PROMPT.template, solar_text) * 2,
+        )
 
-    return trans_response
+    try:
+        return get_response_cache().get_or_create(
+            SUMMARY_MODEL,
+            SUBJECTIVE_PROMPT.template,
+            {"text": solar_text},
+            create_response,
+        )
+    except InvalidResponseError as e:
+        # 검증에 실패한 응답은 캐시하지 않고 이번 보고서에만 사용
+        return e.response
 
 
-def summarize_subjective(data_list):
+def parse_subjective_batch(response, keys):
+    """
+    배치 응답에서 문항 번호별 요약을 꺼내는 함수
+    JSON 객체가 아니면 빈 딕셔너리를, 아니면 형식이 맞는 문항(문자열이고 ':'가 없는 요약)만 반환합니다.
+    """
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(response[start : end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, dict):
+        return {}
+    return {
+        key: items[key].strip()
+        for key in keys
+        if isinstance(items.get(key), str)
+        and items[key].strip()
+        and not SUBJECTIVE_FORBIDDEN.search(items[key])
+    }
+
+
+def summarize_subjective_batch(questions):
+    """
+    한 사람의 모든 주관식 문항을 한 번의 요청으로 요약하는 함수
+    Args:
+        questions: {질문 번호: 답변 리스트}
+    Returns:
+        dict: {질문 번호: 요약}, 응답에서 빠졌거나 형식이 잘못된 문항은 제외
+    """
+    items = json.dumps(questions, ensure_ascii=False, indent=2)
+    inputs = {"count": len(questions), "items": items}
+
+    def create_response():
+        return get_llm_client().call(
+            get_chain("subjective_batch").invoke,
+            inputs,
+            name="summarize_subjective_batch",
+            tokens=estimate_tokens(SUBJECTIVE_BATCH_PROMPT.template, items) * 2,
+        )
+
+    try:
+        response = get_response_cache().get_or_create(
+            SUMMARY_MODEL, SUBJECTIVE_BATCH_PROMPT.template, inputs, create_response
+        )
+    except Exception as e:
+        print(f"주관식 배치 요약 중 오류 발생: {str(e)}")
+        return {}
+    return parse_subjective_batch(response, list(questions))
+
+
+def summarize_subjective(data_list, mode=None):
     """
     주관식 문항 요약 함수, 한 사람의 데이터만 들어옴, key: 질문 번호, value: 답변 리스트
+    mode="batch"면 모든 문항을 한 번에 요약하고, 응답에서 빠졌거나 형식이 잘못된 문항만 따로 요약합니다.
+    mode를 지정하지 않으면 SUBJECTIVE_SUMMARY_MODE 환경 변수 설정을 사용합니다.
     """
+    mode = mode or SUBJECTIVE_SUMMARY_MODE
 
     # 리스트를 딕셔너리로 변환
     data_dict = dict(data_list)
 
-    llm = ChatUpstage()
-    prompt_template = PromptTemplate.from_template(
-        """
-        너는 훌륭한 요약 전문가야.
-        아래는 개인이 받은 능력 평가야. 이 내용을 바탕으로 장점 또는 개선할 점을 포함해 1~2줄 요약해줘.
-        공식문서 말투로 작성해줘. 답변에 ':'을 넣지 마.
-        ---
-        TEXT: {text}
-        """
-    )
-    llm_chain = prompt_template | llm | StrOutputParser()
-
-    responses = []
-
-    # 'q_'로 시작하는 키들을 찾아 하나씩 LLM에게 전달
-    for idx, key in enumerate(sorted(data_dict.keys())):
-        if key.startswith("q_"):
-            solar_text = f"characteristic{idx + 1}: {data_dict[key]}"
-            wait_time = 1
-            while True:
-                try:
-                    response = llm_chain.invoke({"text": solar_text})
-                except Exception as e:
-                    if "429" in str(e) or "too_many_requests" in str(e):
-                        time.sleep(wait_time)
-                        wait_time *= 2
-                        continue
-                    else:
-                        raise
-                if not re.search(":", response):
-                    break
-            responses.append({"question": key, "response": response})
-
-    return responses
+    # 'q_'로 시작하는 키들을 찾아 요약 (번호는 정렬된 키 순서 기준)
+    questions = {
+        key: (idx, data_dict[key])
+        for idx, key in enumerate(sorted(data_dict.keys()))
+        if key.startswith("q_")
+    }
+
+    summaries = {}
+    if mode == "batch" and questions:
+        summaries = summarize_subjective_batch(
+            {key: answers for key, (_, answers) in questions.items()}
+        )
+
+    return [
+        {
+            "question": key,
+            "response": summaries.get(key)
+            or summarize_subjective_question(idx, answers),
+        }
+        for key, (idx, answers) in questions.items()
+    ]
@@ -2,10 +2,27 @@ import os
 import pickle
 from concurrent.futures import ThreadPoolExecutor
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-BOOK_CHUNK_DIR = os.path.join(BASE_DIR, "book_chunk")
+import numpy as np
+from book_chunk.book_ivf import load_ivf_index
+from book_chunk.book_pq import load_pq_index
+from book_chunk.book_store import BOOK_CHUNK_DIR, open_book_store, store_exists
+
 BOOK_CHUNK_CACHE = {}
 
+# 검색용 메타데이터 필드 (임베딩 행렬과 같은 순서로 저장)
+BOOK_METADATA_FIELDS = ("title", "authors", "contents", "thumbnail", "isbn", "summary")
+
+# L2 정규화된 float32 임베딩 행렬 (n_books, dim)과 행 순서가 같은 메타데이터 리스트
+# 벡터 저장소(book_chunk/book_store.py)가 있으면 memmap으로 열어 여러 프로세스가 공유합니다.
+BOOK_EMBEDDINGS = np.empty((0, 0), dtype=np.float32)
+BOOK_METADATA = []
+# 저장소 옆에 IVF 인덱스(book_chunk/book_ivf.py)가 있으면 근사 검색에 사용 (없으면 None)
+BOOK_ANN_INDEX = None
+# 저장소 옆에 PQ 인덱스(book_chunk/book_pq.py)가 있으면 압축 코드로 근사 검색 (없으면 None)
+BOOK_PQ_INDEX = None
+# load_all_book_chunks를 실행했는지 여부 (도서가 없어도 다시 읽지 않도록 메타데이터와 별도로 기록)
+BOOK_INDEX_LOADED = False
+
 
 def load_chunk_file(chunk_file):
     try:
@@ -15,11 +32,56 @@ def load_chunk_file(chunk_file):
         return chunk_file, None
 
 
+def normalize_rows(matrix):
+    """각 행을 L2 정규화합니다. (norm이 0인 행은 그대로 둡니다)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build_book_matrix(chunk_cache):
+    """
+    청크 캐시의 도서들을 하나의 정규화된 float32 행렬과 메타데이터 리스트로 변환합니다.
+    같은 ISBN이 여러 청크에 있으면 처음 것만 사용합니다.
+    """
+    vectors = []
+    metadata = []
+    seen_isbns = set()
+    for chunk_file in sorted(chunk_cache):
+        chunk_data = chunk_cache[chunk_file]
+        if not isinstance(chunk_data, dict):
+            continue
+        for isbn, book_data in chunk_data.items():
+            book_embedding = book_data.get("embedding")
+            if not book_embedding or isbn in seen_isbns:
+                continue
+            if vectors and len(book_embedding) != len(vectors[0]):
+                continue
+            seen_isbns.add(isbn)
+            vectors.append(book_embedding)
+            metadata.append(
+                {field: book_data.get(field) for field in BOOK_METADATA_FIELDS}
+            )
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32), []
+    return normalize_rows(np.array(vectors, dtype=np.float32)), metadata
+
+
 def load_all_book_chunks():
     """
-    BOOK_CHUNK_CACHE를 디스크에서 한 번 읽어 메모리에 저장합니다.
+    검색용 임베딩 행렬(BOOK_EMBEDDINGS)과 메타데이터(BOOK_METADATA)를 준비합니다.
+    벡터 저장소가 있으면 memmap으로 열고, 없으면 pickle 청크를 읽어
+    BOOK_CHUNK_CACHE에 저장한 뒤 행렬을 생성합니다.
     """
-    global BOOK_CHUNK_CACHE
+    global BOOK_CHUNK_CACHE, BOOK_EMBEDDINGS, BOOK_METADATA
+    global BOOK_ANN_INDEX, BOOK_PQ_INDEX, BOOK_INDEX_LOADED
+    if store_exists(BOOK_CHUNK_DIR):
+        BOOK_EMBEDDINGS, _, BOOK_METADATA = open_book_store(BOOK_CHUNK_DIR)
+        BOOK_ANN_INDEX = load_ivf_index(BOOK_CHUNK_DIR, BOOK_EMBEDDINGS)
+        BOOK_PQ_INDEX = load_pq_index(BOOK_CHUNK_DIR, BOOK_EMBEDDINGS)
+        BOOK_INDEX_LOADED = True
+        return BOOK_CHUNK_CACHE
     with os.scandir(BOOK_CHUNK_DIR) as it:
         chunk_files = [
             entry.name
@@ -33,4 +95,28 @@ def load_all_book_chunks():
     for filename, data in results:
         if data is not None:
             BOOK_CHUNK_CACHE[filename] = data
+    BOOK_EMBEDDINGS, BOOK_METADATA = build_book_matrix(BOOK_CHUNK_CACHE)
+    BOOK_INDEX_LOADED = True
     return BOOK_CHUNK_CACHE
+
+
+def get_book_index():
+    """
+    (임베딩 행렬, 메타데이터 리스트)를 반환합니다.
+    아직 로드되지 않았다면 디스크에서 한 번 로드합니다. (도서가 없어도 다시 로드하지 않음)
+    """
+    if not BOOK_INDEX_LOADED:
+        load_all_book_chunks()
+    return BOOK_EMBEDDINGS, BOOK_METADATA
+
+
+def get_book_ann_index():
+    """IVF 인덱스를 반환합니다. 인덱스가 없으면 None (정확한 검색 사용)"""
+    get_book_index()
+    return BOOK_ANN_INDEX
+
+
+def get_book_pq_index():
+    """PQ 인덱스를 반환합니다. 인덱스가 없으면 None (정확한 검색 사용)"""
+    get_book_index()
+    return BOOK_PQ_INDEX
@@ -1,20 +1,29 @@
 import os
 import platform
 import sqlite3
-import time
+import sys
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import wraps
 from io import BytesIO
 from subprocess import run
-from threading import Semaphore
+
+# python make_pdf.py로 실행해도 백엔드 패키지(db, llm_service, mail_service)를 찾을 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import matplotlib.font_manager as fm
 import matplotlib.pyplot as plt
 import numpy as np
 import requests.exceptions
-from book_recommendation import find_lowest_keyword, get_book_recommendation
+from book_recommendation import (
+    batch_search_books,
+    build_book_query,
+    build_recommendations,
+    find_lowest_keyword,
+    get_book_recommendation,
+)
+from db.models.qa import connect_feedback_db, get_current_cycle_id
 from feedback_summary import summarize_multiple, summarize_subjective
+from llm_service.llm_client import print_llm_metrics
 from load_book_chunk import load_all_book_chunks
 from mail_service.send_email import send_report_emails
 from reportlab.lib import colors
@@ -77,43 +86,7 @@ def get_result_connection():
 
 
 def get_keyword_connection():
-    return sqlite3.connect(KEYWORD_DB_PATH)
-
-
-# 재시도 데코레이터 (429 에러 대응)
-def retry(exceptions, total_tries=5, initial_wait=1, backoff_factor=2):
-    def decorator_retry(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            tries = total_tries
-            wait = initial_wait
-            while tries > 1:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if hasattr(e, "args") and e.args and isinstance(e.args[0], dict):
-                        error_info = e.args[0].get("error", {})
-                        if error_info.get("code") == "too_many_requests":
-                            time.sleep(wait)
-                            tries -= 1
-                            wait *= backoff_factor
-                            continue
-                    raise
-            return func(*args, **kwargs)
-
-        return wrapper
-
-    return decorator_retry
-
-
-# API 호출 시 동시 호출 제한 (최대 4개)
-api_semaphore = Semaphore(4)
-
-
-@retry(Exception, total_tries=5, initial_wait=1, backoff_factor=2)
-def call_get_book_recommendation(username, lowest_keyword):
-    with api_semaphore:
-        return get_book_recommendation(username, lowest_keyword)
+    return connect_feedback_db(KEYWORD_DB_PATH)
 
 
 # ==================================  # 로고 삽입
@@ -635,6 +608,20 @@ def draw_page_number(c, width, margin=36):
 # ==================================
 
 
+def read_result_cycle_id(result_conn, feedback_conn):
+    """
+    result.db를 만든 리뷰 주기 ID
+    이전 버전으로 만든 result.db처럼 기록(build_state)이 없으면 feedback.db의 현재 주기를 사용합니다.
+    """
+    try:
+        row = result_conn.execute(
+            "SELECT value FROM build_state WHERE key = 'cycle_id'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    return row[0] if row else get_current_cycle_id(feedback_conn)
+
+
 # 데이터베이스 최적화 적용한 사용자 데이터 가져오기
 def fetch_data():
     user_conn = get_user_connection()
@@ -650,85 +637,79 @@ def fetch_data():
         user_cur.execute("SELECT id, group_name FROM groups")
         groups = {row[0]: row[1] for row in user_cur.fetchall()}
 
+        # 결과는 (cycle_id, to_username, ...) 기본 키로 정렬된 long format 테이블에서
+        # 현재 리뷰 주기 범위만 조회 (result.db 생성: db/models/pdf.py)
         result_cur = result_conn.cursor()
-        result_cur.execute("PRAGMA table_info(multiple)")
-        all_columns = [col[1] for col in result_cur.fetchall()]
-        mul_columns = [
-            col
-            for col in all_columns
-            if col not in ("id", "to_username", "총합", "등급", "created_at")
+        cycle_id = read_result_cycle_id(result_conn, keyword_conn)
+
+        # 키워드 순서는 같은 리뷰 주기의 질문 순서 기준
+        keyword_cur = keyword_conn.cursor()
+        keyword_cur.execute(
+            "SELECT DISTINCT keyword FROM feedback_questions WHERE cycle_id = ? AND keyword != '' AND question_type = 'single_choice'",
+            (cycle_id,),
+        )
+        keywords = [row[0] for row in keyword_cur.fetchall()]
+
+        # 사용자별 키워드 점수 ('average'는 팀 평균)
+        scores_by_user = defaultdict(dict)
+        result_cur.execute(
+            "SELECT to_username, keyword, score FROM result_scores WHERE cycle_id = ?",
+            (cycle_id,),
+        )
+        for uname, keyword, score in result_cur.fetchall():
+            scores_by_user[uname][keyword] = score
+        avg_scores = scores_by_user.get("average", {})
+        team_average = [
+            [keyword, avg_scores[keyword]]
+            for keyword in keywords
+            if keyword in avg_scores
         ]
-        result_cur.execute("SELECT * FROM multiple WHERE to_username = 'average'")
-        avg_row = result_cur.fetchone()
-        team_average = []
-        if avg_row:
-            col_idx = {col: idx for idx, col in enumerate(all_columns)}
-            for col in mul_columns:
-                team_average.append([col, avg_row[col_idx[col]]])
-
-        # 사용자별 multiple 데이터를 한 번에 조회
-        usernames = [u[0] for u in users]
-        if usernames:
-            placeholders = ",".join("?" for _ in usernames)
-            query = f"SELECT * FROM multiple WHERE to_username IN ({placeholders})"
-            result_cur.execute(query, usernames)
-            multiple_rows = result_cur.fetchall()
-        else:
-            multiple_rows = []
-        multiple_by_user = {}
-        if multiple_rows:
-            col_idx = {col: idx for idx, col in enumerate(all_columns)}
-            for row in multiple_rows:
-                uname = row[col_idx["to_username"]]
-                multiple_by_user[uname] = row
-
-        # 사용자별 주관식 피드백을 한 번에 조회
-        if usernames:
-            placeholders = ",".join("?" for _ in usernames)
-            query = f"SELECT * FROM subjective WHERE to_username IN ({placeholders})"
-            result_cur.execute(query, usernames)
-            subjective_rows = result_cur.fetchall()
-        else:
-            subjective_rows = []
+
+        # 사용자별 총합과 등급
+        result_cur.execute(
+            "SELECT to_username, total, grade FROM result_totals WHERE cycle_id = ?",
+            (cycle_id,),
+        )
+        totals_by_user = {
+            uname: (total, grade) for uname, total, grade in result_cur.fetchall()
+        }
+
+        # 사용자별 주관식 피드백 (질문 번호 순)
         subjective_by_user = defaultdict(list)
-        if subjective_rows:
-            subj_desc = [d[0] for d in result_cur.description]
-            for row in subjective_rows:
-                data = dict(zip(subj_desc, row))
-                subjective_by_user[data.get("to_username")].append(data)
+        result_cur.execute(
+            """
+            SELECT to_username, question_id, answers FROM result_feedback
+            WHERE cycle_id = ?
+            ORDER BY to_username, question_id
+            """,
+            (cycle_id,),
+        )
+        for uname, question_id, answers in result_cur.fetchall():
+            subjective_by_user[uname].append([f"q_{question_id}", answers])
 
         # 피드백 키워드는 한 번만 조회
-        keyword_cur = keyword_conn.cursor()
-        keyword_cur.execute("SELECT id, keyword FROM feedback_questions")
+        keyword_cur.execute(
+            "SELECT id, keyword FROM feedback_questions WHERE cycle_id = ?",
+            (cycle_id,),
+        )
         feedback_keywords = [
             {"id": r[0], "keyword": r[1]} for r in keyword_cur.fetchall()
         ]
 
         all_user_data = []
-        if multiple_rows:
-            col_idx = {col: idx for idx, col in enumerate(all_columns)}
         for user in users:
             username, name, group_id, rank = user
             group_name = groups.get(group_id, "")
             position = f"{group_name} {rank}"
-            row = multiple_by_user.get(username)
-            if not row:
+            if username not in totals_by_user:
                 continue
-            grade = row[col_idx.get("등급")]
-            total_score = row[col_idx.get("총합")]
-            scores = []
-            for col in mul_columns:
-                scores.append([col, row[col_idx.get(col)]])
+            total_score, grade = totals_by_user[username]
+            user_scores = scores_by_user.get(username, {})
+            scores = [
+                [keyword, user_scores.get(keyword)] for keyword, _ in team_average
+            ]
             lowest_keyword = find_lowest_keyword(scores, team_average)
-            subj_list = subjective_by_user.get(username, [])
-            team_opinion = []
-            for data in subj_list:
-                for key, value in data.items():
-                    if (
-                        key not in ("id", "to_username", "created_at")
-                        and value is not None
-                    ):
-                        team_opinion.append([key, value])
+            team_opinion = subjective_by_user.get(username, [])
             all_user_data.append(
                 {
                     "username": username,
@@ -825,6 +806,33 @@ def generate_pdf(data, filename):
 # ===================
 
 
+# -------------------------------
+# 전체 사용자의 도서 검색 쿼리를 만든 뒤 한 번의 행렬 곱으로 도서를 검색
+def prepare_book_search(users_data, max_workers):
+    """
+    사용자별 검색 쿼리 임베딩을 병렬로 생성하고, batch_search_books로 한 번에 검색하여
+    user_data["book_search"]에 (detail_query, 검색 결과)를 저장합니다.
+    """
+    targets = [u for u in users_data if u.get("lowest_keyword")]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(build_book_query, u["username"], u["lowest_keyword"]): u
+            for u in targets
+        }
+        for future in as_completed(futures):
+            user_data = futures[future]
+            try:
+                user_data["book_query"] = future.result()
+            except Exception as e:
+                print(f"[{user_data['username']}] 도서 검색 쿼리 생성 실패: {e}")
+                user_data["book_query"] = None
+
+    queried = [u for u in targets if u.get("book_query")]
+    search_results = batch_search_books([u["book_query"][1] for u in queried], top_k=3)
+    for user_data, results in zip(queried, search_results):
+        user_data["book_search"] = (user_data["book_query"][0], results)
+
+
 # -------------------------------
 # 개별 사용자의 데이터를 받아 도서 추천 API 호출 및 PDF 생성
 def process_user(user_data):
@@ -832,8 +840,16 @@ def process_user(user_data):
     lowest_keyword = user_data.get("lowest_keyword")
     if not lowest_keyword:
         user_data["book_recommendation"] = None
+    elif "book_search" in user_data:
+        detail_query, search_results = user_data["book_search"]
+        user_data["book_recommendation"] = build_recommendations(
+            username, detail_query, search_results
+        )
+    elif "book_query" in user_data:
+        # 검색 쿼리 생성에 실패한 사용자
+        user_data["book_recommendation"] = None
     else:
-        recommendation = call_get_book_recommendation(username, lowest_keyword)
+        recommendation = get_book_recommendation(username, lowest_keyword)
         user_data["book_recommendation"] = recommendation
     filename = f"{username}.pdf"
     generate_pdf(user_data, filename)
@@ -847,6 +863,7 @@ if __name__ == "__main__":
     users_data = fetch_data()
     # CPU 수에 따라 최대 워커 수 조정
     max_workers = min(os.cpu_count() or 4, 8)
+    prepare_book_search(users_data, max_workers)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [executor.submit(process_user, user_data) for user_data in users_data]
         for future in as_completed(futures):
@@ -855,3 +872,4 @@ if __name__ == "__main__":
             except Exception as e:
                 print(f"Error processing user: {e}")
     send_report_emails()
+    print_llm_metrics()
@@ -1,12 +1,38 @@
+import argparse
+import json
 import os
 import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+# python pdf.py로 실행해도 백엔드 패키지(db, llm_service)를 찾을 수 있도록 경로 추가
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import numpy as np
 import pandas as pd
+from db.models.qa import (
+    DEFAULT_CYCLE_ID,
+    archive_cycle,
+    archive_path_for,
+    check_archivable,
+    connect_feedback_db,
+    get_current_cycle_id,
+    move_rows_to_archive,
+)
 from dotenv import load_dotenv
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_upstage import ChatUpstage, UpstageEmbeddings
-from tqdm import tqdm  # tqdm 추가
+from langchain_upstage import UpstageEmbeddings
+from llm_service.llm_client import (
+    estimate_tokens,
+    get_chat_model,
+    get_llm_client,
+    print_llm_metrics,
+)
+from llm_service.response_cache import get_response_cache
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
@@ -14,134 +40,515 @@ UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 FEEDBACK_DB_PATH = os.path.join(os.path.dirname(__file__), "../feedback.db")
 RESULT_DB_PATH = os.path.join(os.path.dirname(__file__), "../result.db")
 
+# 객관식 답변 점수
+SCORE_MAP = {"매우우수": 5, "우수": 4, "보통": 3, "미흡": 2, "매우미흡": 1}
+
+# 등급별 인원 비율 (총합 상위부터)
+GRADES = ["S", "A", "B", "C", "D"]
+GRADE_RATIOS = [0.1, 0.2, 0.3, 0.3, 0.1]
+
+# 리뷰 주기별로 나뉜 결과 테이블 (주기 보관 시 이 테이블의 행을 옮김)
+RESULT_CYCLE_TABLES = [
+    "result_scores",
+    "result_totals",
+    "result_feedback",
+    "normalized_answers",
+    "result_questions",
+]
+
 
 def get_feedback_connection():
-    return sqlite3.connect(FEEDBACK_DB_PATH)
+    return connect_feedback_db(FEEDBACK_DB_PATH)
 
 
 def get_result_connection():
     return sqlite3.connect(RESULT_DB_PATH)
 
 
-def init_result_db():
-    # feedback.db에서 unique한 keyword 목록 가져오기
-    fb_conn = get_feedback_connection()
+def fetch_question_columns(fb_conn, cycle_id=DEFAULT_CYCLE_ID):
+    """리뷰 주기의 객관식 키워드 목록과 주관식 질문 ID 목록을 조회 (호환 뷰의 컬럼)"""
     cur = fb_conn.cursor()
+    # 키워드 목록 가져오기 - single_choice 타입만 필터링
     cur.execute(
-        "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+        "SELECT DISTINCT keyword FROM feedback_questions WHERE cycle_id = ? AND keyword != '' AND question_type = 'single_choice'",
+        (cycle_id,),
     )
     keywords = [row[0] for row in cur.fetchall()]
 
     # unique 질문 ID 가져오기 (주관식)
     cur.execute(
-        "SELECT DISTINCT id FROM feedback_questions WHERE question_type = 'long_answer'"
+        "SELECT DISTINCT id FROM feedback_questions WHERE cycle_id = ? AND question_type = 'long_answer'",
+        (cycle_id,),
     )
     question_ids = [row[0] for row in cur.fetchall()]
-    fb_conn.close()
+    return keywords, question_ids
+
+
+def fetch_question_set(fb_conn, cycle_id=DEFAULT_CYCLE_ID):
+    """결과에 영향을 주는 리뷰 주기의 질문 구성 {(질문 ID, 키워드, 질문 유형)}"""
+    return set(
+        fb_conn.execute(
+            "SELECT id, COALESCE(keyword, ''), question_type FROM feedback_questions WHERE cycle_id = ?",
+            (cycle_id,),
+        )
+    )
 
-    # result.db 연결
+
+def init_result_db():
+    """
+    result.db 테이블 생성
+    결과는 (리뷰 주기, 사용자, 키워드/질문, 값) 형태로 저장하므로 키워드나 질문이 추가되어도
+    테이블을 다시 만들 필요가 없고, 기본 키가 (cycle_id, to_username, ...)라서
+    사용자별 조회는 기본 키 범위 조회 한 번으로 끝납니다. (WITHOUT ROWID: 기본 키가 곧 covering index)
+    기존 형식의 multiple/subjective 테이블은 같은 이름의 뷰로 제공합니다. (create_result_views)
+    """
     conn = get_result_connection()
     cur = conn.cursor()
-    # multiple 테이블 생성 - 동적으로 컬럼 생성
-    columns = ["id INTEGER PRIMARY KEY", "to_username TEXT NOT NULL"]
-    columns.extend([f"{keyword} REAL" for keyword in keywords])
-    columns.append("총합 REAL")
-    columns.append("등급 TEXT")
-    columns.append("created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
 
-    create_table_sql = f"""
-    CREATE TABLE IF NOT EXISTS multiple (
-        {', '.join(columns)}
+    # 사용자별 키워드 평균 점수 (to_username 'average'는 전체 평균)
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS result_scores (
+        cycle_id INTEGER NOT NULL,
+        to_username TEXT NOT NULL,
+        keyword TEXT NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (cycle_id, to_username, keyword)
+    ) WITHOUT ROWID
+    """
     )
+
+    # 사용자별 총합과 등급
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS result_totals (
+        cycle_id INTEGER NOT NULL,
+        to_username TEXT NOT NULL,
+        total REAL,
+        grade TEXT,
+        PRIMARY KEY (cycle_id, to_username)
+    ) WITHOUT ROWID
     """
-    cur.execute(create_table_sql)
+    )
 
-    # subjective 테이블 생성 - 동적으로 컬럼 생성 (질문 ID를 사용)
-    subj_columns = ["id INTEGER PRIMARY KEY", "to_username TEXT NOT NULL"]
-    subj_columns.extend(
-        [f"q_{question_id} TEXT" for question_id in question_ids]
-    )  # 각 질문의 답변을 저장
-    subj_columns.append("created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
+    # 사용자별 주관식 답변 (질문별 톤 정규화한 답변 리스트의 문자열)
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS result_feedback (
+        cycle_id INTEGER NOT NULL,
+        to_username TEXT NOT NULL,
+        question_id INTEGER NOT NULL,
+        answers TEXT NOT NULL,
+        PRIMARY KEY (cycle_id, to_username, question_id)
+    ) WITHOUT ROWID
+    """
+    )
 
-    create_subj_table_sql = f"""
-    CREATE TABLE IF NOT EXISTS subjective (
-        {', '.join(subj_columns)}
+    # 톤 정규화한 주관식 답변 (feedback_results.id 기준, 증분 갱신 시 새 답변만 정규화)
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS normalized_answers (
+        feedback_id INTEGER PRIMARY KEY,
+        to_username TEXT NOT NULL,
+        question_id INTEGER NOT NULL,
+        answer TEXT NOT NULL,
+        cycle_id INTEGER NOT NULL DEFAULT 1
     )
     """
-    cur.execute(create_subj_table_sql)
+    )
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(normalized_answers)")]
+    if "cycle_id" not in columns:
+        cur.execute(
+            f"ALTER TABLE normalized_answers ADD COLUMN cycle_id INTEGER NOT NULL DEFAULT {DEFAULT_CYCLE_ID}"
+        )
+    cur.execute("DROP INDEX IF EXISTS idx_normalized_answers_user")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_normalized_answers_cycle ON normalized_answers (cycle_id, to_username)"
+    )
 
+    # 결과를 만들 때의 질문 구성 (질문이 삭제/수정되면 증분 갱신 대신 처음부터 다시 생성)
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS result_questions (
+        cycle_id INTEGER NOT NULL,
+        question_id INTEGER NOT NULL,
+        keyword TEXT NOT NULL,
+        question_type TEXT NOT NULL,
+        PRIMARY KEY (cycle_id, question_id)
+    ) WITHOUT ROWID
+    """
+    )
+
+    # 마지막으로 반영한 feedback_results.id, 리뷰 주기 등 생성 상태
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS build_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+    )
+
+    migrate_wide_result_tables(conn)
     conn.commit()
     conn.close()
 
 
-def normalize_tone(text_list):
-    """각 텍스트 리스트에 대해 톤 정규화 수행"""
-    llm = ChatUpstage(api_key=UPSTAGE_API_KEY)
+def sql_literal(text):
+    return "'" + str(text).replace("'", "''") + "'"
 
-    prompt_template = PromptTemplate.from_template(
-        """
+
+def sql_identifier(text):
+    return '"' + str(text).replace('"', '""') + '"'
+
+
+def create_result_views(result_conn, keywords, question_ids, cycle_id):
+    """
+    기존 형식(키워드/질문별 컬럼)의 multiple, subjective 뷰를 만드는 함수
+    화면(frontend)과 기존 조회 코드를 위한 호환용이며, 현재 키워드/질문 구성으로 매번 다시 만듭니다.
+    """
+    score_columns = "".join(
+        f", MAX(CASE WHEN s.keyword = {sql_literal(keyword)} THEN s.score END) AS {sql_identifier(keyword)}"
+        for keyword in keywords
+    )
+    answer_columns = "".join(
+        f", MAX(CASE WHEN question_id = {int(question_id)} THEN answers END) AS q_{int(question_id)}"
+        for question_id in question_ids
+    )
+    result_conn.execute("DROP VIEW IF EXISTS multiple")
+    result_conn.execute(
+        f"""
+    CREATE VIEW multiple AS
+    SELECT t.to_username{score_columns}, t.total AS 총합, t.grade AS 등급
+    FROM result_totals t
+    LEFT JOIN result_scores s ON s.cycle_id = t.cycle_id AND s.to_username = t.to_username
+    WHERE t.cycle_id = {int(cycle_id)}
+    GROUP BY t.to_username
+    """
+    )
+    result_conn.execute("DROP VIEW IF EXISTS subjective")
+    result_conn.execute(
+        f"""
+    CREATE VIEW subjective AS
+    SELECT to_username{answer_columns}
+    FROM result_feedback
+    WHERE cycle_id = {int(cycle_id)}
+    GROUP BY to_username
+    """
+    )
+
+
+def migrate_wide_result_tables(result_conn, cycle_id=DEFAULT_CYCLE_ID):
+    """
+    이전 형식(키워드/질문마다 컬럼이 있는 multiple, subjective 테이블)의 result.db를
+    long format 테이블로 옮기고, 같은 이름의 호환 뷰로 바꾸는 함수
+    """
+    legacy = {
+        row[0]
+        for row in result_conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('multiple', 'subjective')"
+        )
+    }
+    if not legacy:
+        return
+
+    def columns(table):
+        if table not in legacy:
+            return []
+        return [
+            row[1]
+            for row in result_conn.execute(f"PRAGMA table_info({table})")
+            if row[1] not in ("id", "to_username", "created_at")
+        ]
+
+    keywords = [col for col in columns("multiple") if col not in ("총합", "등급")]
+    questions = columns("subjective")
+
+    if "multiple" in legacy:
+        rows = result_conn.execute(
+            f"SELECT to_username, {', '.join(sql_identifier(col) for col in keywords + ['총합', '등급'])} FROM multiple"
+        ).fetchall()
+        result_conn.executemany(
+            "INSERT OR REPLACE INTO result_scores (cycle_id, to_username, keyword, score) VALUES (?, ?, ?, ?)",
+            (
+                (cycle_id, row[0], keyword, score)
+                for row in rows
+                for keyword, score in zip(keywords, row[1:-2])
+                if score is not None
+            ),
+        )
+        result_conn.executemany(
+            "INSERT OR REPLACE INTO result_totals (cycle_id, to_username, total, grade) VALUES (?, ?, ?, ?)",
+            ((cycle_id, row[0], row[-2], row[-1]) for row in rows),
+        )
+
+    if questions:
+        rows = result_conn.execute(
+            f"SELECT to_username, {', '.join(questions)} FROM subjective"
+        ).fetchall()
+        # 답변이 없는 질문('[]')은 저장하지 않음
+        result_conn.executemany(
+            "INSERT OR REPLACE INTO result_feedback (cycle_id, to_username, question_id, answers) VALUES (?, ?, ?, ?)",
+            (
+                (cycle_id, row[0], int(question[2:]), answers)
+                for row in rows
+                for question, answers in zip(questions, row[1:])
+                if answers and answers != "[]"
+            ),
+        )
+
+    for table in legacy:
+        result_conn.execute(f"DROP TABLE {table}")
+    result_conn.execute(
+        "INSERT OR REPLACE INTO build_state (key, value) VALUES ('cycle_id', ?)",
+        (cycle_id,),
+    )
+    create_result_views(
+        result_conn, keywords, [int(question[2:]) for question in questions], cycle_id
+    )
+
+
+def read_high_water_mark(result_conn, cycle_id=DEFAULT_CYCLE_ID):
+    """
+    result.db에 마지막으로 반영한 feedback_results.id
+    기록이 없거나 다른 리뷰 주기의 기록이면 None (해당 주기를 처음부터 생성)
+    """
+    try:
+        state = dict(result_conn.execute("SELECT key, value FROM build_state"))
+    except sqlite3.OperationalError:
+        return None
+    if state.get("cycle_id") != cycle_id:
+        return None
+    return state.get("last_feedback_id")
+
+
+def question_set_matches(fb_conn, result_conn, cycle_id=DEFAULT_CYCLE_ID):
+    """
+    결과를 만들 때의 질문 구성(result_questions)이 현재 질문 구성에 그대로 남아 있는지 확인하는 함수
+    질문이 추가되기만 했으면 증분 갱신이 가능하지만, 삭제되거나 키워드/유형이 바뀌었으면 False (처음부터 다시 생성)
+    """
+    stored = set(
+        result_conn.execute(
+            "SELECT question_id, keyword, question_type FROM result_questions WHERE cycle_id = ?",
+            (cycle_id,),
+        )
+    )
+    return stored <= fetch_question_set(fb_conn, cycle_id)
+
+
+def clear_result_cycle(result_conn, cycle_id):
+    """리뷰 주기의 결과를 모두 삭제 (다른 주기의 결과는 유지)"""
+    for table in RESULT_CYCLE_TABLES:
+        result_conn.execute(f"DELETE FROM {table} WHERE cycle_id = ?", (cycle_id,))
+
+
+TONE_PROMPT = PromptTemplate.from_template(
+    """
         아래 주어진 문장을 인물 지칭을 모두 제외하고, 존대하는 평서문으로 내용은 그대로 유지한채로 말투만 바꿔주세요.
         단, 매우 부정적인 내용은 필터링해주세요.
         {text}
         변경 후 텍스트 :
         """
+)
+TONE_BATCH_PROMPT = PromptTemplate.from_template(
+    """
+        아래 JSON 배열의 각 문장을 인물 지칭을 모두 제외하고, 존대하는 평서문으로 내용은 그대로 유지한채로 말투만 바꿔주세요.
+        단, 매우 부정적인 내용은 필터링해주세요.
+        각 항목의 id 순서대로, 변경된 문장만 담은 JSON 문자열 배열 하나만 출력하세요. (항목 수: {count}개)
+        {items}
+        변경 후 JSON 배열 :
+        """
+)
+TONE_MODEL = "solar-mini"
+# 톤 정규화 동시 요청 수 (전체 요청 속도는 llm_service.llm_client로 제한)
+TONE_MAX_WORKERS = 8
+# 한 번의 요청에 담을 답변 수 (1이면 답변마다 따로 요청)
+TONE_BATCH_SIZE = 10
+
+_tone_chains = {}
+_tone_chain_lock = threading.Lock()
+
+
+def get_tone_chain(batch=False):
+    """톤 정규화 체인을 반환하는 함수 (처음 호출할 때 한 번만 생성하여 모든 스레드가 공유)"""
+    with _tone_chain_lock:
+        if batch not in _tone_chains:
+            prompt = TONE_BATCH_PROMPT if batch else TONE_PROMPT
+            _tone_chains[batch] = (
+                prompt | get_chat_model(TONE_MODEL) | StrOutputParser()
+            )
+        return _tone_chains[batch]
+
+
+def clean_normalized_text(text, strip_prefix=True):
+    """LLM 응답에서 '변경 후 텍스트 :' 같은 머리말과 따옴표를 제거"""
+    if strip_prefix and ":" in text:
+        text = text.split(":", 1)[-1].strip()
+    return text.replace('"', "").replace("'", "").strip()
+
+
+def parse_tone_batch(response, count):
+    """
+    배치 응답에서 JSON 문자열 배열을 꺼내는 함수
+    형식이 잘못되었거나 항목 수가 맞지 않으면 None을 반환합니다.
+    """
+    start, end = response.find("["), response.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        items = json.loads(response[start : end + 1])
+    except json.JSONDecodeError:
+        return None
+    if (
+        not isinstance(items, list)
+        or len(items) != count
+        or not all(isinstance(item, str) for item in items)
+    ):
+        return None
+    return [clean_normalized_text(item, strip_prefix=False) for item in items]
+
+
+def normalize_tone_batch(text_list):
+    """
+    여러 답변을 하나의 프롬프트로 톤 정규화하는 함수
+    응답 항목 수가 맞지 않으면 배치를 절반으로 나눠 다시 요청하고,
+    답변 하나만 남으면 단건 요청으로 처리합니다.
+    """
+    client = get_llm_client()
+    if len(text_list) == 1:
+        response = client.call(
+            get_tone_chain().invoke,
+            {"text": text_list[0]},
+            name="normalize_tone",
+            tokens=estimate_tokens(TONE_PROMPT.template, text_list[0]) * 2,
+        )
+        return [clean_normalized_text(response)]
+
+    items = json.dumps(
+        [{"id": i + 1, "text": text} for i, text in enumerate(text_list)],
+        ensure_ascii=False,
     )
+    response = client.call(
+        get_tone_chain(batch=True).invoke,
+        {"items": items, "count": len(text_list)},
+        name="normalize_tone_batch",
+        tokens=estimate_tokens(TONE_BATCH_PROMPT.template, items) * 2,
+    )
+    normalized = parse_tone_batch(response, len(text_list))
+    if normalized is not None:
+        return normalized
 
-    llm_chain = prompt_template | llm | StrOutputParser()
+    mid = len(text_list) // 2
+    return normalize_tone_batch(text_list[:mid]) + normalize_tone_batch(text_list[mid:])
 
-    # 동기 LLM 호출
-    def process_text(text):
-        return llm_chain.invoke({"text": text})
 
-    normalized_texts = [process_text(text) for text in text_list]
+def normalize_tone(text_list, executor=None, batch_size=TONE_BATCH_SIZE):
+    """
+    각 텍스트 리스트에 대해 톤 정규화 수행
+    batch_size개씩 묶어 한 번에 요청하며, executor가 주어지면 배치들을 동시에 요청합니다.
+    결과는 입력 순서대로 반환하며, 답변별 결과는 LLM 응답 캐시에 저장됩니다.
+    """
+    # 이미 정규화한 답변은 응답 캐시에서 가져오고, 나머지만 배치로 요청
+    cache = get_response_cache()
+    normalized = [
+        cache.get(TONE_MODEL, TONE_PROMPT.template, {"text": text})
+        for text in text_list
+    ]
+    missing = [idx for idx, text in enumerate(normalized) if text is None]
 
-    normalized_texts = [
-        text.split(":", 1)[-1].strip() if ":" in text else text
-        for text in normalized_texts
+    batches = [
+        missing[start : start + batch_size]
+        for start in range(0, len(missing), batch_size)
     ]
-    normalized_texts = [text.replace('"', "") for text in normalized_texts]
-    normalized_texts = [text.replace("'", "") for text in normalized_texts]
-    return [text.strip() for text in normalized_texts]
 
+    def process_batch(batch):
+        return normalize_tone_batch([text_list[idx] for idx in batch])
 
-def process_feedback_data():
-    # feedback.db 연결
-    fb_conn = get_feedback_connection()
+    if executor is None:
+        results = [process_batch(batch) for batch in batches]
+    else:
+        results = executor.map(process_batch, batches)
+    for batch, batch_result in zip(batches, results):
+        for idx, text in zip(batch, batch_result):
+            cache.put(TONE_MODEL, TONE_PROMPT.template, {"text": text_list[idx]}, text)
+            normalized[idx] = text
+    return normalized
 
-    # 키워드 목록 가져오기 - single_choice 타입만 필터링
-    cur = fb_conn.cursor()
-    cur.execute(
-        "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
-    )
-    keywords = [row[0] for row in cur.fetchall()]
 
-    cur.execute(
-        "SELECT DISTINCT id FROM feedback_questions WHERE question_type = 'long_answer'"
+def create_score_table(fb_conn):
+    """답변 -> 점수 매핑 테이블을 연결의 임시 테이블로 만드는 함수 (feedback.db 파일은 변경하지 않음)"""
+    fb_conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS answer_scores (label TEXT PRIMARY KEY, score INTEGER NOT NULL)"
     )
-    question_ids = [row[0] for row in cur.fetchall()]
+    fb_conn.executemany(
+        "INSERT OR REPLACE INTO answer_scores (label, score) VALUES (?, ?)",
+        SCORE_MAP.items(),
+    )
+
 
-    # 객관식(single_choice) 데이터 처리
-    query = """
-    SELECT fr.to_username, fq.keyword, fr.answer_content
+def fetch_keyword_averages(fb_conn, keywords, since=None, cycle_id=DEFAULT_CYCLE_ID):
+    """
+    리뷰 주기의 사용자별 키워드 평균 점수를 조회하는 함수
+    답변의 점수 변환, 키워드별 평균, 피벗을 모두 SQLite에서 처리하므로
+    답변 행 전체가 아니라 사용자별 집계 결과만 가져옵니다.
+    since가 주어지면 feedback_results.id가 since보다 큰 답변을 받은 사용자만 다시 계산합니다.
+
+    Returns:
+        pd.DataFrame: to_username과 키워드별 평균 컬럼 (to_username 순으로 정렬)
+    """
+    create_score_table(fb_conn)
+    averages = "".join(
+        f", AVG(CASE WHEN fq.keyword = ? THEN s.score END) AS {sql_identifier(keyword)}"
+        for keyword in keywords
+    )
+    # 증분 갱신: since 이후 답변을 받은 사용자만
+    changed = (
+        ""
+        if since is None
+        else "AND fr.to_username IN (SELECT to_username FROM feedback_results WHERE cycle_id = ? AND id > ?)"
+    )
+    query = f"""
+    SELECT fr.to_username{averages}
     FROM feedback_results fr
     JOIN feedback_questions fq ON fr.question_id = fq.id
-    WHERE fq.question_type = 'single_choice'
+    JOIN temp.answer_scores s ON s.label = fr.answer_content
+    WHERE fr.cycle_id = ? AND fq.question_type = 'single_choice'
+    {changed}
+    GROUP BY fr.to_username
+    ORDER BY fr.to_username
+    """
+    params = keywords + [cycle_id]
+    if since is not None:
+        params += [cycle_id, since]
+    # 답변이 없는 키워드도 실수 컬럼(NaN)으로 받음
+    return pd.read_sql_query(
+        query, fb_conn, params=params, dtype={keyword: float for keyword in keywords}
+    )
+
+
+def assign_grades(totals):
     """
+    총합 점수에 등급을 매기는 함수
+    상위부터 GRADE_RATIOS 비율의 분위수를 경계값으로 계산한 뒤,
+    np.searchsorted로 각 점수가 넘는 가장 높은 경계값의 등급을 한 번에 찾습니다.
 
-    df = pd.read_sql_query(query, fb_conn)
+    Returns:
+        np.ndarray: totals와 같은 순서의 등급 배열
+    """
+    totals = np.asarray(totals, dtype=float)
+    if totals.size == 0:
+        return np.array([], dtype=object)
 
-    # 점수 매핑
-    score_map = {"매우우수": 5, "우수": 4, "보통": 3, "미흡": 2, "매우미흡": 1}
+    # 등급별 하한 (S, A, B, C, D 순, 분위수는 0~1 범위로 제한)
+    quantiles = np.clip(1 - np.cumsum(GRADE_RATIOS), 0, 1)
+    thresholds = np.quantile(totals, quantiles)
 
-    df["score"] = df["answer_content"].map(score_map)
+    # 오름차순 경계값에서 점수 이하인 경계값 수를 세면, 그보다 높은 경계값 수가 등급 순위
+    above = len(thresholds) - np.searchsorted(thresholds[::-1], totals, side="right")
+    return np.array(GRADES, dtype=object)[np.minimum(above, len(GRADES) - 1)]
 
-    # 키워드별 평균 계산
-    pivot_df = df.pivot_table(
-        index="to_username", columns="keyword", values="score", aggfunc="mean"
-    ).reset_index()
 
-    # to_username으로 정렬
-    pivot_df = pivot_df.sort_values("to_username")
+def build_multiple_rows(user_df, keywords):
+    """
+    사용자별 키워드 평균에 총합, 'average' 행, 등급을 붙여 multiple 테이블 행을 만드는 함수
+    등급 경계값은 전체 사용자의 총합으로 계산합니다.
+    """
+    pivot_df = user_df.sort_values("to_username").reset_index(drop=True)
 
     # 수치형 컬럼 소수점 2자리로 반올림
     for column in keywords:
@@ -157,108 +564,265 @@ def process_feedback_data():
     pivot_df = pivot_df._append(average_row, ignore_index=True)
 
     # '등급' 열 추가
-    def map_grade(pivot_df, column="총합"):
-        # 값 기준으로 내림차순 정렬
-        sorted_values = pivot_df[pivot_df["to_username"] != "average"][
-            column
-        ].sort_values(ascending=False)
-        total_count = len(sorted_values)
-
-        # 등급 비율
-        ratios = [0.1, 0.2, 0.3, 0.3, 0.1]
-        grades = ["S", "A", "B", "C", "D"]
-
-        # 각 등급의 경계값 계산 (0~1 범위로 제한)
-        thresholds = [
-            sorted_values.quantile(max(0, min(1, 1 - sum(ratios[: i + 1]))))
-            for i in range(len(ratios))
-        ]
-
-        # 등급 매핑
-        def assign_grade(value):
-            for grade, threshold in zip(grades, thresholds):
-                if value >= threshold:
-                    return grade
-            return "D"  # 가장 낮은 등급
+    is_user = pivot_df["to_username"] != "average"
+    pivot_df.loc[is_user, "등급"] = assign_grades(pivot_df.loc[is_user, "총합"])
+    return pivot_df
 
-        return pivot_df[column].map(assign_grade)
 
-    pivot_df.loc[pivot_df["to_username"] != "average", "등급"] = map_grade(pivot_df)
+def read_keyword_scores(result_conn, keywords, cycle_id):
+    """저장된 사용자별 키워드 점수를 (to_username, 키워드별 컬럼) 형태로 조회 ('average' 제외)"""
+    scores = pd.read_sql_query(
+        "SELECT to_username, keyword, score FROM result_scores WHERE cycle_id = ? AND to_username != 'average'",
+        result_conn,
+        params=(cycle_id,),
+    )
+    return (
+        scores.pivot(index="to_username", columns="keyword", values="score")
+        .reindex(columns=keywords)
+        .rename_axis(columns=None)
+        .reset_index()
+    )
 
-    # 결과 DB에 저장
-    result_conn = get_result_connection()
 
-    # multiple 테이블 데이터 저장
-    for _, row in tqdm(
-        pivot_df.iterrows(),
-        total=pivot_df.shape[0],
-        desc="Processing multiple choice data",
-    ):  # tqdm 추가
-        cur = result_conn.cursor()
-        placeholders = ", ".join(
-            ["?" for _ in range(len(keywords) + 3)]
-        )  # '총합'과 '등급' 추가
-        columns = ["to_username"] + keywords + ["총합", "등급"]
-
-        values = (
-            [row["to_username"]]
-            + [row.get(keyword, 0) for keyword in keywords]
-            + [row["총합"], row.get("등급", "")]
+def update_multiple(
+    fb_conn, result_conn, keywords, since=None, cycle_id=DEFAULT_CYCLE_ID
+):
+    """
+    객관식 결과(result_scores, result_totals)를 갱신하는 함수
+    since가 주어지면 새 답변을 받은 사용자만 평균을 다시 계산하고, 나머지 사용자는 저장된 값을 사용합니다.
+    등급과 'average' 행은 전체 사용자 기준이므로 매번 다시 계산합니다.
+    """
+    user_df = fetch_keyword_averages(fb_conn, keywords, since=since, cycle_id=cycle_id)
+    changed = user_df["to_username"].tolist() + ["average"]
+    if since is None:
+        result_conn.execute("DELETE FROM result_scores WHERE cycle_id = ?", (cycle_id,))
+    else:
+        existing = read_keyword_scores(result_conn, keywords, cycle_id)
+        existing = existing[~existing["to_username"].isin(user_df["to_username"])]
+        user_df = pd.concat([existing, user_df], ignore_index=True)
+    pivot_df = build_multiple_rows(user_df, keywords)
+
+    # 다시 계산한 사용자와 'average'의 키워드 점수만 저장 (빈 값은 저장하지 않음)
+    result_conn.executemany(
+        "DELETE FROM result_scores WHERE cycle_id = ? AND to_username = ?",
+        ((cycle_id, username) for username in changed),
+    )
+    scores = (
+        pivot_df[pivot_df["to_username"].isin(changed)]
+        .melt(
+            id_vars="to_username",
+            value_vars=keywords,
+            var_name="keyword",
+            value_name="score",
         )
+        .dropna(subset=["score"])
+    )
+    result_conn.executemany(
+        "INSERT INTO result_scores (cycle_id, to_username, keyword, score) VALUES (?, ?, ?, ?)",
+        (
+            (cycle_id, username, keyword, float(score))
+            for username, keyword, score in scores.itertuples(index=False)
+        ),
+    )
+
+    # 총합과 등급은 전체 사용자 다시 저장
+    result_conn.execute("DELETE FROM result_totals WHERE cycle_id = ?", (cycle_id,))
+    totals = pivot_df[["to_username", "총합", "등급"]].astype(object)
+    totals = totals.where(totals.notna(), None)
+    result_conn.executemany(
+        "INSERT INTO result_totals (cycle_id, to_username, total, grade) VALUES (?, ?, ?, ?)",
+        ((cycle_id, *row) for row in totals.itertuples(index=False, name=None)),
+    )
 
-        insert_sql = f"""
-            INSERT INTO multiple (
-                {', '.join(columns)}
-            ) VALUES ({placeholders})
-        """
-        cur.execute(insert_sql, values)
 
-    # 주관식 데이터 처리
+def update_subjective(fb_conn, result_conn, since, until, cycle_id=DEFAULT_CYCLE_ID):
+    """
+    주관식 결과(result_feedback)를 갱신하는 함수
+    feedback_results.id가 (since, until] 범위인 새 주관식 답변만 톤 정규화해 normalized_answers에 저장하고,
+    새 답변을 받은 사용자의 결과만 저장된 정규화 답변으로 다시 만듭니다.
+    """
+    create_score_table(fb_conn)
     subj_query = """
-    SELECT fr.to_username, fq.id AS question_id, fr.answer_content
+    SELECT fr.id AS feedback_id, fr.to_username, fq.id AS question_id, fr.answer_content
     FROM feedback_results fr
     JOIN feedback_questions fq ON fr.question_id = fq.id
-    WHERE fr.answer_content NOT IN ('매우우수', '우수', '보통', '미흡', '매우미흡') AND fq.question_type == 'long_answer'
+    WHERE fr.answer_content NOT IN (SELECT label FROM temp.answer_scores) AND fq.question_type == 'long_answer'
+    AND fr.cycle_id = ? AND fr.id > ? AND fr.id <= ?
+    ORDER BY fr.id
     """
+    subj_df = pd.read_sql_query(subj_query, fb_conn, params=(cycle_id, since, until))
+    if subj_df.empty:
+        return
+
+    # 새 답변을 한 번에 톤 정규화 (공유 클라이언트로 동시 요청)
+    with ThreadPoolExecutor(max_workers=TONE_MAX_WORKERS) as executor:
+        subj_df["answer"] = normalize_tone(
+            subj_df["answer_content"].tolist(), executor=executor
+        )
+    result_conn.executemany(
+        """
+        INSERT OR REPLACE INTO normalized_answers (cycle_id, feedback_id, to_username, question_id, answer)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            (cycle_id, *row)
+            for row in subj_df[
+                ["feedback_id", "to_username", "question_id", "answer"]
+            ].itertuples(index=False, name=None)
+        ),
+    )
 
-    subj_df = pd.read_sql_query(subj_query, fb_conn)
-
-    # subjective 테이블 데이터 저장
-    for username in tqdm(
-        subj_df["to_username"].unique(), desc="Processing subjective data"
-    ):
-        feedbacks = subj_df[subj_df["to_username"] == username]
-
-        # 각 질문 ID에 대해 답변 리스트 생성 및 톤 정규화
-        feedback_dict = {
-            f"q_{question_id}": normalize_tone(
-                feedbacks[feedbacks["question_id"] == question_id][
-                    "answer_content"
-                ].tolist()
-            )
-            for question_id in question_ids
-        }
-
-        cur = result_conn.cursor()
-        # 데이터 삽입
-        insert_values = [username] + [
-            str(feedback_dict.get(f"q_{question_id}", []))
-            for question_id in question_ids
-        ]
-        cur.execute(
-            f"""
-            INSERT INTO subjective (to_username, {', '.join([f'q_{question_id}' for question_id in question_ids])})
-            VALUES (?, {', '.join(['?' for _ in range(len(question_ids))])})
+    # 새 답변을 받은 사용자의 정규화 답변을 질문별로 모음
+    result_conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS changed_users (username TEXT PRIMARY KEY)"
+    )
+    result_conn.execute("DELETE FROM temp.changed_users")
+    result_conn.executemany(
+        "INSERT INTO temp.changed_users (username) VALUES (?)",
+        ((username,) for username in subj_df["to_username"].unique()),
+    )
+    feedback_by_user = {}
+    for username, question_id, answer in result_conn.execute(
+        """
+        SELECT to_username, question_id, answer FROM normalized_answers
+        WHERE cycle_id = ? AND to_username IN (SELECT username FROM temp.changed_users)
+        ORDER BY feedback_id
         """,
-            insert_values,
-        )
+        (cycle_id,),
+    ):
+        feedback_by_user.setdefault(username, {}).setdefault(
+            f"q_{question_id}", []
+        ).append(answer)
+
+    # result_feedback 데이터 저장 (사용자, 질문별 한 행)
+    result_conn.execute(
+        "DELETE FROM result_feedback WHERE cycle_id = ? AND to_username IN (SELECT username FROM temp.changed_users)",
+        (cycle_id,),
+    )
+    result_conn.executemany(
+        "INSERT INTO result_feedback (cycle_id, to_username, question_id, answers) VALUES (?, ?, ?, ?)",
+        (
+            (cycle_id, username, int(question[2:]), str(answers))
+            for username, feedback_dict in feedback_by_user.items()
+            for question, answers in feedback_dict.items()
+        ),
+    )
+
 
+def process_feedback_data(since=None, cycle_id=None):
+    """
+    feedback.db의 리뷰 주기(기본값: 현재 주기) 피드백을 집계해 result.db에 저장하는 함수
+    since(마지막으로 반영한 feedback_results.id)가 주어지면 그 이후의 새 피드백만 반영하고,
+    없으면 해당 주기의 결과만 처음부터 다시 만듭니다. (다른 주기의 결과는 유지)
+    """
+    fb_conn = get_feedback_connection()
+    result_conn = get_result_connection()
+    if cycle_id is None:
+        cycle_id = get_current_cycle_id(fb_conn)
+    keywords, question_ids = fetch_question_columns(fb_conn, cycle_id)
+
+    # 이번에 반영할 마지막 답변 (실행 중 들어온 답변은 다음 갱신 때 반영)
+    until = fb_conn.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM feedback_results"
+    ).fetchone()[0]
+
+    if since is None:
+        clear_result_cycle(result_conn, cycle_id)
+    if since is None or until > since:
+        # 객관식(single_choice) 데이터 처리 (사용자별 키워드 평균은 SQLite에서 계산)
+        update_multiple(fb_conn, result_conn, keywords, since=since, cycle_id=cycle_id)
+        # 주관식 데이터 처리
+        update_subjective(fb_conn, result_conn, since or 0, until, cycle_id=cycle_id)
+
+    # 새로 추가된 키워드/질문도 컬럼으로 보이도록 호환 뷰는 매번 다시 만듦
+    create_result_views(result_conn, keywords, question_ids, cycle_id)
+    result_conn.execute("DELETE FROM result_questions WHERE cycle_id = ?", (cycle_id,))
+    result_conn.executemany(
+        "INSERT INTO result_questions (cycle_id, question_id, keyword, question_type) VALUES (?, ?, ?, ?)",
+        ((cycle_id, *question) for question in fetch_question_set(fb_conn, cycle_id)),
+    )
+    result_conn.executemany(
+        "INSERT OR REPLACE INTO build_state (key, value) VALUES (?, ?)",
+        [("last_feedback_id", until), ("cycle_id", cycle_id)],
+    )
     result_conn.commit()
     result_conn.close()
     fb_conn.close()
 
 
-if __name__ == "__main__":
-    if not os.path.exists(RESULT_DB_PATH):  # result.db가 이미 존재하는 경우
+def build_result_db(full=False):
+    """
+    현재 리뷰 주기의 결과를 만들거나 새 피드백만 반영해 갱신하는 함수
+    현재 주기를 처음 만들 때(새 주기 시작 포함), 질문이 삭제/수정되었을 때, full=True일 때는
+    현재 주기를 처음부터 다시 만듭니다. (이미 정규화한 답변은 LLM 응답 캐시에서 재사용)
+    """
+    init_result_db()
+    fb_conn = get_feedback_connection()
+    cycle_id = get_current_cycle_id(fb_conn)
+    since = None
+    if not full:
+        result_conn = get_result_connection()
+        since = read_high_water_mark(result_conn, cycle_id)
+        if since is not None and not question_set_matches(
+            fb_conn, result_conn, cycle_id
+        ):
+            since = None
+        result_conn.close()
+    fb_conn.close()
+    process_feedback_data(since=since, cycle_id=cycle_id)
+
+
+def archive_result_cycle(cycle_id, archive_path=None):
+    """
+    지난 리뷰 주기를 별도 파일로 보관하는 함수
+    result.db의 결과와 feedback.db의 질문, 답변, 마감일(db.models.qa.archive_cycle)을 같은 파일로 옮깁니다.
+    결과(다시 만들 수 있는 쪽)를 먼저 옮기고 feedback.db를 나중에 옮기며, 두 단계 모두 다시 실행해도
+    같은 결과이므로 중간에 실패하면 같은 명령을 다시 실행하면 됩니다.
+
+    Returns:
+        str: 보관 파일 경로
+    """
+    fb_conn = get_feedback_connection()
+    try:
+        check_archivable(fb_conn, cycle_id)
+        archive_path = archive_path or archive_path_for(cycle_id)
+        os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+
         init_result_db()
-        process_feedback_data()
+        result_conn = get_result_connection()
+        result_conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        try:
+            move_rows_to_archive(result_conn, RESULT_CYCLE_TABLES, cycle_id)
+            result_conn.commit()
+        finally:
+            result_conn.execute("DETACH DATABASE archive")
+            result_conn.close()
+
+        return archive_cycle(fb_conn, cycle_id, archive_path)
+    finally:
+        fb_conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="피드백 결과(result.db) 생성")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="새 피드백만 반영하지 않고 현재 리뷰 주기를 처음부터 다시 생성",
+    )
+    parser.add_argument(
+        "--archive",
+        type=int,
+        metavar="CYCLE_ID",
+        help="지난 리뷰 주기의 피드백과 결과를 db/archive/cycle_<id>.db로 옮김",
+    )
+    args = parser.parse_args()
+
+    if args.archive is not None:
+        try:
+            print(f"보관 완료: {archive_result_cycle(args.archive)}")
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        build_result_db(full=args.full)
+        print_llm_metrics()
@@ -1,22 +1,54 @@
 import os
 import sqlite3
+import threading
 
 from .user import init_users_db, seed_users_data
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "feedback.db")
+# 지난 리뷰 주기를 옮겨 둘 파일 위치 (주기마다 cycle_<id>.db 파일 하나)
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive")
+
+# 첫 리뷰 주기 (cycle_id 컬럼이 없던 기존 데이터는 이 주기로 옮김)
+DEFAULT_CYCLE_ID = 1
+
+# 리뷰 주기별로 나누는 테이블 (주기 보관 시 이 테이블의 행을 옮김)
+CYCLE_TABLES = ["feedback_questions", "feedback_results", "feedback_deadline"]
+
+# 이 프로세스에서 이미 주기 컬럼을 확인한 feedback.db 경로
+_migrated_paths = set()
+_migrate_lock = threading.Lock()
+
+
+def connect_feedback_db(db_path=None):
+    """
+    feedback.db 연결을 여는 함수
+    cycle_id 컬럼이 없던 기존 파일은 프로세스에서 처음 연결할 때 한 번 migrate_cycle_columns로 옮깁니다.
+    (테이블이 아직 없는 새 파일은 init_db에서 만듦)
+    """
+    db_path = db_path or DB_PATH
+    conn = sqlite3.connect(db_path)
+    key = os.path.abspath(db_path)
+    with _migrate_lock:
+        if key not in _migrated_paths and cycle_tables_exist(conn):
+            migrate_cycle_columns(conn)
+            conn.commit()
+            _migrated_paths.add(key)
+    return conn
 
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    return connect_feedback_db(DB_PATH)
 
 
 def init_db():
     """
     DB 테이블 구조:
     1) users: (id, username, name, password, role, email, created_at)
-    2) feedback_questions: (id, keyword, question_text, question_type, options, created_at)
-    3) feedback_results: (id, question_id, from_username, to_username, answer_content, created_at)
-    4) feedback_deadline: (id, start_date, deadline, remind_days, remind_time, created_at)
+    2) review_cycles: (id, name, archive_path, created_at)
+    3) feedback_questions: (id, cycle_id, keyword, question_text, question_type, options, created_at)
+    4) feedback_results: (id, cycle_id, question_id, from_username, to_username, answer_content, created_at)
+    5) feedback_deadline: (id, cycle_id, start_date, deadline, remind_days, remind_time, created_at)
+    질문, 답변, 마감일은 리뷰 주기(cycle_id)별로 저장하며, 가장 최근 주기가 현재 주기입니다.
     """
     conn = get_connection()
     cur = conn.cursor()
@@ -30,7 +62,8 @@ def init_db():
         question_text TEXT NOT NULL,
         question_type TEXT NOT NULL,
         options TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        cycle_id INTEGER NOT NULL DEFAULT 1
     )
     """
     )
@@ -44,17 +77,13 @@ def init_db():
         from_username TEXT NOT NULL,
         to_username TEXT NOT NULL,
         answer_content TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        cycle_id INTEGER NOT NULL DEFAULT 1
     )
     """
     )
 
-    # feedback_deadline
-    cur.execute(
-        """
-    DROP TABLE IF EXISTS feedback_deadline;
-    """
-    )
+    # feedback_deadline (주기마다 하나, 지난 주기의 마감일도 남겨 둠)
     cur.execute(
         """
     CREATE TABLE IF NOT EXISTS feedback_deadline (
@@ -63,17 +92,203 @@ def init_db():
         deadline DATETIME NOT NULL,
         remind_days INTEGER NOT NULL,
         remind_time TEXT NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        cycle_id INTEGER NOT NULL DEFAULT 1
     );
     """
     )
 
+    # review_cycles와 주기 인덱스
+    migrate_cycle_columns(conn)
     conn.commit()
     conn.close()
 
     init_users_db()
 
 
+def migrate_cycle_columns(conn):
+    """
+    cycle_id 컬럼이 없던 기존 feedback.db에 컬럼을 추가하고(기존 행은 첫 주기), 주기 기준 인덱스를 만드는 함수
+    현재 주기의 조회는 모두 (cycle_id, ...) 인덱스 범위 검색이므로 지난 주기 데이터가 쌓여도 느려지지 않습니다.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS review_cycles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        archive_path TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+    for table in CYCLE_TABLES:
+        columns = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+        if "cycle_id" not in columns:
+            cur.execute(
+                f"ALTER TABLE {table} ADD COLUMN cycle_id INTEGER NOT NULL DEFAULT {DEFAULT_CYCLE_ID}"
+            )
+
+    cur.execute(
+        "INSERT OR IGNORE INTO review_cycles (id) VALUES (?)", (DEFAULT_CYCLE_ID,)
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feedback_questions_cycle ON feedback_questions (cycle_id, question_type)"
+    )
+    # 받은 피드백 조회/집계용, 작성한 피드백 조회용
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feedback_results_cycle_to ON feedback_results (cycle_id, to_username, from_username)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feedback_results_cycle_from ON feedback_results (cycle_id, from_username, to_username)"
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_deadline_cycle ON feedback_deadline (cycle_id)"
+    )
+
+
+def cycle_tables_exist(conn):
+    """주기별로 나누는 테이블(CYCLE_TABLES)이 모두 있는지 확인"""
+    placeholders = ",".join("?" * len(CYCLE_TABLES))
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        CYCLE_TABLES,
+    ).fetchone()
+    return row[0] == len(CYCLE_TABLES)
+
+
+def get_current_cycle_id(conn):
+    """현재(가장 최근) 리뷰 주기 ID"""
+    row = conn.execute("SELECT MAX(id) FROM review_cycles").fetchone()
+    return row[0] if row and row[0] is not None else DEFAULT_CYCLE_ID
+
+
+def list_cycles(conn):
+    """리뷰 주기 목록 (최근 주기부터)"""
+    cur = conn.execute(
+        """
+        SELECT c.id, c.name, c.archive_path, c.created_at,
+               (SELECT COUNT(*) FROM feedback_results r WHERE r.cycle_id = c.id)
+        FROM review_cycles c
+        ORDER BY c.id DESC
+        """
+    )
+    return [
+        {
+            "id": row[0],
+            "name": row[1],
+            "archive_path": row[2],
+            "created_at": row[3],
+            "feedback_count": row[4],
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def start_cycle(conn, name=None, copy_questions=True):
+    """
+    새 리뷰 주기를 시작하는 함수 (이후 질문, 답변, 마감일은 새 주기에 저장)
+    copy_questions가 True이면 이전 주기의 질문을 새 주기로 복사합니다. (질문 ID는 새로 발급)
+
+    Returns:
+        int: 새 리뷰 주기 ID
+    """
+    previous = get_current_cycle_id(conn)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO review_cycles (name) VALUES (?)", (name,))
+    cycle_id = cur.lastrowid
+    if copy_questions:
+        cur.execute(
+            """
+            INSERT INTO feedback_questions (cycle_id, keyword, question_text, question_type, options)
+            SELECT ?, keyword, question_text, question_type, options
+            FROM feedback_questions
+            WHERE cycle_id = ?
+            ORDER BY id
+            """,
+            (cycle_id, previous),
+        )
+    conn.commit()
+    return cycle_id
+
+
+def archive_path_for(cycle_id):
+    return os.path.join(ARCHIVE_DIR, f"cycle_{int(cycle_id)}.db")
+
+
+def check_archivable(conn, cycle_id):
+    """보관할 수 있는 리뷰 주기인지 확인 (없는 주기나 현재 주기면 ValueError)"""
+    if (
+        conn.execute("SELECT 1 FROM review_cycles WHERE id = ?", (cycle_id,)).fetchone()
+        is None
+    ):
+        raise ValueError(f"존재하지 않는 리뷰 주기입니다: {cycle_id}")
+    if cycle_id == get_current_cycle_id(conn):
+        raise ValueError("현재 리뷰 주기는 보관할 수 없습니다.")
+
+
+def move_rows_to_archive(conn, tables, cycle_id):
+    """
+    연결에 archive로 붙인(ATTACH) 파일로 tables의 cycle_id 행을 옮기는 함수
+    보관 파일의 테이블은 원본과 같은 컬럼으로 만들고, 옮긴 행은 원본에서 삭제합니다.
+    원본에 행이 남아 있으면 보관 파일의 같은 주기 행을 원본으로 덮어쓰므로, 중간에 실패해도 다시 실행하면 됩니다.
+    """
+    for table in tables:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0"
+        )
+        conn.execute(
+            f"""
+            DELETE FROM archive.{table} WHERE cycle_id = ?
+            AND EXISTS (SELECT 1 FROM main.{table} WHERE cycle_id = ?)
+            """,
+            (cycle_id, cycle_id),
+        )
+        conn.execute(
+            f"INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE cycle_id = ?",
+            (cycle_id,),
+        )
+        conn.execute(f"DELETE FROM main.{table} WHERE cycle_id = ?", (cycle_id,))
+
+
+def archive_cycle(conn, cycle_id, archive_path=None):
+    """
+    지난 리뷰 주기의 질문, 답변, 마감일을 별도 파일로 옮기는 함수
+    없는 주기나 현재 주기는 보관할 수 없습니다. 주기 목록(review_cycles)에는 보관 파일 위치가 남습니다.
+    이미 보관한 주기를 다시 보관해도 결과는 같습니다.
+
+    Returns:
+        str: 보관 파일 경로
+    """
+    check_archivable(conn, cycle_id)
+    archive_path = archive_path or archive_path_for(cycle_id)
+    os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    try:
+        move_rows_to_archive(conn, CYCLE_TABLES, cycle_id)
+        # 보관 파일만으로도 어떤 주기인지 알 수 있도록 주기 정보를 복사
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive.review_cycles AS SELECT * FROM main.review_cycles WHERE 0"
+        )
+        conn.execute(
+            "UPDATE review_cycles SET archive_path = ? WHERE id = ?",
+            (archive_path, cycle_id),
+        )
+        conn.execute("DELETE FROM archive.review_cycles WHERE id = ?", (cycle_id,))
+        conn.execute(
+            "INSERT INTO archive.review_cycles SELECT * FROM main.review_cycles WHERE id = ?",
+            (cycle_id,),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    return archive_path
+
+
 def seed_data():
     """
     최초 실행 시 데이터 초기화
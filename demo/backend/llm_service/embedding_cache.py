@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+EMBEDDING_CACHE_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "db/embedding_cache.db"
+)
+# 캐시 최대 크기 (임베딩 바이트 합계 기준, 초과 시 오래 사용되지 않은 항목부터 삭제)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# 적중 시 last_used는 이 시간(초)보다 오래됐을 때만 갱신 (적중할 때마다 디스크에 쓰지 않도록)
+# 삭제 순서(LRU)는 이 정도 오차면 충분합니다.
+TOUCH_INTERVAL = 60 * 60
+# 한 번의 IN (...) 조회에 넣을 최대 키 수 (SQLite 변수 개수 제한)
+LOOKUP_BATCH_SIZE = 500
+
+
+def embedding_cache_key(model, text):
+    """모델 이름과 텍스트로 만든 content-addressed 키"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite 파일 기반 임베딩 캐시
+    키: sha256(모델 이름 + 텍스트), 값: float32 임베딩
+    여러 스레드와 프로세스(save_book_info, book_recommendation 등)가 같은 파일을 공유합니다.
+    """
+
+    def __init__(
+        self,
+        db_path=EMBEDDING_CACHE_DB_PATH,
+        max_bytes=DEFAULT_MAX_BYTES,
+        touch_interval=TOUCH_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            nbytes INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        # 전체 크기(nbytes 합계)는 트리거로 갱신해 매번 SUM으로 다시 세지 않음
+        # (여러 프로세스가 같은 파일에 써도 같은 트랜잭션 안에서 갱신되므로 항상 맞음)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO cache_size (id, bytes) SELECT 1, COALESCE(SUM(nbytes), 0) FROM embeddings"
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS embeddings_size_insert AFTER INSERT ON embeddings
+        BEGIN UPDATE cache_size SET bytes = bytes + NEW.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS embeddings_size_delete AFTER DELETE ON embeddings
+        BEGIN UPDATE cache_size SET bytes = bytes - OLD.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS embeddings_size_update AFTER UPDATE OF nbytes ON embeddings
+        BEGIN UPDATE cache_size SET bytes = bytes + NEW.nbytes - OLD.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.commit()
+
+    def get(self, model, text):
+        """캐시된 임베딩을 반환합니다. 없으면 None"""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model, texts):
+        """
+        여러 텍스트의 캐시된 임베딩을 입력과 같은 순서로 반환합니다. (없는 항목은 None)
+        조회는 IN (...) 배치로 하고, last_used가 touch_interval보다 오래된 항목만 한 번의 커밋으로 갱신합니다.
+        """
+        keys = [embedding_cache_key(model, text) for text in texts]
+        now = time.time()
+        found = {}
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), LOOKUP_BATCH_SIZE):
+                batch = unique_keys[start : start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, vector, last_used in rows:
+                    found[key] = (vector, last_used)
+
+            stale = [
+                (now, key)
+                for key, (_, last_used) in found.items()
+                if now - last_used >= self.touch_interval
+            ]
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", stale
+                )
+                self._conn.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [
+            (
+                np.frombuffer(found[key][0], dtype=np.float32).tolist()
+                if key in found
+                else None
+            )
+            for key in keys
+        ]
+
+    def put(self, model, text, embedding):
+        self.put_many(model, [(text, embedding)])
+
+    def put_many(self, model, items):
+        """(텍스트, 임베딩) 목록을 한 번의 트랜잭션으로 저장하고, 크기 제한은 마지막에 한 번만 확인합니다."""
+        now = time.time()
+        rows = []
+        for text, embedding in items:
+            vector = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append(
+                (embedding_cache_key(model, text), model, vector, len(vector), now)
+            )
+        if not rows:
+            return
+        with self._lock:
+            # INSERT OR REPLACE는 삭제 트리거를 실행하지 않으므로 UPSERT로 덮어씀
+            self._conn.executemany(
+                """
+                INSERT INTO embeddings (key, model, vector, nbytes, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    model = excluded.model,
+                    vector = excluded.vector,
+                    nbytes = excluded.nbytes,
+                    last_used = excluded.last_used
+            """,
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def get_or_create(self, model, text, create_fn):
+        """
+        캐시에 있으면 반환하고, 없으면 create_fn()으로 생성해 저장합니다.
+        create_fn이 None을 반환하면(생성 실패) 저장하지 않습니다.
+        """
+        embedding = self.get(model, text)
+        if embedding is not None:
+            return embedding
+        embedding = create_fn()
+        if embedding is not None:
+            self.put(model, text, embedding)
+        return embedding
+
+    def _evict(self):
+        """전체 크기가 max_bytes를 넘으면 오래 사용되지 않은 항목부터 삭제 (90%까지)"""
+        total = self._conn.execute(
+            "SELECT bytes FROM cache_size WHERE id = 1"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, nbytes FROM embeddings ORDER BY last_used"
+        )
+        evicted = []
+        for key, nbytes in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= nbytes
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM embeddings), bytes FROM cache_size WHERE id = 1"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "count": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """프로세스 전체에서 공유하는 임베딩 캐시 (처음 사용할 때 생성)"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
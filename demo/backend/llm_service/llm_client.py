@@ -0,0 +1,203 @@
+import os
+import random
+import threading
+import time
+
+import openai
+from dotenv import load_dotenv
+from langchain_upstage import ChatUpstage
+from llm_service.rate_limiter import AdaptiveConcurrency, RateLimiter
+
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+# Upstage API 주소 (로컬 대체 서버 llm_service/stub_server.py를 사용하려면
+# UPSTAGE_BASE_URL=http://127.0.0.1:8100/v1/solar 로 지정)
+UPSTAGE_BASE_URL = os.getenv("UPSTAGE_BASE_URL", "https://api.upstage.ai/v1/solar")
+# Upstage API 한도 (계정 등급에 맞게 환경 변수로 조정)
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("UPSTAGE_REQUESTS_PER_MINUTE", "100"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("UPSTAGE_TOKENS_PER_MINUTE", "200000"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("UPSTAGE_MAX_CONCURRENCY", "8"))
+
+# 일시적인 오류로 보고 재시도할 예외 (langchain_upstage도 내부적으로 openai 클라이언트 사용)
+TRANSIENT_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def is_rate_limited(e):
+    """요청 한도 초과(429) 오류인지 확인"""
+    if isinstance(e, openai.RateLimitError):
+        return True
+    if e.args and isinstance(e.args[0], dict):
+        return e.args[0].get("error", {}).get("code") == "too_many_requests"
+    return "429" in str(e) or "too_many_requests" in str(e)
+
+
+def retry_after(e):
+    """응답의 Retry-After 헤더(초). 없으면 None"""
+    response = getattr(e, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(*texts):
+    """토큰 수 추정 (한글은 대략 글자당 1토큰 이하이므로 글자 수를 상한으로 사용)"""
+    return sum(len(text) for text in texts if text)
+
+
+class LLMClient:
+    """
+    모든 Upstage(LLM, 임베딩) 호출이 공유하는 호출기
+    - 분당 요청 수/토큰 수 토큰 버킷으로 프로세스 전체 호출 속도를 제한
+    - 429를 받으면 동시 요청 수를 절반으로 줄이고(AIMD), 성공하면 천천히 늘림
+    - 429와 일시적인 오류는 지터를 넣은 지수 백오프(상한 max_backoff)로 max_attempts번까지 재시도
+    - 호출 이름별 호출 수, 재시도, 429, 실패, 지연 시간을 기록
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        max_attempts=5,
+        base_backoff=1.0,
+        max_backoff=30.0,
+        sleep=time.sleep,
+    ):
+        self.request_limiter = RateLimiter(
+            requests_per_minute / 60, burst=max(1, max_concurrency)
+        )
+        # 토큰 버킷은 10초 분량까지 몰아서 사용할 수 있게 함
+        self.token_limiter = RateLimiter(
+            tokens_per_minute / 60, burst=max(1, tokens_per_minute / 6)
+        )
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """attempt번째 실패 후 대기 시간 (full jitter)"""
+        return random.uniform(
+            0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+        )
+
+    def call(self, fn, *args, name="llm", tokens=1, **kwargs):
+        """
+        fn(*args, **kwargs)을 속도 제한과 재시도를 적용해 호출합니다.
+
+        Args:
+            fn: API 호출 함수 (예: solar_client.chat.completions.create, chain.invoke)
+            name: 지표를 기록할 호출 이름
+            tokens: 예상 토큰 수 (입력과 응답 포함, 보통 입력 추정치의 2배)
+
+        Raises:
+            재시도할 수 없는 오류이거나 max_attempts번 모두 실패하면 마지막 예외
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(tokens)
+            ticket = self.concurrency.acquire()
+            start = time.monotonic()
+            rate_limited = failed = False
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                failed = True
+                rate_limited = is_rate_limited(e)
+                retryable = rate_limited or isinstance(e, TRANSIENT_ERRORS)
+                final = not retryable or attempt == self.max_attempts
+                self._record(
+                    name,
+                    time.monotonic() - start,
+                    rate_limited,
+                    done=final,
+                    failed=final,
+                )
+                if final:
+                    raise
+                delay = self.backoff(attempt)
+                if rate_limited:
+                    delay = max(delay, retry_after(e) or 0)
+            else:
+                self._record(name, time.monotonic() - start)
+                return result
+            finally:
+                self.concurrency.release(ticket, rate_limited, failed)
+            self._sleep(delay)
+
+    def _record(self, name, latency, rate_limited=False, done=True, failed=False):
+        """시도 한 번의 결과를 기록 (done: 호출이 끝남, failed: 최종 실패)"""
+        with self._metrics_lock:
+            metric = self._metrics.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "attempts": 0,
+                    "rate_limited": 0,
+                    "failures": 0,
+                    "latency": 0.0,
+                },
+            )
+            metric["attempts"] += 1
+            metric["latency"] += latency
+            metric["rate_limited"] += int(rate_limited)
+            metric["calls"] += int(done)
+            metric["failures"] += int(failed)
+
+    def metrics(self):
+        """호출 이름별 지표와 현재 동시 요청 한도"""
+        with self._metrics_lock:
+            snapshot = {name: dict(metric) for name, metric in self._metrics.items()}
+        for metric in snapshot.values():
+            metric["retries"] = metric["attempts"] - metric["calls"]
+            metric["avg_latency"] = metric["latency"] / max(1, metric["attempts"])
+        return {"calls": snapshot, "concurrency_limit": self.concurrency.limit}
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """프로세스 전체에서 공유하는 LLM 호출기 (처음 사용할 때 생성)"""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient()
+        return _llm_client
+
+
+_chat_models = {}
+_chat_models_lock = threading.Lock()
+
+
+def get_chat_model(model):
+    """
+    모델별 ChatUpstage 클라이언트를 반환하는 함수 (처음 호출할 때 한 번만 생성)
+    모든 호출과 스레드가 같은 인스턴스(HTTP 연결 풀)를 공유하므로 연결이 재사용(keep-alive)됩니다.
+    """
+    with _chat_models_lock:
+        if model not in _chat_models:
+            _chat_models[model] = ChatUpstage(model=model, base_url=UPSTAGE_BASE_URL)
+        return _chat_models[model]
+
+
+def print_llm_metrics():
+    """공유 호출기의 호출 이름별 지표를 출력"""
+    metrics = get_llm_client().metrics()
+    print("\n=== LLM 호출 통계 ===")
+    for name, metric in sorted(metrics["calls"].items()):
+        print(
+            f"- {name}: 호출 {metric['calls']}회, 재시도 {metric['retries']}회, "
+            f"429 {metric['rate_limited']}회, 실패 {metric['failures']}회, "
+            f"평균 {metric['avg_latency']:.2f}초"
+        )
+    print(f"- 현재 동시 요청 한도: {metrics['concurrency_limit']:.1f}")
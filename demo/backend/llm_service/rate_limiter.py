@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    스레드 안전한 토큰 버킷 속도 제한기
+    초당 rate개의 토큰이 채워지고 최대 burst개까지 쌓이며,
+    acquire(amount)는 amount개의 토큰이 생길 때까지 호출한 스레드를 대기시킵니다.
+    (요청 수 제한은 amount=1, 토큰 수 제한은 amount=예상 토큰 수로 사용)
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # burst보다 큰 요청은 버킷이 가득 찰 때까지만 기다림
+        amount = min(amount, self.burst)
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD(additive increase, multiplicative decrease) 방식의 동시 요청 수 제한
+    성공할 때마다 한도를 1/한도씩 늘리고(한도만큼 성공하면 +1), 429를 받으면 절반으로 줄입니다.
+    한도를 줄인 시점에 이미 보낸 요청들이 받는 429는 같은 혼잡으로 보고 다시 줄이지 않으며(혼잡 구간당 한 번),
+    429가 아닌 실패는 한도를 바꾸지 않습니다.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        # 지금까지 시작한 요청 수, 마지막으로 한도를 줄일 때까지 시작한 요청 수
+        self._started = 0
+        self._cut_at = 0
+
+    def acquire(self):
+        """
+        요청 슬롯을 얻을 때까지 대기
+        Returns:
+            int: 요청 번호 (release에 그대로 전달)
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self._started += 1
+            return self._started
+
+    def release(self, ticket, rate_limited=False, failed=False):
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                # 마지막으로 줄인 뒤에 시작한 요청의 429만 새 혼잡으로 봄
+                if ticket > self._cut_at:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._cut_at = self._started
+            elif not failed:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RESPONSE_CACHE_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "db/llm_response_cache.db"
+)
+# 캐시 최대 크기 (응답 바이트 합계 기준, 초과 시 오래 사용되지 않은 항목부터 삭제)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 응답 유효 기간 (초), 지나면 다시 생성
+DEFAULT_TTL = 30 * 24 * 60 * 60
+# 적중 시 last_used는 이 시간(초)보다 오래됐을 때만 갱신 (적중할 때마다 디스크에 쓰지 않도록)
+TOUCH_INTERVAL = 60 * 60
+
+
+def response_cache_key(model, template, inputs):
+    """모델 이름, 프롬프트 템플릿, 입력값으로 만든 content-addressed 키"""
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{model}\0{template}\0{payload}".encode("utf-8")).hexdigest()
+
+
+def cache_bypassed():
+    """LLM_CACHE_BYPASS=1이면 캐시를 읽지 않고 항상 새로 생성 (생성한 응답은 저장)"""
+    return os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+class ResponseCache:
+    """
+    SQLite 파일 기반 LLM 응답 캐시
+    키: sha256(모델 이름 + 프롬프트 템플릿 + 입력값), 값: 응답 텍스트
+    pdf.py, make_pdf.py, send_email.py 등이 같은 파일을 공유하므로,
+    중단된 작업을 다시 실행하면 이미 받은 응답은 API를 호출하지 않고 재사용합니다.
+    """
+
+    def __init__(
+        self,
+        db_path=RESPONSE_CACHE_DB_PATH,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl=DEFAULT_TTL,
+        bypass=None,
+        touch_interval=TOUCH_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.bypass = cache_bypassed() if bypass is None else bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            nbytes INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses (created_at)"
+        )
+        # 전체 크기(nbytes 합계)는 트리거로 갱신해 매번 SUM으로 다시 세지 않음
+        # (여러 프로세스가 같은 파일에 써도 같은 트랜잭션 안에서 갱신되므로 항상 맞음)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO cache_size (id, bytes) SELECT 1, COALESCE(SUM(nbytes), 0) FROM responses"
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+        BEGIN UPDATE cache_size SET bytes = bytes + NEW.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+        BEGIN UPDATE cache_size SET bytes = bytes - OLD.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.execute(
+            """
+        CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF nbytes ON responses
+        BEGIN UPDATE cache_size SET bytes = bytes + NEW.nbytes - OLD.nbytes WHERE id = 1; END
+        """
+        )
+        self._conn.commit()
+
+    def get(self, model, template, inputs):
+        """캐시된 응답을 반환합니다. 없거나 유효 기간이 지났으면(또는 bypass면) None"""
+        if self.bypass:
+            return None
+        key = response_cache_key(model, template, inputs)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at, last_used FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+            if now - row[2] >= self.touch_interval:
+                self._conn.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+        return row[0]
+
+    def put(self, model, template, inputs, response):
+        now = time.time()
+        with self._lock:
+            # INSERT OR REPLACE는 삭제 트리거를 실행하지 않으므로 UPSERT로 덮어씀
+            self._conn.execute(
+                """
+                INSERT INTO responses
+                    (key, model, response, nbytes, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    model = excluded.model,
+                    response = excluded.response,
+                    nbytes = excluded.nbytes,
+                    created_at = excluded.created_at,
+                    last_used = excluded.last_used
+            """,
+                (
+                    response_cache_key(model, template, inputs),
+                    model,
+                    response,
+                    len(response.encode("utf-8")),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def get_or_create(self, model, template, inputs, create_fn):
+        """
+        캐시에 있으면 반환하고, 없으면 create_fn()으로 생성해 저장합니다.
+        bypass가 켜져 있으면 캐시를 읽지 않고 새로 생성한 응답으로 덮어씁니다.
+        create_fn이 None을 반환하면(생성 실패) 저장하지 않습니다.
+        """
+        response = self.get(model, template, inputs)
+        if response is not None:
+            return response
+        response = create_fn()
+        if response is not None:
+            self.put(model, template, inputs, response)
+        return response
+
+    def _evict(self):
+        """만료된 항목을 지우고, 전체 크기가 max_bytes를 넘으면 오래 사용되지 않은 항목부터 삭제 (90%까지)"""
+        self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        total = self._conn.execute(
+            "SELECT bytes FROM cache_size WHERE id = 1"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, nbytes FROM responses ORDER BY last_used"
+        )
+        evicted = []
+        for key, nbytes in rows:
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= nbytes
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM responses), bytes FROM cache_size WHERE id = 1"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "count": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """프로세스 전체에서 공유하는 LLM 응답 캐시 (처음 사용할 때 생성)"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
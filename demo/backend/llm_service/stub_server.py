@@ -0,0 +1,307 @@
+"""
+오프라인 Upstage(OpenAI 호환) API 대체 서버
+
+실제 API 없이 전체 파이프라인(pdf.py, make_pdf.py, save_book_info.py, 이메일 생성)의
+처리량을 측정하기 위한 로컬 서버입니다.
+- /v1/solar/chat/completions: 입력에 따라 항상 같은 응답 (스트리밍 지원, 숫자 없음)
+  프롬프트에 JSON 배열이 있으면 같은 길이의 JSON 문자열 배열로 응답 (톤 정규화 배치)
+- /v1/solar/embeddings: 입력 텍스트에 따라 항상 같은 단위 벡터
+- 응답 지연 시간은 로그 정규 분포(중앙값 latency, 분산 latency_sigma)로 설정
+- 429 응답을 확률(error_rate) 또는 분당 요청 한도(requests_per_minute)로 발생
+
+사용법:
+    python -m llm_service.stub_server --port 8100 --latency 0.8 --error-rate 0.05
+
+    # 다른 터미널에서 백엔드를 대체 서버로 연결
+    export UPSTAGE_BASE_URL=http://127.0.0.1:8100/v1/solar
+    export UPSTAGE_API_KEY=stub
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+STUB_PREFIX = "/v1/solar"
+DEFAULT_EMBEDDING_DIM = 4096
+
+# 응답 문장 (요약 검증에 걸리지 않도록 숫자와 ':'를 넣지 않음)
+STUB_SENTENCES = [
+    "맡은 업무를 책임감 있게 끝까지 수행합니다.",
+    "동료와 적극적으로 소통하며 협업합니다.",
+    "새로운 문제에 침착하게 대응하는 편입니다.",
+    "업무 우선순위를 정리하는 능력을 보완하면 좋겠습니다.",
+    "꼼꼼한 자료 정리로 팀의 신뢰를 얻고 있습니다.",
+    "주도적으로 개선 방안을 제안합니다.",
+    "피드백을 빠르게 반영하려고 노력합니다.",
+    "일정 관리에 조금 더 신경 쓰면 좋겠습니다.",
+]
+
+
+def stable_seed(*parts):
+    """입력값으로 만든 고정 시드 (프로세스가 달라도 같은 값)"""
+    digest = hashlib.sha256("\0".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def stub_text(seed, sentences=3):
+    rng = random.Random(seed)
+    return " ".join(rng.sample(STUB_SENTENCES, sentences))
+
+
+def find_json_array(text):
+    """프롬프트에 들어 있는 마지막 JSON 배열 (없으면 None)"""
+    end = text.rfind("]")
+    while end != -1:
+        start = text.rfind("[", 0, end)
+        while start != -1:
+            try:
+                items = json.loads(text[start : end + 1])
+            except json.JSONDecodeError:
+                start = text.rfind("[", 0, start)
+                continue
+            if isinstance(items, list):
+                return items
+            break
+        end = text.rfind("]", 0, end)
+    return None
+
+
+def stub_completion(model, messages):
+    """모델과 메시지로 정해지는 응답 텍스트"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    seed = stable_seed(model, prompt)
+    items = find_json_array(prompt)
+    if items:
+        return json.dumps(
+            [stub_text(seed + i, sentences=1) for i in range(len(items))],
+            ensure_ascii=False,
+        )
+    return stub_text(seed)
+
+
+def stub_embedding(model, text, dim):
+    rng = np.random.default_rng(stable_seed(model, text))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class StubConfig:
+    """
+    대체 서버 설정
+    latency: 응답 지연 시간 중앙값 (초), latency_sigma: 로그 정규 분포의 sigma (0이면 고정)
+    error_rate: 요청을 429로 거절할 확률
+    requests_per_minute: 최근 1분 요청 수가 이 값을 넘으면 429 (None이면 제한 없음)
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        latency_sigma=0.0,
+        error_rate=0.0,
+        requests_per_minute=None,
+        retry_after=1.0,
+        embedding_dim=DEFAULT_EMBEDDING_DIM,
+        seed=0,
+        sleep=time.sleep,
+    ):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.retry_after = retry_after
+        self.embedding_dim = embedding_dim
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0}
+
+    def sample_latency(self):
+        with self._lock:
+            if self.latency <= 0:
+                return 0.0
+            if self.latency_sigma <= 0:
+                return self.latency
+            return self._rng.lognormvariate(0, self.latency_sigma) * self.latency
+
+    def admit(self):
+        """요청을 받을지 결정 (False면 429)"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            limited = self._rng.random() < self.error_rate or (
+                self.requests_per_minute is not None
+                and len(self._recent) >= self.requests_per_minute
+            )
+            if limited:
+                self.stats["rate_limited"] += 1
+            else:
+                self._recent.append(now)
+            return not limited
+
+
+def rate_limited_response(config):
+    response = jsonify(
+        {
+            "error": {
+                "message": "Too many requests (stub)",
+                "type": "too_many_requests",
+                "code": "too_many_requests",
+            }
+        }
+    )
+    response.status_code = 429
+    response.headers["Retry-After"] = str(config.retry_after)
+    return response
+
+
+def usage(prompt_tokens, completion_tokens=0):
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_stub_app(config=None):
+    """대체 서버 Flask 앱 (테스트에서는 app.test_client()로 사용)"""
+    config = config or StubConfig()
+    app = Flask(__name__)
+    app.config["STUB"] = config
+
+    @app.route(f"{STUB_PREFIX}/chat/completions", methods=["POST"])
+    def chat_completions():
+        if not config.admit():
+            return rate_limited_response(config)
+        body = request.get_json()
+        model = body.get("model", "")
+        messages = body.get("messages", [])
+        content = stub_completion(model, messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages)
+        completion_id = f"chatcmpl-stub-{stable_seed(model, content):x}"
+        created = int(time.time())
+        latency = config.sample_latency()
+
+        if not body.get("stream"):
+            config.sleep(latency)
+            return jsonify(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage(prompt_tokens, len(content)),
+                }
+            )
+
+        # 스트리밍: 지연 시간을 단어 수만큼 나눠 단어 단위로 전송
+        words = content.split(" ")
+
+        def generate():
+            for i, word in enumerate(words):
+                config.sleep(latency / len(words))
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else " " + word},
+                            "finish_reason": None,
+                        }
+                    ],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            chunk["choices"] = [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    @app.route(f"{STUB_PREFIX}/embeddings", methods=["POST"])
+    def embeddings():
+        if not config.admit():
+            return rate_limited_response(config)
+        body = request.get_json()
+        model = body.get("model", "")
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        config.sleep(config.sample_latency())
+
+        data = []
+        for i, text in enumerate(texts):
+            vector = stub_embedding(model, text, config.embedding_dim)
+            # openai 클라이언트는 기본적으로 base64 형식을 요청함
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return jsonify(
+            {
+                "object": "list",
+                "data": data,
+                "model": model,
+                "usage": usage(sum(len(text) for text in texts)),
+            }
+        )
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        return jsonify(config.stats)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오프라인 Upstage API 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="응답 지연 시간 중앙값 (초)"
+    )
+    parser.add_argument(
+        "--latency-sigma", type=float, default=0.3, help="지연 시간 분포의 sigma"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="429로 거절할 확률"
+    )
+    parser.add_argument(
+        "--requests-per-minute", type=int, default=None, help="분당 요청 한도"
+    )
+    parser.add_argument("--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_stub_app(
+        StubConfig(
+            latency=args.latency,
+            latency_sigma=args.latency_sigma,
+            error_rate=args.error_rate,
+            requests_per_minute=args.requests_per_minute,
+            embedding_dim=args.embedding_dim,
+            seed=args.seed,
+        )
+    )
+    print(f"대체 서버: http://{args.host}:{args.port}{STUB_PREFIX}")
+    app.run(host=args.host, port=args.port, threaded=True)
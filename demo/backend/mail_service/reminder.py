@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import pytz
 import requests
 import schedule
+from db.models.qa import connect_feedback_db
 from mailjet_rest import Client
 
 FEEDBACK_DB_PATH = os.path.join(
@@ -40,18 +41,22 @@ def get_db_connection(db_path):
 
 def get_reminder_targets():
     """피드백을 완료하지 않은 사용자들의 이메일과 데드라인 정보를 가져옵니다."""
-    conn_feedback = get_db_connection(FEEDBACK_DB_PATH)
+    conn_feedback = connect_feedback_db(FEEDBACK_DB_PATH)
+    conn_feedback.row_factory = sqlite3.Row
     conn_user = get_db_connection(USER_DB_PATH)
 
     try:
-        # 현재 활성화된 피드백 데드라인 정보 가져오기 (KST 기준)
+        # 현재 리뷰 주기의 활성화된 피드백 데드라인 정보 가져오기 (KST 기준)
         cursor_feedback = conn_feedback.cursor()
+        cursor_feedback.execute("SELECT MAX(id) FROM review_cycles")
+        cycle_id = cursor_feedback.fetchone()[0]
         cursor_feedback.execute(
             """
             SELECT id, deadline, remind_days, remind_time
             FROM feedback_deadline
-            WHERE deadline > datetime('now', '+9 hours')
-        """
+            WHERE cycle_id = ? AND deadline > datetime('now', '+9 hours')
+        """,
+            (cycle_id,),
         )
         deadlines = cursor_feedback.fetchall()
 
@@ -81,12 +86,14 @@ def get_reminder_targets():
                 {"id": user["id"], "username": user["username"], "email": user["email"]}
             )
 
-        # 피드백 제출 현황을 한 번에 가져오기
+        # 현재 리뷰 주기의 피드백 제출 현황을 한 번에 가져오기
         cursor_feedback.execute(
             """
-            SELECT from_username, to_username 
+            SELECT DISTINCT from_username, to_username 
             FROM feedback_results
-        """
+            WHERE cycle_id = ?
+        """,
+            (cycle_id,),
         )
         submitted_feedbacks = set(
             (row[0], row[1]) for row in cursor_feedback.fetchall()
@@ -6,6 +6,8 @@ import sqlite3
 from concurrent import futures
 
 from dotenv import load_dotenv
+from llm_service.llm_client import UPSTAGE_BASE_URL, estimate_tokens, get_llm_client
+from llm_service.response_cache import get_response_cache
 from mailjet_rest import Client
 from openai import OpenAI
 
@@ -21,9 +23,7 @@ PDF_DIR = os.path.join(
 SENDER_NAME = "인사팀"
 
 # Solar API 설정
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
+solar_client = OpenAI(api_key=UPSTAGE_API_KEY, base_url=UPSTAGE_BASE_URL)
 
 
 # Mailjet 클라이언트 초기화
@@ -134,14 +134,22 @@ def generate_email_content():
 그럼 오늘도 화이팅하시고, 즐거운 하루 보내세요~! ◜◡◝
 """
 
-    try:
-        response = solar_client.chat.completions.create(
+    def create_content():
+        response = get_llm_client().call(
+            solar_client.chat.completions.create,
             model="solar-pro",
             messages=[{"role": "user", "content": prompt}],
             stream=False,
+            name="generate_email_content",
+            tokens=estimate_tokens(prompt) * 2,
         )
+        return response.choices[0].message.content
 
-        content = response.choices[0].message.content
+    try:
+        # 같은 프롬프트로 만든 템플릿은 LLM 응답 캐시에서 재사용
+        content = get_response_cache().get_or_create(
+            "solar-pro", prompt, {}, create_content
+        )
     except Exception as e:
         print(f"이메일 템플릿 생성 중 오류 발생: {str(e)}")
         raise
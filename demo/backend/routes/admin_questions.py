@@ -1,11 +1,24 @@
 import datetime
 
-from db.models.qa import get_connection
+from db.models.qa import (
+    get_connection,
+    get_current_cycle_id,
+    list_cycles,
+    start_cycle,
+)
 from flask import Blueprint, jsonify, request
 
 admin_questions_bp = Blueprint("admin_questions", __name__)
 
 
+def question_not_found(question_id):
+    # 지난 주기의 질문 ID도 현재 주기에서는 없는 질문으로 처리
+    return (
+        jsonify({"success": False, "message": f"Question ID={question_id} not found"}),
+        404,
+    )
+
+
 # 질문 수정
 @admin_questions_bp.route("/api/questions/<int:question_id>", methods=["PUT"])
 def update_question(question_id):
@@ -24,13 +37,23 @@ def update_question(question_id):
                question_text = ?,
                question_type = ?,
                options = ?
-         WHERE id = ?
+         WHERE id = ? AND cycle_id = ?
     """,
-        (keyword, question_text, question_type, options, question_id),
+        (
+            keyword,
+            question_text,
+            question_type,
+            options,
+            question_id,
+            get_current_cycle_id(conn),
+        ),
     )
+    updated = cur.rowcount
     conn.commit()
     conn.close()
 
+    if not updated:
+        return question_not_found(question_id)
     return jsonify({"success": True, "message": "질문이 수정되었습니다."})
 
 
@@ -39,10 +62,16 @@ def update_question(question_id):
 def delete_question(question_id):
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("DELETE FROM feedback_questions WHERE id=?", (question_id,))
+    cur.execute(
+        "DELETE FROM feedback_questions WHERE id=? AND cycle_id=?",
+        (question_id, get_current_cycle_id(conn)),
+    )
+    deleted = cur.rowcount
     conn.commit()
     conn.close()
 
+    if not deleted:
+        return question_not_found(question_id)
     return jsonify({"success": True, "message": "질문이 삭제되었습니다."})
 
 
@@ -52,7 +81,8 @@ def get_questions():
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "SELECT id, keyword, question_text, question_type, options FROM feedback_questions ORDER BY id ASC"
+        "SELECT id, keyword, question_text, question_type, options FROM feedback_questions WHERE cycle_id = ? ORDER BY id ASC",
+        (get_current_cycle_id(conn),),
     )
     rows = cur.fetchall()
     conn.close()
@@ -84,10 +114,10 @@ def create_question():
     cur = conn.cursor()
     cur.execute(
         """
-        INSERT INTO feedback_questions (keyword, question_text, question_type, options)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO feedback_questions (cycle_id, keyword, question_text, question_type, options)
+        VALUES (?, ?, ?, ?, ?)
     """,
-        (keyword, question_text, question_type, options),
+        (get_current_cycle_id(conn), keyword, question_text, question_type, options),
     )
     conn.commit()
     conn.close()
@@ -104,9 +134,9 @@ def get_question_by_id(question_id):
         """
         SELECT id, keyword, question_text, question_type, options
           FROM feedback_questions
-         WHERE id=?
+         WHERE id=? AND cycle_id=?
     """,
-        (question_id,),
+        (question_id, get_current_cycle_id(conn)),
     )
     row = cur.fetchone()
     conn.close()
@@ -121,12 +151,7 @@ def get_question_by_id(question_id):
         }
         return jsonify({"success": True, "question": question_data}), 200
     else:
-        return (
-            jsonify(
-                {"success": False, "message": f"Question ID={question_id} not found"}
-            ),
-            404,
-        )
+        return question_not_found(question_id)
 
 
 @admin_questions_bp.route("/api/deadline", methods=["POST"])
@@ -172,13 +197,15 @@ def set_deadline():
 
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("DELETE FROM feedback_deadline")
+        # 현재 리뷰 주기의 마감일만 교체 (지난 주기의 마감일은 유지)
+        cycle_id = get_current_cycle_id(conn)
+        cur.execute("DELETE FROM feedback_deadline WHERE cycle_id = ?", (cycle_id,))
         cur.execute(
             """
-            INSERT INTO feedback_deadline (start_date, deadline, remind_days, remind_time)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO feedback_deadline (cycle_id, start_date, deadline, remind_days, remind_time)
+            VALUES (?, ?, ?, ?, ?)
         """,
-            (start_date, deadline, remind_days, remind_time),
+            (cycle_id, start_date, deadline, remind_days, remind_time),
         )
         conn.commit()
 
@@ -194,9 +221,11 @@ def get_deadline():
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "SELECT start_date, deadline FROM feedback_deadline ORDER BY created_at DESC LIMIT 1"
+        "SELECT start_date, deadline FROM feedback_deadline WHERE cycle_id = ?",
+        (get_current_cycle_id(conn),),
     )
     result = cur.fetchone()
+    conn.close()
 
     if result:
         return jsonify(
@@ -204,3 +233,38 @@ def get_deadline():
         )
     else:
         return jsonify({"success": True, "start_date": None, "deadline": None})
+
+
+# 리뷰 주기 목록 조회
+@admin_questions_bp.route("/api/cycles", methods=["GET"])
+def get_cycles():
+    conn = get_connection()
+    cycles = list_cycles(conn)
+    current_cycle_id = get_current_cycle_id(conn)
+    conn.close()
+    return jsonify(
+        {"success": True, "current_cycle_id": current_cycle_id, "cycles": cycles}
+    )
+
+
+# 새 리뷰 주기 시작 (이전 주기의 질문을 복사, copy_questions=false이면 빈 질문 목록으로 시작)
+@admin_questions_bp.route("/api/cycles", methods=["POST"])
+def create_cycle():
+    data = request.json or {}
+    conn = get_connection()
+    try:
+        cycle_id = start_cycle(
+            conn,
+            name=data.get("name"),
+            copy_questions=data.get("copy_questions", True),
+        )
+    finally:
+        conn.close()
+
+    return jsonify(
+        {
+            "success": True,
+            "cycle_id": cycle_id,
+            "message": "새로운 리뷰 주기가 시작되었습니다.",
+        }
+    )
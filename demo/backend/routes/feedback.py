@@ -3,7 +3,7 @@ Feedback related routes.
 This module contains all feedback-related endpoints including admin and user feedback functionalities.
 """
 
-from db.models.qa import get_connection
+from db.models.qa import get_connection, get_current_cycle_id
 from db.models.user import UserDB
 from flask import Blueprint, jsonify, request
 
@@ -22,12 +22,13 @@ def admin_feedback():
     try:
         cur.execute(
             """
-            SELECT fr.*, fq.question_text 
+            SELECT fr.id, fr.question_id, fr.from_username, fr.to_username,
+                   fr.answer_content, fr.created_at, fq.question_text
             FROM feedback_results fr
             JOIN feedback_questions fq ON fr.question_id = fq.id
-            WHERE fr.to_username = ?
+            WHERE fr.cycle_id = ? AND fr.to_username = ?
         """,
-            (username,),
+            (get_current_cycle_id(conn), username),
         )
         feedbacks = [
             {
@@ -67,9 +68,9 @@ def check_feedback():
         cur.execute(
             """
             SELECT COUNT(*) FROM feedback_results 
-            WHERE from_username = ? AND to_username = ?
+            WHERE cycle_id = ? AND from_username = ? AND to_username = ?
         """,
-            (from_username, to_username),
+            (get_current_cycle_id(conn), from_username, to_username),
         )
         count = cur.fetchone()[0]
         return jsonify({"success": True, "already_submitted": count > 0})
@@ -89,9 +90,9 @@ def count_written_feedback(username):
             """
             SELECT COUNT(DISTINCT to_username) 
             FROM feedback_results 
-            WHERE from_username = ?
+            WHERE cycle_id = ? AND from_username = ?
         """,
-            (username,),
+            (get_current_cycle_id(conn), username),
         )
         count = cur.fetchone()[0]
         return jsonify({"success": True, "count": count})
@@ -111,9 +112,9 @@ def count_received_feedback(username):
             """
             SELECT COUNT(DISTINCT from_username) 
             FROM feedback_results 
-            WHERE to_username = ?
+            WHERE cycle_id = ? AND to_username = ?
         """,
-            (username,),
+            (get_current_cycle_id(conn), username),
         )
         count = cur.fetchone()[0]
         return jsonify({"success": True, "count": count})
@@ -134,13 +135,16 @@ def get_admin_feedback_status():
         user_cur.execute('SELECT COUNT(*) FROM users WHERE role != "admin"')
         total_users = user_cur.fetchone()[0]
 
-        # 피드백을 1개 이상 작성한 사용자 수 조회
+        # 피드백을 1개 이상 작성한 사용자 수 조회 (현재 리뷰 주기)
         cur = conn.cursor()
+        cycle_id = get_current_cycle_id(conn)
         cur.execute(
             """
             SELECT COUNT(DISTINCT from_username) 
             FROM feedback_results
-        """
+            WHERE cycle_id = ?
+        """,
+            (cycle_id,),
         )
         users_with_feedback = cur.fetchone()[0]
 
@@ -150,7 +154,9 @@ def get_admin_feedback_status():
         )
 
         # 전체 피드백 수 조회
-        cur.execute("SELECT COUNT(*) FROM feedback_results")
+        cur.execute(
+            "SELECT COUNT(*) FROM feedback_results WHERE cycle_id = ?", (cycle_id,)
+        )
         total_feedbacks = cur.fetchone()[0]
 
         return jsonify(
@@ -182,14 +188,16 @@ def submit_feedback_bulk():
     cur = conn.cursor()
 
     try:
+        cycle_id = get_current_cycle_id(conn)
         for feedback in feedbacks:
             cur.execute(
                 """
                 INSERT INTO feedback_results 
-                (question_id, from_username, to_username, answer_content, created_at) 
-                VALUES (?, ?, ?, ?, datetime('now'))
+                (cycle_id, question_id, from_username, to_username, answer_content, created_at) 
+                VALUES (?, ?, ?, ?, ?, datetime('now'))
             """,
                 (
+                    cycle_id,
                     feedback["question_id"],
                     feedback["from_username"],
                     feedback["to_username"],
@@ -217,12 +225,13 @@ def user_feedback_result():
     try:
         cur.execute(
             """
-            SELECT fr.*, fq.question_text 
+            SELECT fr.id, fr.question_id, fr.from_username, fr.to_username,
+                   fr.answer_content, fr.created_at, fq.question_text
             FROM feedback_results fr
             JOIN feedback_questions fq ON fr.question_id = fq.id
-            WHERE fr.to_username = ?
+            WHERE fr.cycle_id = ? AND fr.to_username = ?
         """,
-            (username,),
+            (get_current_cycle_id(conn), username),
         )
         feedbacks = [
             {
@@ -261,10 +270,16 @@ def user_feedback_write():
         cur.execute(
             """
             INSERT INTO feedback_results 
-            (question_id, from_username, to_username, answer_content, created_at) 
-            VALUES (?, ?, ?, ?, datetime('now'))
+            (cycle_id, question_id, from_username, to_username, answer_content, created_at) 
+            VALUES (?, ?, ?, ?, ?, datetime('now'))
         """,
-            (question_id, from_username, to_username, answer_content),
+            (
+                get_current_cycle_id(conn),
+                question_id,
+                from_username,
+                to_username,
+                answer_content,
+            ),
         )
         conn.commit()
         return jsonify({"success": True})
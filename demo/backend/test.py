@@ -1,8 +1,15 @@
 import json
+import os
+import sys
 
+import numpy as np
 import pytest
 from main import app
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "build_pdf"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "book_chunk"))
+os.environ.setdefault("UPSTAGE_API_KEY", "test")
+
 
 @pytest.fixture
 def client():
@@ -254,3 +261,1443 @@ def test_group_operations(client):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data["success"] == True
+
+
+def test_build_book_matrix():
+    from build_pdf.load_book_chunk import build_book_matrix
+
+    chunk_cache = {
+        "books_chunk_0.pkl": {
+            "1": {"title": "A", "isbn": "1", "embedding": [3.0, 4.0]},
+            "2": {"title": "B", "isbn": "2", "embedding": []},
+        },
+        "books_chunk_1.pkl": {
+            "1": {"title": "A 중복", "isbn": "1", "embedding": [1.0, 0.0]},
+            "3": {"title": "C", "isbn": "3", "embedding": [0.0, 2.0]},
+        },
+    }
+    embeddings, metadata = build_book_matrix(chunk_cache)
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (2, 2)
+    assert [book["title"] for book in metadata] == ["A", "C"]
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+
+
+def test_book_store_roundtrip(tmp_path):
+    from book_chunk.book_store import append_books, open_book_store
+
+    books = [
+        {"isbn": "1111111111 9781111111111", "title": "A", "embedding": [3.0, 4.0]},
+        {"isbn": "2222222222", "title": "B", "embedding": [0.0, 2.0]},
+        {"isbn": "3333333333", "title": "임베딩 없음", "embedding": None},
+    ]
+    assert append_books(books, str(tmp_path)) == 2
+    assert append_books(books[:1], str(tmp_path)) == 0
+
+    vectors, ids, metadata = open_book_store(str(tmp_path))
+    assert isinstance(vectors, np.memmap)
+    assert vectors.shape == (2, 2)
+    assert np.allclose(vectors[0], [0.6, 0.8])
+    assert ids.tolist() == [b"1111111111", b"2222222222"]
+    assert [book["title"] for book in metadata] == ["A", "B"]
+
+
+def test_first_store_append_keeps_pickle_books(tmp_path, monkeypatch):
+    import pickle
+
+    from book_chunk.book_store import append_books
+    from build_pdf import load_book_chunk
+
+    for chunk_number, isbns in enumerate([["1", "2"], ["3"]]):
+        with open(tmp_path / f"books_chunk_{chunk_number}.pkl", "wb") as f:
+            pickle.dump(
+                {
+                    isbn: {"title": isbn, "embedding": [1.0, float(isbn)]}
+                    for isbn in isbns
+                },
+                f,
+            )
+    monkeypatch.setattr(load_book_chunk, "BOOK_CHUNK_DIR", str(tmp_path))
+    # 테스트가 끝나면 모듈 전역 인덱스를 원래대로 되돌림
+    for name in (
+        "BOOK_EMBEDDINGS",
+        "BOOK_METADATA",
+        "BOOK_ANN_INDEX",
+        "BOOK_PQ_INDEX",
+        "BOOK_INDEX_LOADED",
+    ):
+        monkeypatch.setattr(load_book_chunk, name, getattr(load_book_chunk, name))
+
+    def load_titles():
+        monkeypatch.setattr(load_book_chunk, "BOOK_CHUNK_CACHE", {})
+        load_book_chunk.load_all_book_chunks()
+        return sorted(book["title"] for book in load_book_chunk.BOOK_METADATA)
+
+    assert load_titles() == ["1", "2", "3"]
+
+    # 저장소에 처음 추가할 때 기존 pickle 도서도 함께 저장소로 옮김
+    assert (
+        append_books(
+            [{"isbn": "4", "title": "4", "embedding": [0.0, 1.0]}], str(tmp_path)
+        )
+        == 1
+    )
+    assert load_titles() == ["1", "2", "3", "4"]
+
+
+def test_empty_book_index_is_loaded_once(tmp_path, monkeypatch):
+    from build_pdf import load_book_chunk
+
+    monkeypatch.setattr(load_book_chunk, "BOOK_CHUNK_DIR", str(tmp_path))
+    monkeypatch.setattr(load_book_chunk, "BOOK_CHUNK_CACHE", {})
+    for name in ("BOOK_EMBEDDINGS", "BOOK_METADATA", "BOOK_ANN_INDEX", "BOOK_PQ_INDEX"):
+        monkeypatch.setattr(load_book_chunk, name, getattr(load_book_chunk, name))
+    monkeypatch.setattr(load_book_chunk, "BOOK_INDEX_LOADED", False)
+    scans = []
+    monkeypatch.setattr(
+        load_book_chunk, "store_exists", lambda path: scans.append(path) or False
+    )
+
+    # 도서가 하나도 없어도 디렉터리는 한 번만 읽음
+    for _ in range(3):
+        embeddings, metadata = load_book_chunk.get_book_index()
+        assert metadata == [] and embeddings.shape == (0, 0)
+    assert scans == [str(tmp_path)]
+
+
+def test_batch_search_books_with_exclusions(monkeypatch):
+    import book_recommendation
+
+    embeddings = np.eye(3, dtype=np.float32)
+    metadata = [{"isbn": isbn, "title": isbn} for isbn in ("a", "b", "c")]
+    monkeypatch.setattr(
+        book_recommendation, "get_book_index", lambda: (embeddings, metadata)
+    )
+
+    results = book_recommendation.batch_search_books(
+        [[1.0, 0.5, 0.0], [0.0, 0.2, 1.0]], top_k=2, exclude_isbns=[["a"], []]
+    )
+    assert [[book["isbn"] for book, _ in row] for row in results] == [
+        ["b", "c"],
+        ["c", "b"],
+    ]
+    assert (
+        book_recommendation.search_books([0.0, 0.0, 1.0], top_k=1)[0][0]["isbn"] == "c"
+    )
+
+
+def test_build_recommendations_uses_stored_summaries(monkeypatch):
+    import book_recommendation
+
+    summarized = []
+
+    def fake_summarize(content):
+        summarized.append(content)
+        return f"요약: {content}"
+
+    monkeypatch.setattr(book_recommendation, "summarize_book_content", fake_summarize)
+    books = [
+        {"isbn": "a", "title": "A", "authors": ["김"], "contents": "내용 A"},
+        {"isbn": "b", "title": "B", "authors": "이", "contents": "내용 B"},
+    ]
+    books[0]["summary"] = "저장된 요약"
+
+    recommendations = book_recommendation.build_recommendations(
+        "user1", "쿼리", [(books[0], 0.9), (books[1], 0.8)]
+    )
+
+    assert [book["contents"] for book in recommendations] == [
+        "저장된 요약",
+        "요약: 내용 B",
+    ]
+    assert summarized == ["내용 B"]
+
+
+def test_ivf_index_matches_exact_search():
+    from book_chunk.book_ivf import build_ivf_index, search_ivf
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:5]
+
+    index = build_ivf_index(vectors, nlist=8)
+    assert index["list_offsets"][-1] == len(vectors)
+
+    # 모든 리스트를 탐색하면 정확한 검색과 같은 결과
+    results = search_ivf(index, vectors, queries, top_k=3, nprobe=8)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :3]
+    for (rows, _), expected in zip(results, exact):
+        assert rows.tolist() == expected.tolist()
+
+    # 제외 후 후보가 부족하면 None (정확한 검색으로 대체)
+    excluded = [np.arange(200)] * len(queries)
+    assert search_ivf(index, vectors, queries, 3, 8, excluded) == [None] * 5
+
+
+def test_pq_index_reranks_with_exact_vectors(tmp_path):
+    from book_chunk.book_pq import (
+        adc_scores,
+        build_pq_index,
+        load_pq_index,
+        save_pq_index,
+        search_pq,
+    )
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:5]
+
+    save_pq_index(build_pq_index(vectors, m=4), str(tmp_path))
+    index = load_pq_index(str(tmp_path), vectors)
+    assert index["codes"].shape == (300, 4)
+    assert index["codes"].dtype == np.uint8
+
+    # 모든 도서를 재정렬 후보로 쓰면 정확한 검색과 같은 결과
+    results = search_pq(index, vectors, queries, top_k=3, rerank_k=300)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :3]
+    for (rows, _), expected in zip(results, exact):
+        assert rows.tolist() == expected.tolist()
+
+    # 블록 단위로 계산한 ADC 유사도는 부분 공간별 테이블 조회의 합과 같음
+    table = rng.standard_normal((4, 256)).astype(np.float32)
+    expected = sum(table[j, index["codes"][:, j]] for j in range(4))
+    assert np.allclose(adc_scores(table, index["codes"], block_size=7), expected)
+
+
+def test_embedding_cache_hits_and_eviction(tmp_path):
+    from llm_service.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_bytes=3 * 4 * 4)
+    calls = []
+
+    def create():
+        calls.append(1)
+        return [0.5, 0.25, 0.0, 1.0]
+
+    assert cache.get_or_create("embedding-passage", "책 소개", create) == [
+        0.5,
+        0.25,
+        0.0,
+        1.0,
+    ]
+    assert cache.get_or_create("embedding-passage", "책 소개", create) is not None
+    # 모델이 다르면 다른 키
+    assert cache.get("embedding-query", "책 소개") is None
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+    # 생성 실패(None)는 저장하지 않음
+    assert cache.get_or_create("embedding-passage", "실패", lambda: None) is None
+    assert cache.get("embedding-passage", "실패") is None
+
+    # 최대 크기를 넘으면 오래 사용되지 않은 항목부터 삭제
+    for i in range(5):
+        cache.put("embedding-passage", f"text {i}", [float(i)] * 4)
+    assert cache.stats()["bytes"] <= 3 * 4 * 4
+    assert cache.get("embedding-passage", "text 4") == [4.0] * 4
+    cache.close()
+
+
+def test_embedding_cache_hits_do_not_write(tmp_path):
+    from llm_service.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), touch_interval=60)
+    cache.put("embedding-passage", "a", [1.0])
+    cache.put("embedding-passage", "b", [2.0])
+    changes = cache._conn.total_changes
+
+    # 최근에 사용한 항목은 적중해도 last_used를 갱신하지 않음
+    assert cache.get_many("embedding-passage", ["b", "없음", "a", "b"]) == [
+        [2.0],
+        None,
+        [1.0],
+        [2.0],
+    ]
+    assert cache._conn.total_changes == changes
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+    # touch_interval보다 오래된 항목만 한 번에 갱신
+    cache._conn.execute(
+        "UPDATE embeddings SET last_used = 0 WHERE model = ?", ("embedding-passage",)
+    )
+    cache._conn.commit()
+    changes = cache._conn.total_changes
+    assert cache.get("embedding-passage", "a") == [1.0]
+    assert cache._conn.total_changes == changes + 1
+    cache.close()
+
+
+def test_embedding_cache_put_many_tracks_size(tmp_path):
+    from llm_service.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_bytes=10 * 4)
+    commits = []
+    cache._conn.set_trace_callback(
+        lambda sql: commits.append(sql) if sql == "COMMIT" else None
+    )
+    cache.put_many(
+        "embedding-passage", [(f"text {i}", [float(i)] * 2) for i in range(4)]
+    )
+    # 여러 항목을 한 번의 커밋으로 저장
+    assert commits == ["COMMIT"]
+    cache._conn.set_trace_callback(None)
+
+    # 덮어쓰기와 삭제 후에도 누적 크기는 실제 합계와 같음
+    cache.put("embedding-passage", "text 0", [0.0] * 3)
+    cache.put_many("embedding-passage", [("text 9", [9.0] * 4)])
+
+    def actual_bytes():
+        return cache._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    assert cache.stats()["bytes"] == actual_bytes() <= 10 * 4
+    assert cache.get("embedding-passage", "text 9") == [9.0] * 4
+    cache.close()
+
+
+def test_process_chunk_batches_embedding_requests(tmp_path, monkeypatch):
+    import save_book_info
+    from llm_service.embedding_cache import EmbeddingCache
+
+    requests_made = []
+
+    class FakeEmbeddings:
+        def create(self, input, model):
+            requests_made.append(list(input))
+            if "bad" in input:
+                raise ValueError("invalid input")
+            return type(
+                "Response",
+                (),
+                {
+                    "data": [
+                        type("Item", (), {"index": i, "embedding": [float(len(t))]})
+                        for i, t in reversed(list(enumerate(input)))
+                    ]
+                },
+            )
+
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(save_book_info, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(save_book_info.solar_client, "embeddings", FakeEmbeddings())
+    monkeypatch.setattr(save_book_info, "EMBEDDING_BATCH_MAX_ITEMS", 4)
+    summarized = []
+
+    def fake_summarize_books(contents):
+        summarized.extend(contents)
+        return [f"요약 {len(text)}" if len(text) > 1 else None for text in contents]
+
+    monkeypatch.setattr(save_book_info, "summarize_books", fake_summarize_books)
+
+    books = [{"isbn": f"{i} 978{i}", "contents": "x" * (i + 1)} for i in range(6)]
+    books.append({"isbn": "6", "contents": "bad"})
+    books.append({"isbn": "", "contents": "isbn 없음"})
+    chunk = save_book_info.process_chunk(books)
+
+    # 6+1권을 4개씩 2번 요청, 실패한 배치만 나눠서 재요청
+    assert requests_made[0] == ["x", "xx", "xxx", "xxxx"]
+    assert ["bad"] in requests_made
+    assert sorted(chunk) == ["0", "1", "2", "3", "4", "5"]
+    assert chunk["2"]["embedding"] == [3.0]
+    # 임베딩에 성공한 도서만 요약하고, 요약에 실패한 도서는 summary가 None
+    assert "bad" not in summarized
+    assert chunk["2"]["summary"] == "요약 3"
+    assert chunk["0"]["summary"] is None
+
+    # 두 번째 실행은 캐시만 사용
+    requests_made.clear()
+    save_book_info.process_chunk(books[:6], summarize=False)
+    assert requests_made == []
+
+
+def test_create_embeddings_requeues_rate_limited_batches(tmp_path, monkeypatch):
+    import save_book_info
+    from llm_service.embedding_cache import EmbeddingCache
+    from llm_service.llm_client import LLMClient
+
+    requests_made = []
+    limited = {"c": 2, "e": 99}
+
+    class LimitedEmbeddings:
+        def create(self, input, model):
+            requests_made.append(list(input))
+            # 첫 입력이 limited에 있는 배치는 그 횟수만큼 요청 한도 초과
+            if limited.get(input[0], 0) > 0:
+                limited[input[0]] -= 1
+                raise Exception({"error": {"code": "too_many_requests"}})
+            return type(
+                "Response",
+                (),
+                {
+                    "data": [
+                        type("Item", (), {"index": i, "embedding": [float(ord(t))]})
+                        for i, t in enumerate(input)
+                    ]
+                },
+            )
+
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(save_book_info, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(
+        save_book_info,
+        "get_llm_client",
+        lambda: LLMClient(max_attempts=1, sleep=lambda delay: None),
+    )
+    monkeypatch.setattr(save_book_info.solar_client, "embeddings", LimitedEmbeddings())
+    monkeypatch.setattr(save_book_info, "EMBEDDING_BATCH_MAX_ITEMS", 2)
+
+    # 한도 초과가 풀리면 다시 요청한 배치도 임베딩됨 (배치를 나누지 않음)
+    assert save_book_info.create_embeddings(["a", "b", "c", "d"]) == [
+        [97.0],
+        [98.0],
+        [99.0],
+        [100.0],
+    ]
+    assert requests_made.count(["a", "b"]) == 1
+    assert requests_made.count(["c", "d"]) == 3
+    assert ["c"] not in requests_made
+
+    # 다시 요청해도 계속 한도 초과이면 그 배치만 None
+    monkeypatch.setattr(save_book_info, "EMBEDDING_RATE_LIMIT_ROUNDS", 1)
+    requests_made.clear()
+    assert save_book_info.create_embeddings(["e", "f", "g"]) == [None, None, [103.0]]
+    assert requests_made.count(["e", "f"]) == 2
+
+
+def test_ingestion_pipeline_overlaps_fetch_and_embed():
+    import asyncio
+    import threading
+
+    from ingest_pipeline import run_ingestion_pipeline
+
+    catalogue = {
+        "리더십": [{"isbn": f"{i} 97800{i}", "contents": f"책 {i}"} for i in range(5)],
+        "협업": [{"isbn": f"{i}", "contents": f"책 {i}"} for i in range(3, 8)],
+        "소통": [{"isbn": "99", "contents": ""}, {"isbn": "", "contents": "isbn 없음"}],
+    }
+    last_keyword_fetched = threading.Event()
+    saved_chunks = []
+
+    def fetch_books(keyword):
+        if keyword == "소통":
+            last_keyword_fetched.set()
+        return catalogue[keyword]
+
+    def embed_books(books):
+        # 마지막 키워드 검색이 임베딩과 동시에 진행되지 않으면 여기서 막힘
+        assert last_keyword_fetched.wait(timeout=5)
+        return {
+            book["isbn"].split(" ")[0]: dict(book, embedding=[1.0])
+            for book in books
+            if book["contents"] != "책 7"
+        }
+
+    processed = {"0"}
+    stats = asyncio.run(
+        run_ingestion_pipeline(
+            list(catalogue),
+            fetch_books,
+            embed_books,
+            saved_chunks.append,
+            processed_isbns=processed,
+            fetch_concurrency=1,
+            embed_batch_size=2,
+            chunk_size=3,
+            queue_size=1,
+        )
+    )
+
+    saved = {isbn for chunk in saved_chunks for isbn in chunk}
+    assert saved == {"1", "2", "3", "4", "5", "6"}
+    assert all(len(chunk) <= 4 for chunk in saved_chunks)
+    assert stats["keywords"]["리더십"] == {"total": 5, "new": 4}
+    assert stats["keywords"]["협업"]["new"] == 3
+    assert stats["failed"] == 1
+    assert processed >= saved
+
+
+def test_ingestion_resumes_from_progress(tmp_path):
+    import asyncio
+
+    from ingest_pipeline import run_ingestion_pipeline
+    from ingest_progress import IngestProgress
+
+    catalogue = {
+        "리더십": [{"isbn": f"{i}", "contents": f"책 {i}"} for i in range(3)],
+        "협업": [{"isbn": f"{i}", "contents": f"책 {i}"} for i in range(2, 5)],
+    }
+    fetched = []
+
+    def fetch_books(keyword):
+        fetched.append(keyword)
+        return catalogue[keyword]
+
+    def embed_books(books):
+        # 협업의 "4"는 첫 실행에서 실패 -> 협업은 완료로 기록되지 않음
+        return {
+            book["isbn"]: dict(book, embedding=[1.0])
+            for book in books
+            if book["isbn"] != "4" or len(fetched) > 2
+        }
+
+    def run(progress):
+        completed = progress.completed_keywords()
+        keywords = [keyword for keyword in catalogue if keyword not in completed]
+        chunk_number = progress.next_chunk_number()
+
+        def persist(chunk):
+            nonlocal chunk_number
+            progress.record_chunk(chunk_number, chunk.keys())
+            chunk_number += 1
+
+        asyncio.run(
+            run_ingestion_pipeline(
+                keywords,
+                fetch_books,
+                embed_books,
+                persist,
+                processed_isbns=progress.processed_isbns(),
+                on_keyword_done=progress.complete_keyword,
+                fetch_concurrency=1,
+                chunk_size=2,
+            )
+        )
+
+    db_path = str(tmp_path / "ingest_progress.db")
+    progress = IngestProgress(db_path)
+    assert progress.is_empty()
+    run(progress)
+    assert progress.completed_keywords() == {"리더십"}
+    assert progress.processed_isbns() == {"0", "1", "2", "3"}
+    progress.close()
+
+    # 재시작: 완료된 키워드는 검색하지 않고, 청크 번호는 이어서 사용
+    progress = IngestProgress(db_path)
+    assert not progress.is_empty()
+    first_chunk = progress.next_chunk_number()
+    run(progress)
+    assert fetched == ["리더십", "협업", "협업"]
+    assert progress.completed_keywords() == {"리더십", "협업"}
+    assert progress.processed_isbns() == {"0", "1", "2", "3", "4"}
+    assert progress.next_chunk_number() == first_chunk + 1
+    progress.close()
+
+
+def test_progress_counts_only_stored_books_as_processed(tmp_path, monkeypatch):
+    import pickle
+
+    import save_book_info
+    from book_chunk.book_store import read_store_ids
+
+    with open(tmp_path / "books_chunk_0.pkl", "wb") as f:
+        pickle.dump(
+            {
+                "1": {"title": "임베딩 있음", "embedding": [1.0, 0.0]},
+                "2": {"title": "임베딩 없음", "embedding": None},
+            },
+            f,
+        )
+    monkeypatch.setattr(save_book_info, "BOOK_CHUNK_DIR", str(tmp_path))
+
+    # 처음 실행할 때 pickle 도서를 저장소로 옮기고, 저장소에 있는 도서만 처리된 것으로 기록
+    progress = save_book_info.load_progress()
+    assert progress.processed_isbns() == {"1"}
+    assert read_store_ids(str(tmp_path)).tolist() == [b"1"]
+
+
+def test_fetch_failure_does_not_complete_keyword(tmp_path, monkeypatch):
+    import asyncio
+
+    import save_book_info
+    from ingest_pipeline import run_ingestion_pipeline
+    from ingest_progress import IngestProgress
+
+    # 2페이지 요청이 실패하면 1페이지 결과만 반환하지 않고 예외 발생
+    pages = {1: ([{"isbn": "1"}], False), 2: (None, True)}
+    monkeypatch.setattr(
+        save_book_info, "fetch_book_page", lambda keyword, page, size: pages[page]
+    )
+    with pytest.raises(save_book_info.BookFetchError):
+        save_book_info.fetch_books_by_keyword("리더십", total_count=100)
+
+    outage = [True]
+
+    def fetch_books(keyword):
+        if keyword == "협업" and outage[0]:
+            raise save_book_info.BookFetchError("Kakao 장애")
+        return [{"isbn": keyword, "contents": f"{keyword} 소개"}]
+
+    progress = IngestProgress(str(tmp_path / "ingest_progress.db"))
+
+    def run():
+        completed = progress.completed_keywords()
+        return asyncio.run(
+            run_ingestion_pipeline(
+                [k for k in ["리더십", "협업"] if k not in completed],
+                fetch_books,
+                lambda books: {b["isbn"]: dict(b, embedding=[1.0]) for b in books},
+                lambda chunk: progress.record_chunk(
+                    progress.next_chunk_number(), chunk.keys()
+                ),
+                processed_isbns=progress.processed_isbns(),
+                on_keyword_done=progress.complete_keyword,
+            )
+        )
+
+    # 검색에 실패한 키워드는 완료로 기록되지 않고, 다음 실행 때 다시 검색
+    stats = run()
+    assert stats["fetch_failed"] == ["협업"]
+    assert progress.completed_keywords() == {"리더십"}
+    outage[0] = False
+    stats = run()
+    assert stats["fetch_failed"] == [] and list(stats["keywords"]) == ["협업"]
+    assert progress.completed_keywords() == {"리더십", "협업"}
+    progress.close()
+
+
+def test_fetch_books_by_keyword_requests_pages_concurrently(monkeypatch):
+    import threading
+
+    import save_book_info
+
+    # 6페이지가 모두 동시에 요청되지 않으면 Barrier에서 막힘
+    barrier = threading.Barrier(6, timeout=5)
+    requested = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, page, size):
+            self.page, self.size = page, size
+
+        def json(self):
+            documents = [{"isbn": f"{self.page}-{i}"} for i in range(self.size)]
+            return {"documents": documents, "meta": {"is_end": self.page == 4}}
+
+    class FakeSession:
+        def get(self, url, params, timeout):
+            requested.append(params["page"])
+            barrier.wait()
+            return FakeResponse(params["page"], params["size"])
+
+    monkeypatch.setattr(save_book_info, "get_kakao_session", lambda: FakeSession())
+
+    books = save_book_info.fetch_books_by_keyword("리더십", total_count=260)
+
+    assert sorted(requested) == [1, 2, 3, 4, 5, 6]
+    # 마지막 페이지(4) 이후 결과는 버리고 페이지 순서를 유지
+    assert len(books) == 200
+    assert books[0]["isbn"] == "1-0" and books[-1]["isbn"] == "4-49"
+
+
+def test_rate_limiter_spaces_requests():
+    from llm_service.rate_limiter import RateLimiter
+
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    # 처음 2개는 즉시, 나머지 4개는 초당 2개씩
+    assert now[0] == pytest.approx(2.0)
+
+
+def test_adaptive_concurrency_cuts_once_per_congestion_window():
+    from llm_service.rate_limiter import AdaptiveConcurrency
+
+    concurrency = AdaptiveConcurrency(8)
+    tickets = [concurrency.acquire() for _ in range(8)]
+    # 동시에 보낸 8개가 모두 429를 받아도 한 번만 절반으로 줄어듦
+    for ticket in tickets:
+        concurrency.release(ticket, rate_limited=True, failed=True)
+    assert concurrency.limit == 4
+
+    # 429가 아닌 실패는 한도를 바꾸지 않음
+    concurrency.release(concurrency.acquire(), failed=True)
+    assert concurrency.limit == 4
+
+    # 줄인 뒤에 시작한 요청의 429는 새 혼잡으로 보고 다시 줄임
+    concurrency.release(concurrency.acquire(), rate_limited=True, failed=True)
+    assert concurrency.limit == 2
+    concurrency.release(concurrency.acquire())
+    assert concurrency.limit == pytest.approx(2 + 1 / 2)
+
+
+def test_normalize_tone_runs_concurrently_with_shared_chain(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from db.models import pdf
+    from llm_service.llm_client import LLMClient
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(pdf, "get_response_cache", lambda: cache)
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    class FakeChain:
+        def invoke(self, inputs):
+            barrier.wait()
+            return f"변경 후 텍스트 : '{inputs['text']}입니다'"
+
+    client = LLMClient(requests_per_minute=6000, max_concurrency=3)
+    monkeypatch.setattr(pdf, "get_tone_chain", lambda batch=False: FakeChain())
+    monkeypatch.setattr(pdf, "get_llm_client", lambda: client)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        result = pdf.normalize_tone(["가", "나", "다"], executor=executor, batch_size=1)
+
+    assert result == ["가입니다", "나입니다", "다입니다"]
+    assert client.metrics()["calls"]["normalize_tone"]["calls"] == 3
+
+
+def test_normalize_tone_batches_answers_and_splits_on_mismatch(tmp_path, monkeypatch):
+    from db.models import pdf
+    from llm_service.llm_client import LLMClient
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(pdf, "get_response_cache", lambda: cache)
+
+    calls = []
+
+    class FakeBatchChain:
+        def invoke(self, inputs):
+            items = json.loads(inputs["items"])
+            calls.append(len(items))
+            texts = [f"{item['text']}입니다" for item in items]
+            # 4개 이상 묶으면 하나를 빠뜨린 응답을 돌려줌
+            if len(texts) >= 4:
+                texts = texts[:-1]
+            return "```json\n" + json.dumps(texts, ensure_ascii=False) + "\n```"
+
+    class FakeSingleChain:
+        def invoke(self, inputs):
+            calls.append("single")
+            return f"변경 후 텍스트 : {inputs['text']}입니다"
+
+    client = LLMClient(requests_per_minute=6000)
+    monkeypatch.setattr(
+        pdf,
+        "get_tone_chain",
+        lambda batch=False: FakeBatchChain() if batch else FakeSingleChain(),
+    )
+    monkeypatch.setattr(pdf, "get_llm_client", lambda: client)
+
+    texts = [f"답변{i}" for i in range(7)]
+    result = pdf.normalize_tone(texts, batch_size=6)
+
+    assert result == [f"답변{i}입니다" for i in range(7)]
+    # 6개 배치 실패 -> 3개씩 나눠 성공, 남은 1개는 단건 요청
+    assert calls == [6, 3, 3, "single"]
+
+    # 다시 실행하면 캐시된 답변은 요청하지 않음
+    calls.clear()
+    result = pdf.normalize_tone(texts + ["새 답변"], batch_size=6)
+    assert result[-1] == "새 답변입니다"
+    assert calls == ["single"]
+
+
+def test_response_cache_ttl_eviction_and_bypass(tmp_path):
+    from llm_service.response_cache import ResponseCache
+
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path, max_bytes=20)
+    created = []
+
+    def create(text):
+        def create_fn():
+            created.append(text)
+            return text
+
+        return create_fn
+
+    assert cache.get_or_create("m", "{x}", {"x": 1}, create("가나다")) == "가나다"
+    assert cache.get_or_create("m", "{x}", {"x": 1}, create("다른 값")) == "가나다"
+    # 모델이나 템플릿이 다르면 다른 키
+    cache.get_or_create("m2", "{x}", {"x": 1}, create("abc"))
+    cache.get_or_create("m", "{y}", {"x": 1}, create("def"))
+    assert created == ["가나다", "abc", "def"]
+    assert cache.stats()["hits"] == 1
+    # 9 + 3 + 3 + 9 = 24바이트 > 20 -> 가장 오래 사용되지 않은 항목부터 삭제
+    cache.put("m", "{x}", {"x": 2}, "라마바")
+    assert cache.get("m", "{x}", {"x": 1}) is None
+    assert cache.get("m", "{x}", {"x": 2}) == "라마바"
+    cache.close()
+
+    expired = ResponseCache(db_path, ttl=-1)
+    assert expired.get("m", "{x}", {"x": 2}) is None
+    expired.close()
+
+    bypassed = ResponseCache(db_path, bypass=True)
+    assert bypassed.get_or_create("m", "{y}", {"x": 1}, create("새 값")) == "새 값"
+    bypassed.close()
+    assert ResponseCache(db_path).get("m", "{y}", {"x": 1}) == "새 값"
+
+
+def test_response_cache_hits_do_not_write_and_size_is_tracked(tmp_path):
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=30, touch_interval=60)
+    cache.put("m", "{x}", {"x": 1}, "가나다")
+    cache.put("m", "{x}", {"x": 1}, "abc")
+    cache.put("m", "{x}", {"x": 2}, "라마바")
+    changes = cache._conn.total_changes
+
+    # 최근에 사용한 항목은 적중해도 last_used를 갱신하지 않음
+    assert cache.get("m", "{x}", {"x": 1}) == "abc"
+    assert cache._conn.total_changes == changes
+
+    # 덮어쓰기와 삭제 후에도 누적 크기는 실제 합계와 같음
+    def actual_bytes():
+        return cache._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM responses"
+        ).fetchone()[0]
+
+    assert cache.stats()["bytes"] == actual_bytes() == 12
+    for i in range(5):
+        cache.put("m", "{x}", {"x": 10 + i}, "가나다")
+    assert cache.stats()["bytes"] == actual_bytes() <= 30
+    cache.close()
+
+
+def test_llm_client_backs_off_on_rate_limits():
+    from llm_service.llm_client import LLMClient
+
+    sleeps = []
+    client = LLMClient(
+        requests_per_minute=6000,
+        max_concurrency=8,
+        max_attempts=3,
+        max_backoff=2.0,
+        sleep=sleeps.append,
+    )
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Exception({"error": {"code": "too_many_requests"}})
+        return "ok"
+
+    assert client.call(flaky, name="flaky") == "ok"
+    # 429 두 번: 재시도 대기는 상한 이하, 동시 요청 한도는 두 번 절반으로 줄어듦
+    assert len(sleeps) == 2 and all(0 <= delay <= 2.0 for delay in sleeps)
+    assert client.concurrency.limit == pytest.approx(2 + 1 / 2)
+
+    def always_limited():
+        raise Exception("Error code: 429 - too_many_requests")
+
+    with pytest.raises(Exception, match="429"):
+        client.call(always_limited, name="limited")
+
+    def bad_request():
+        raise ValueError("invalid input")
+
+    with pytest.raises(ValueError):
+        client.call(bad_request, name="bad")
+
+    metrics = client.metrics()["calls"]
+    assert metrics["flaky"]["calls"] == 1 and metrics["flaky"]["retries"] == 2
+    assert metrics["limited"]["attempts"] == 3 and metrics["limited"]["failures"] == 1
+    assert metrics["bad"]["attempts"] == 1 and metrics["bad"]["failures"] == 1
+
+
+def test_summary_chains_share_one_client_per_model(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import feedback_summary
+    from llm_service import llm_client
+
+    created = []
+    lock = threading.Lock()
+
+    def fake_chat_upstage(model, base_url):
+        with lock:
+            created.append(model)
+            assert base_url == llm_client.UPSTAGE_BASE_URL
+        return lambda prompt_value: f"{model}: {prompt_value.to_string()}"
+
+    monkeypatch.setattr(llm_client, "ChatUpstage", fake_chat_upstage)
+    monkeypatch.setattr(llm_client, "_chat_models", {})
+    monkeypatch.setattr(feedback_summary, "_chains", {})
+
+    names = ["multiple", "subjective", "translation"] * 10
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        chains = list(executor.map(feedback_summary.get_chain, names))
+
+    assert sorted(created) == sorted(
+        [feedback_summary.SUMMARY_MODEL, feedback_summary.TRANSLATION_MODEL]
+    )
+    assert all(chain is chains[i % 3] for i, chain in enumerate(chains))
+    assert chains[2].invoke({"text": "hi"}).startswith("solar-1-mini-translate-enko")
+
+
+def test_generate_validated_aborts_stream_on_forbidden_text(monkeypatch):
+    import feedback_summary
+    from llm_service.llm_client import LLMClient
+
+    client = LLMClient(requests_per_minute=6000)
+    monkeypatch.setattr(feedback_summary, "get_llm_client", lambda: client)
+
+    class FakeStreamChain:
+        def __init__(self, generations):
+            self.generations = iter(generations)
+            self.consumed = []
+            self.closed = 0
+
+        def stream(self, inputs):
+            chunks = next(self.generations)
+            try:
+                for chunk in chunks:
+                    self.consumed.append(chunk)
+                    yield chunk
+            finally:
+                self.closed += 1
+
+    long_tail = ["계속"] * 50
+    chain = FakeStreamChain(
+        [["점수는 ", "4", "점"] + long_tail, ["꼼꼼하고 ", "성실합니다"]]
+    )
+    result = feedback_summary.generate_validated(
+        chain, {"text": "x"}, feedback_summary.MULTIPLE_FORBIDDEN, "test", 1
+    )
+
+    assert result == "꼼꼼하고 성실합니다"
+    # 숫자가 나온 첫 응답은 바로 중단되어 나머지 청크를 받지 않음
+    assert len(chain.consumed) == 4 and chain.closed == 2
+
+    # 모든 시도가 실패하면 마지막 응답과 함께 예외 발생
+    chain = FakeStreamChain([["a: b"]] * feedback_summary.MAX_VALIDATION_ATTEMPTS)
+    with pytest.raises(feedback_summary.InvalidResponseError) as error:
+        feedback_summary.generate_validated(
+            chain, {"text": "x"}, feedback_summary.SUBJECTIVE_FORBIDDEN, "test", 1
+        )
+    assert error.value.response == "a: b"
+    assert client.metrics()["calls"]["test"]["calls"] == 2 + 3
+
+
+def test_invalid_summary_is_used_but_not_cached(tmp_path, monkeypatch):
+    import feedback_summary
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"), bypass=False)
+    monkeypatch.setattr(feedback_summary, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(feedback_summary, "get_chain", lambda name: name)
+    responses = iter(["a: b", "꼼꼼합니다"])
+
+    def fake_generate(chain, inputs, forbidden, name, tokens):
+        response = next(responses)
+        if forbidden.search(response):
+            raise feedback_summary.InvalidResponseError(response)
+        return response
+
+    monkeypatch.setattr(feedback_summary, "generate_validated", fake_generate)
+
+    # 검증에 실패한 응답은 이번에만 사용하고, 다음 실행에서 다시 생성
+    assert feedback_summary.summarize_subjective_question(0, ["답변"]) == "a: b"
+    assert cache.stats()["count"] == 0
+    assert feedback_summary.summarize_subjective_question(0, ["답변"]) == "꼼꼼합니다"
+    assert feedback_summary.summarize_subjective_question(0, ["답변"]) == "꼼꼼합니다"
+
+
+def test_single_pass_summary_makes_one_call(tmp_path, monkeypatch):
+    import benchmark_summary
+    import feedback_summary
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"), bypass=False)
+    monkeypatch.setattr(feedback_summary, "get_response_cache", lambda: cache)
+    used = []
+
+    def fake_generate(chain, inputs, forbidden, name, tokens):
+        used.append(name)
+        return f"{name} 결과"
+
+    monkeypatch.setattr(feedback_summary, "generate_validated", fake_generate)
+    chains = []
+    monkeypatch.setattr(feedback_summary, "get_chain", chains.append)
+
+    text = "\n    업적: 4.27\n    태도: 4.0"
+    assert feedback_summary.summarize_scores(text, mode="single") == (
+        "summarize_multiple_ko 결과"
+    )
+    assert feedback_summary.summarize_scores(text, mode="single") == (
+        "summarize_multiple_ko 결과"
+    )
+    # 번역 없이 한 번만 호출하고, 같은 입력은 캐시에서 재사용
+    assert used == ["summarize_multiple_ko"] and chains == ["multiple_ko"]
+
+    def run(mode, latencies, text):
+        return {
+            "mode": mode,
+            "username": "user1",
+            "calls": [
+                {
+                    "latency": latency,
+                    "input_tokens": 10,
+                    "output_tokens": 5,
+                    "text": text,
+                }
+                for latency in latencies
+            ],
+        }
+
+    results = benchmark_summary.summarize_recordings(
+        [
+            run("two_step", [1.0, 0.5], "성실합니다"),
+            run("two_step", [2.0, 1.0], "점수 4점"),
+            run("single", [1.0], "성실합니다"),
+            run("single", [0.5], "꼼꼼합니다"),
+        ]
+    )
+    assert results["two_step"]["calls_per_summary"] == 2
+    assert results["two_step"]["latency_p95"] == 3.0
+    assert results["two_step"]["tokens_mean"] == 30
+    assert results["two_step"]["violation_rate"] == 0.5
+    assert results["single"]["latency_mean"] == 0.75
+    assert results["single"]["violation_rate"] == 0
+
+    # 대체 서버로 기록한 테스트용 데이터는 형식만 확인 (지연 시간, 응답은 비교하지 않음)
+    with open(benchmark_summary.STUB_RECORDINGS_PATH, encoding="utf-8") as f:
+        stub_results = benchmark_summary.summarize_recordings(json.load(f))
+    assert {
+        mode: result["calls_per_summary"] for mode, result in stub_results.items()
+    } == {"two_step": 2, "single": 1}
+    cache.close()
+
+
+def test_stub_server_is_deterministic_and_injects_rate_limits():
+    import threading
+
+    import openai
+    from llm_service.llm_client import is_rate_limited
+    from llm_service.stub_server import StubConfig, create_stub_app
+    from werkzeug.serving import make_server
+
+    config = StubConfig(requests_per_minute=4, embedding_dim=16, sleep=lambda s: None)
+    server = make_server("127.0.0.1", 0, create_stub_app(config), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = openai.OpenAI(
+        api_key="stub",
+        base_url=f"http://127.0.0.1:{server.server_port}/v1/solar",
+        max_retries=0,
+    )
+
+    def chat(content):
+        response = client.chat.completions.create(
+            model="solar-mini", messages=[{"role": "user", "content": content}]
+        )
+        return response.choices[0].message.content
+
+    try:
+        first = chat("요약해줘")
+        assert first == chat("요약해줘") and not any(c.isdigit() for c in first)
+        # 프롬프트의 JSON 배열과 같은 길이의 JSON 배열로 응답
+        assert len(json.loads(chat('변경해줘 ["가", "나", "다"]'))) == 3
+
+        vectors = client.embeddings.create(model="embedding-passage", input=["책"])
+        vector = np.array(vectors.data[0].embedding)
+        assert vector.shape == (16,) and np.isclose(np.linalg.norm(vector), 1)
+
+        # 분당 요청 한도를 넘으면 429
+        with pytest.raises(openai.RateLimitError) as excinfo:
+            chat("요약해줘")
+        assert is_rate_limited(excinfo.value)
+        assert config.stats == {"requests": 5, "rate_limited": 1}
+    finally:
+        server.shutdown()
+
+
+def test_summarize_subjective_batch_falls_back_per_question(tmp_path, monkeypatch):
+    import feedback_summary
+    from llm_service.llm_client import LLMClient
+    from llm_service.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"), bypass=False)
+    monkeypatch.setattr(feedback_summary, "get_response_cache", lambda: cache)
+    client = LLMClient(requests_per_minute=6000)
+    monkeypatch.setattr(feedback_summary, "get_llm_client", lambda: client)
+
+    class FakeBatchChain:
+        def __init__(self, response):
+            self.response = response
+            self.prompts = []
+
+        def invoke(self, inputs):
+            self.prompts.append(inputs)
+            return self.response
+
+    batch_chain = FakeBatchChain(
+        '결과 {"q_28": "꼼꼼합니다.", "q_29": "장점: 성실함", "q_99": "무시"}'
+    )
+    monkeypatch.setattr(
+        feedback_summary,
+        "get_chain",
+        lambda name: batch_chain if name == "subjective_batch" else name,
+    )
+    fallback = []
+
+    def fake_generate(chain, inputs, forbidden, name, tokens):
+        fallback.append(inputs["text"])
+        return "따로 요약"
+
+    monkeypatch.setattr(feedback_summary, "generate_validated", fake_generate)
+
+    data = [["q_30", "['c']"], ["q_28", "['a']"], ["q_29", "['b']"]]
+    expected = [
+        {"question": "q_28", "response": "꼼꼼합니다."},
+        {"question": "q_29", "response": "따로 요약"},
+        {"question": "q_30", "response": "따로 요약"},
+    ]
+    assert feedback_summary.summarize_subjective(data, mode="batch") == expected
+    # 한 번의 요청으로 모든 문항을 보내고, ':'가 들어가거나 빠진 문항만 따로 요약
+    assert len(batch_chain.prompts) == 1 and batch_chain.prompts[0]["count"] == 3
+    assert fallback == ["characteristic2: ['b']", "characteristic3: ['c']"]
+
+    # JSON이 아니면 모든 문항을 따로 요약
+    assert feedback_summary.parse_subjective_batch("요약 실패", ["q_28"]) == {}
+
+    # 같은 입력은 캐시에서 재사용
+    assert feedback_summary.summarize_subjective(data, mode="batch") == expected
+    assert len(batch_chain.prompts) == 1 and len(fallback) == 2
+    cache.close()
+
+
+def test_process_feedback_data_matches_persona_results(tmp_path, monkeypatch):
+    import shutil
+    import sqlite3
+
+    from db.models import pdf
+
+    persona_dir = os.path.join(os.path.dirname(__file__), "db/persona_db")
+    shutil.copy(os.path.join(persona_dir, "feedback.db"), tmp_path)
+    monkeypatch.setattr(pdf, "FEEDBACK_DB_PATH", str(tmp_path / "feedback.db"))
+    monkeypatch.setattr(
+        pdf, "normalize_tone", lambda answers, executor=None: list(answers)
+    )
+
+    # 기존 형식(키워드별 컬럼)의 persona result.db를 실행 시점에 long format으로 옮김
+    shutil.copy(os.path.join(persona_dir, "result.db"), tmp_path / "persona_result.db")
+    monkeypatch.setattr(pdf, "RESULT_DB_PATH", str(tmp_path / "persona_result.db"))
+    pdf.init_result_db()
+
+    monkeypatch.setattr(pdf, "RESULT_DB_PATH", str(tmp_path / "result.db"))
+    pdf.init_result_db()
+    pdf.process_feedback_data()
+
+    def multiple_rows(path):
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT * FROM multiple ORDER BY to_username").fetchall()
+        conn.close()
+        return rows
+
+    assert multiple_rows(tmp_path / "result.db") == multiple_rows(
+        tmp_path / "persona_result.db"
+    )
+
+    # 분위수 경계값 기준 등급 (S 10%, A 20%, B 30%, C 30%, D 10%)
+    totals = np.arange(1, 11, dtype=float)
+    assert list(pdf.assign_grades(totals)) == list("DCCCBBBAAS")
+    assert list(pdf.assign_grades([3.0])) == ["S"]
+
+
+def test_fetch_keyword_averages_aggregates_in_sqlite():
+    import sqlite3
+
+    from db.models import pdf
+
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE feedback_questions (id INTEGER PRIMARY KEY, keyword TEXT, question_type TEXT);
+        CREATE TABLE feedback_results (
+            question_id INTEGER, to_username TEXT, answer_content TEXT, cycle_id INTEGER DEFAULT 1
+        );
+        INSERT INTO feedback_questions VALUES
+            (1, '업적', 'single_choice'), (2, '업적', 'single_choice'),
+            (3, '태도', 'single_choice'), (4, '"리더십"', 'single_choice'),
+            (5, '업적', 'long_answer');
+        INSERT INTO feedback_results (question_id, to_username, answer_content) VALUES
+            (1, 'bob', '우수'), (2, 'bob', '매우우수'), (3, 'bob', '잘못된 값'),
+            (1, 'amy', '미흡'), (3, 'amy', '보통'), (5, 'amy', '매우우수');
+        -- 다른 리뷰 주기의 답변은 집계하지 않음
+        INSERT INTO feedback_results VALUES (4, 'bob', '매우우수', 2);
+        """
+    )
+    df = pdf.fetch_keyword_averages(conn, ["업적", "태도", '"리더십"'])
+
+    assert df["to_username"].tolist() == ["amy", "bob"]
+    assert df["업적"].tolist() == [2.0, 4.5]
+    # 점수표에 없는 답변과 주관식 문항은 제외, 답변이 없는 키워드는 NaN
+    assert df["태도"].tolist()[0] == 3.0 and np.isnan(df["태도"].tolist()[1])
+    # 따옴표가 들어간 키워드도 컬럼 이름으로 그대로 사용
+    assert df['"리더십"'].isna().all()
+    conn.close()
+
+
+def test_incremental_result_rebuild_processes_only_new_feedback(tmp_path, monkeypatch):
+    import shutil
+    import sqlite3
+
+    from db.models import pdf
+
+    persona_dir = os.path.join(os.path.dirname(__file__), "db/persona_db")
+    shutil.copy(os.path.join(persona_dir, "feedback.db"), tmp_path)
+    monkeypatch.setattr(pdf, "FEEDBACK_DB_PATH", str(tmp_path / "feedback.db"))
+    monkeypatch.setattr(pdf, "RESULT_DB_PATH", str(tmp_path / "result.db"))
+    normalized = []
+
+    def fake_normalize_tone(answers, executor=None):
+        normalized.append(len(answers))
+        return [f"정규화 {answer}" for answer in answers]
+
+    monkeypatch.setattr(pdf, "normalize_tone", fake_normalize_tone)
+
+    def snapshot():
+        conn = sqlite3.connect(tmp_path / "result.db")
+        multiple = conn.execute(
+            "SELECT * FROM multiple ORDER BY to_username"
+        ).fetchall()
+        subjective = conn.execute(
+            "SELECT * FROM subjective ORDER BY to_username"
+        ).fetchall()
+        conn.close()
+        return multiple, subjective
+
+    pdf.build_result_db()
+    first = snapshot()
+    assert len(normalized) == 1
+
+    # 새 피드백: user1 객관식 1건, user2 주관식 1건
+    conn = sqlite3.connect(tmp_path / "feedback.db")
+    conn.executemany(
+        "INSERT INTO feedback_results (question_id, from_username, to_username, answer_content) VALUES (?, ?, ?, ?)",
+        [(3, "user5", "user1", "매우미흡"), (28, "user5", "user2", "새 의견")],
+    )
+    conn.commit()
+    conn.close()
+
+    pdf.build_result_db()
+    multiple, subjective = snapshot()
+    # 새 주관식 답변만 정규화하고, 새 답변을 받은 사용자의 행만 바뀜
+    assert normalized[1:] == [1]
+    assert [row[0] for row in multiple] == [row[0] for row in first[0]]
+    assert [row for row in multiple if row[0] == "user1"] != [
+        row for row in first[0] if row[0] == "user1"
+    ]
+    assert [row for row in subjective if row[0] != "user2"] == [
+        row for row in first[1] if row[0] != "user2"
+    ]
+    assert "정규화 새 의견" in dict((row[0], row[1]) for row in subjective)["user2"]
+
+    # 증분 갱신 결과는 처음부터 다시 만든 결과와 같음
+    pdf.build_result_db(full=True)
+    assert snapshot() == (multiple, subjective)
+
+    # 새 피드백이 없으면 아무것도 다시 계산하지 않음
+    normalized.clear()
+    pdf.build_result_db()
+    assert normalized == [] and snapshot() == (multiple, subjective)
+
+    # 질문의 키워드가 바뀌거나 질문이 삭제되면 새 피드백이 없어도 처음부터 다시 생성
+    conn = sqlite3.connect(tmp_path / "feedback.db")
+    conn.execute("UPDATE feedback_questions SET keyword = '새 키워드' WHERE id = 3")
+    conn.execute("DELETE FROM feedback_questions WHERE id = 28")
+    conn.commit()
+    conn.close()
+    pdf.build_result_db()
+    assert normalized != []
+    rebuilt = snapshot()
+    conn = sqlite3.connect(tmp_path / "result.db")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(multiple)")]
+    conn.close()
+    assert "새 키워드" in columns
+    assert all("새 의견" not in str(row) for row in rebuilt[1])
+    pdf.build_result_db(full=True)
+    assert snapshot() == rebuilt
+
+
+def test_migrate_wide_result_tables_to_long_format(tmp_path, monkeypatch):
+    import sqlite3
+
+    from db.models import pdf
+
+    monkeypatch.setattr(pdf, "RESULT_DB_PATH", str(tmp_path / "result.db"))
+    conn = sqlite3.connect(tmp_path / "result.db")
+    conn.execute(
+        'CREATE TABLE multiple (id INTEGER PRIMARY KEY AUTOINCREMENT, to_username TEXT, "업무", "협업", "총합", "등급")'
+    )
+    conn.execute(
+        "CREATE TABLE subjective (id INTEGER PRIMARY KEY AUTOINCREMENT, to_username TEXT, q_7, q_9)"
+    )
+    legacy_multiple = [("average", 3.5, 4.0, 7.5, None), ("user1", 4.0, None, 4.0, "A")]
+    conn.executemany(
+        'INSERT INTO multiple (to_username, "업무", "협업", "총합", "등급") VALUES (?, ?, ?, ?, ?)',
+        legacy_multiple,
+    )
+    conn.execute(
+        "INSERT INTO subjective (to_username, q_7, q_9) VALUES ('user1', '[\"좋음\"]', '[]')"
+    )
+    conn.commit()
+    conn.close()
+
+    pdf.init_result_db()
+
+    conn = sqlite3.connect(tmp_path / "result.db")
+    # 기존 테이블 이름은 같은 모양의 뷰로 남음
+    assert conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'multiple'"
+    ).fetchone() == ("view",)
+    assert (
+        conn.execute("SELECT * FROM multiple ORDER BY to_username").fetchall()
+        == legacy_multiple
+    )
+    assert conn.execute("SELECT * FROM subjective").fetchall() == [
+        ("user1", '["좋음"]', None)
+    ]
+    # 답변이 없는 점수/질문은 행으로 저장하지 않음
+    assert conn.execute("SELECT COUNT(*) FROM result_scores").fetchone() == (3,)
+    assert conn.execute("SELECT COUNT(*) FROM result_feedback").fetchone() == (1,)
+    # 사용자 한 명의 조회는 기본 키 범위 검색
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT keyword, score FROM result_scores WHERE cycle_id = 1 AND to_username = 'user1'"
+    ).fetchall()
+    assert "PRIMARY KEY" in plan[0][-1]
+    conn.close()
+
+
+def test_review_cycles_partition_feedback_and_results(tmp_path, monkeypatch, client):
+    import shutil
+    import sqlite3
+
+    from db.models import pdf, qa
+
+    persona_dir = os.path.join(os.path.dirname(__file__), "db/persona_db")
+    shutil.copy(os.path.join(persona_dir, "feedback.db"), tmp_path)
+    feedback_path = str(tmp_path / "feedback.db")
+    monkeypatch.setattr(qa, "DB_PATH", feedback_path)
+    monkeypatch.setattr(qa, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(pdf, "FEEDBACK_DB_PATH", feedback_path)
+    monkeypatch.setattr(pdf, "RESULT_DB_PATH", str(tmp_path / "result.db"))
+    monkeypatch.setattr(
+        pdf, "normalize_tone", lambda answers, executor=None: list(answers)
+    )
+
+    pdf.build_result_db()
+    conn = sqlite3.connect(feedback_path)
+    from_username, to_username, question_id = conn.execute(
+        "SELECT fr.from_username, fr.to_username, fr.question_id FROM feedback_results fr"
+        " JOIN feedback_questions fq ON fr.question_id = fq.id"
+        " WHERE fq.question_type = 'single_choice' LIMIT 1"
+    ).fetchone()
+    conn.close()
+    old_questions = client.get("/api/questions").get_json()["questions"]
+
+    # 새 주기: 질문은 새 ID로 복사되고, 이전 주기의 답변은 조회되지 않음
+    response = client.post("/api/cycles", json={"name": "2차"})
+    assert response.get_json()["cycle_id"] == 2
+    new_questions = client.get("/api/questions").get_json()["questions"]
+    assert [q["question_text"] for q in new_questions] == [
+        q["question_text"] for q in old_questions
+    ]
+    assert {q["id"] for q in new_questions}.isdisjoint(q["id"] for q in old_questions)
+    # 지난 주기의 질문은 조회, 수정, 삭제할 수 없음
+    old_id = old_questions[0]["id"]
+    assert client.get(f"/api/questions/{old_id}").status_code == 404
+    assert (
+        client.put(
+            f"/api/questions/{old_id}", json={"question_text": "수정"}
+        ).status_code
+        == 404
+    )
+    assert client.delete(f"/api/questions/{old_id}").status_code == 404
+    conn = sqlite3.connect(feedback_path)
+    assert conn.execute(
+        "SELECT question_text FROM feedback_questions WHERE id = ?", (old_id,)
+    ).fetchone() == (old_questions[0]["question_text"],)
+    conn.close()
+    assert client.get(f"/api/questions/{new_questions[0]['id']}").status_code == 200
+    check_url = (
+        f"/api/feedback/check?from_username={from_username}&to_username={to_username}"
+    )
+    assert client.get(check_url).get_json()["already_submitted"] is False
+
+    new_question_id = new_questions[
+        [q["id"] for q in old_questions].index(question_id)
+    ]["id"]
+    client.post(
+        "/api/feedback/bulk",
+        json=[
+            {
+                "question_id": new_question_id,
+                "from_username": from_username,
+                "to_username": to_username,
+                "answer_content": "우수",
+            }
+        ],
+    )
+    assert client.get(check_url).get_json()["already_submitted"] is True
+
+    # 결과는 주기별로 저장되고, 호환 뷰는 현재 주기를 보여줌
+    pdf.build_result_db()
+    result_conn = sqlite3.connect(tmp_path / "result.db")
+    assert result_conn.execute(
+        "SELECT to_username FROM multiple ORDER BY to_username"
+    ).fetchall() == sorted([(to_username,), ("average",)])
+    old_totals = result_conn.execute(
+        "SELECT COUNT(*) FROM result_totals WHERE cycle_id = 1"
+    ).fetchone()[0]
+    assert old_totals > 1
+    result_conn.close()
+
+    # 지난 주기는 별도 파일로 옮김 (현재 주기와 없는 주기는 보관 불가)
+    with pytest.raises(ValueError):
+        pdf.archive_result_cycle(2)
+    with pytest.raises(ValueError):
+        pdf.archive_result_cycle(99)
+    assert not os.path.exists(qa.archive_path_for(99))
+
+    # feedback.db 보관 중 실패해도 같은 명령을 다시 실행하면 끝까지 보관됨
+    def fail_archive_cycle(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(pdf, "archive_cycle", fail_archive_cycle)
+    with pytest.raises(sqlite3.OperationalError):
+        pdf.archive_result_cycle(1)
+    monkeypatch.setattr(pdf, "archive_cycle", qa.archive_cycle)
+    archive_path = pdf.archive_result_cycle(1)
+    assert pdf.archive_result_cycle(1) == archive_path
+    archive = sqlite3.connect(archive_path)
+    old_feedback = archive.execute("SELECT COUNT(*) FROM feedback_results").fetchone()[
+        0
+    ]
+    assert old_feedback > 0
+    assert (
+        archive.execute("SELECT COUNT(*) FROM result_totals").fetchone()[0]
+        == old_totals
+    )
+    assert archive.execute("SELECT id FROM review_cycles").fetchall() == [(1,)]
+    archive.close()
+    conn = sqlite3.connect(feedback_path)
+    assert conn.execute(
+        "SELECT DISTINCT cycle_id FROM feedback_results"
+    ).fetchall() == [(2,)]
+    assert conn.execute(
+        "SELECT archive_path FROM review_cycles WHERE id = 1"
+    ).fetchone() == (archive_path,)
+    conn.close()
+    result_conn = sqlite3.connect(tmp_path / "result.db")
+    assert result_conn.execute(
+        "SELECT DISTINCT cycle_id FROM result_totals"
+    ).fetchall() == [(2,)]
+    result_conn.close()
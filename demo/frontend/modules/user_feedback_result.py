@@ -67,8 +67,13 @@ def user_view_my_feedback():
                 st.warning("❗ 피드백 데이터가 없습니다.")
                 return
 
-            # 🔹 feedback_questions 테이블에서 keyword 가져오기
-            cursor_feedback.execute("SELECT DISTINCT keyword FROM feedback_questions")
+            # 🔹 현재 리뷰 주기의 feedback_questions에서 keyword 가져오기
+            cursor_feedback.execute("SELECT MAX(id) FROM review_cycles")
+            cycle_id = cursor_feedback.fetchone()[0]
+            cursor_feedback.execute(
+                "SELECT DISTINCT keyword FROM feedback_questions WHERE cycle_id = ?",
+                (cycle_id,),
+            )
             keywords = [row["keyword"] for row in cursor_feedback.fetchall()]
 
             # 🔹 질문 ID 매핑
@@ -76,8 +81,8 @@ def user_view_my_feedback():
             question_texts = {}
             for keyword in keywords:
                 cursor_feedback.execute(
-                    "SELECT id, question_text FROM feedback_questions WHERE keyword = ?",
-                    (keyword,),
+                    "SELECT id, question_text FROM feedback_questions WHERE keyword = ? AND cycle_id = ?",
+                    (keyword, cycle_id),
                 )
                 question_data = cursor_feedback.fetchall()
                 question_ids = [f"q_{row['id']}" for row in question_data]